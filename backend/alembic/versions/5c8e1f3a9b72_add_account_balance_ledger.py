@@ -0,0 +1,72 @@
+"""add account balance ledger
+
+Existing trades are backfilled as compacted entries, and any difference between the stored
+balance and ``initial_balance + trade PnL`` becomes one compacted adjustment, so live balances
+are unchanged by the migration.
+
+Revision ID: 5c8e1f3a9b72
+Revises: d41a6f0c8e27
+Create Date: 2026-10-19 11:24:06.730518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e1f3a9b72'
+down_revision = 'd41a6f0c8e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'account_ledger',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('account_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('trade_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('kind', sa.Enum('trade', 'adjustment', 'correction', name='ledger_entry_kind_enum'), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('compacted', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_account_ledger_account_id_occurred_at', 'account_ledger', ['account_id', 'occurred_at'], unique=False
+    )
+    op.create_index(
+        'ix_account_ledger_pending',
+        'account_ledger',
+        ['account_id'],
+        unique=False,
+        postgresql_where=sa.text('compacted IS false'),
+    )
+
+    op.execute(
+        "INSERT INTO account_ledger (account_id, trade_id, kind, amount, occurred_at, compacted) "
+        "SELECT account_id, id, 'trade', round(pnl, 2), exit_timestamp, true FROM trades WHERE round(pnl, 2) <> 0"
+    )
+    op.execute(
+        "INSERT INTO account_ledger (account_id, kind, amount, occurred_at, compacted) "
+        "SELECT a.id, 'adjustment', a.current_balance - a.initial_balance - coalesce(sum(l.amount), 0), now(), true "
+        "FROM accounts a LEFT JOIN account_ledger l ON l.account_id = a.id "
+        "GROUP BY a.id "
+        "HAVING a.current_balance - a.initial_balance - coalesce(sum(l.amount), 0) <> 0"
+    )
+
+
+def downgrade() -> None:
+    # Fold pending entries in so current_balance is the live balance again.
+    op.execute(
+        "UPDATE accounts SET current_balance = accounts.current_balance + pending.amount "
+        "FROM (SELECT account_id, sum(amount) AS amount FROM account_ledger WHERE compacted IS false "
+        "GROUP BY account_id) AS pending WHERE accounts.id = pending.account_id"
+    )
+    op.drop_index('ix_account_ledger_pending', table_name='account_ledger')
+    op.drop_index('ix_account_ledger_account_id_occurred_at', table_name='account_ledger')
+    op.drop_table('account_ledger')
+    sa.Enum(name='ledger_entry_kind_enum').drop(op.get_bind(), checkfirst=True)
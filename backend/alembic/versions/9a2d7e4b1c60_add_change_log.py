@@ -0,0 +1,39 @@
+"""add change log
+
+Existing tags, strategies, accounts and trades are logged once each, so a client syncing
+from ``since=0`` receives the full journal.
+
+Revision ID: 9a2d7e4b1c60
+Revises: 5c8e1f3a9b72
+Create Date: 2026-10-19 12:08:52.114630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9a2d7e4b1c60'
+down_revision = '5c8e1f3a9b72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'change_log',
+        sa.Column('seq', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('entity', sa.Enum('trade', 'account', 'strategy', 'tag', name='change_entity_enum'), nullable=False),
+        sa.Column('entity_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('deleted', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+    )
+    for entity, table in (('tag', 'tags'), ('strategy', 'strategies'), ('account', 'accounts'), ('trade', 'trades')):
+        op.execute(f"INSERT INTO change_log (entity, entity_id) SELECT '{entity}', id FROM {table} ORDER BY created_at")
+
+
+def downgrade() -> None:
+    op.drop_table('change_log')
+    sa.Enum(name='change_entity_enum').drop(op.get_bind(), checkfirst=True)
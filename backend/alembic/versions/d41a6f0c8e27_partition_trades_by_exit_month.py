@@ -0,0 +1,29 @@
+"""partition trades by exit month
+
+Opt-in: only converts the table when TRADES_PARTITIONING=monthly is set while
+migrating. See app/partitioning.py for partition maintenance.
+
+Revision ID: d41a6f0c8e27
+Revises: b7e2c91d4a53
+Create Date: 2026-10-19 10:03:15.552871
+
+"""
+from alembic import op
+
+from app import partitioning
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a6f0c8e27'
+down_revision = 'b7e2c91d4a53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if partitioning.TRADES_PARTITIONING == "monthly":
+        partitioning.convert_to_partitioned(op.get_bind())
+
+
+def downgrade() -> None:
+    partitioning.convert_to_plain(op.get_bind())
@@ -0,0 +1,33 @@
+"""order change log by transaction
+
+Rows record the id of the transaction that wrote them, so readers can order the log by
+commit without writers serializing on a lock. Existing rows get the migration's id: they
+all committed before it.
+
+Revision ID: e5b3c8a17f24
+Revises: 9a2d7e4b1c60
+Create Date: 2026-10-19 16:42:05.381207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b3c8a17f24'
+down_revision = '9a2d7e4b1c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'change_log',
+        sa.Column('xid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False),
+    )
+    op.create_index('ix_change_log_xid_seq', 'change_log', ['xid', 'seq'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_change_log_xid_seq', table_name='change_log')
+    op.drop_column('change_log', 'xid')
@@ -0,0 +1,497 @@
+"""Persisted analytics snapshot: dashboard aggregates and the equity curve, ready right after boot.
+
+With ``ANALYTICS_SNAPSHOT_PATH`` set, the unfiltered dashboard reads (KPIs, equity curve,
+per-strategy and per-account summaries) are served from a binary file instead of scanning
+``trades``. The file holds, as of one database snapshot (its data version):
+
+* every trade's exit time, exit day, PnL, R-multiple, strategy and account, ordered by exit time:
+  the series behind the equity curve
+* the ``TradeTotals`` sums of every strategy and every account
+* the trade ids, sorted, to find a trade's row when it changes
+
+Workers map the file read-only, so all of them share one copy in the page cache. On first use,
+a worker checks that the file belongs to this database and is not newer than its change log.
+It then catches up: trades the change log lists as changed by transactions the file's snapshot
+did not see are re-read and kept in a small in-memory overlay on top of the mapped rows.
+Finally the trade count is checked against the table, which catches bulk writes that bypassed
+the change log. A missing, foreign or inconsistent file is rebuilt from ``trades`` (the one
+cold scan) and written for the next boot.
+
+Each request asks the change log for trades changed in transactions its view has not seen (one
+index range scan) and catches up the same way. A worker whose overlay outgrows
+``ANALYTICS_SNAPSHOT_MAX_OVERLAY`` writes a new file from memory, or maps a newer one another
+worker already wrote. Files are replaced atomically, never modified.
+
+Layout: 8-byte magic, little-endian ``uint32`` header length, a JSON header (format, data
+version, and each array's dtype, shape and offset), then the arrays at 64-byte aligned offsets.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import uuid
+from datetime import date
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import BigInteger, cast, func, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import changes, models, schemas
+from .query_budget import unbudgeted
+from .services.fixed_point import from_micros, scaled_column
+from .services.totals import TradeTotals
+
+ANALYTICS_SNAPSHOT_PATH = os.getenv("ANALYTICS_SNAPSHOT_PATH", "")
+# Trades changed since the file was written before a worker writes a fresh one.
+ANALYTICS_SNAPSHOT_MAX_OVERLAY = int(os.getenv("ANALYTICS_SNAPSHOT_MAX_OVERLAY", "5000"))
+# Changed trades above which catching up rebuilds from ``trades`` instead.
+ANALYTICS_SNAPSHOT_REBUILD_CHANGES = int(os.getenv("ANALYTICS_SNAPSHOT_REBUILD_CHANGES", "50000"))
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TJANALYT"
+FORMAT = 2
+_ALIGN = 64
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_FETCH_CHUNK = 5000
+
+# (exit time in epoch microseconds, exit day in days since epoch, pnl, r_multiple, strategy, account)
+Row = Tuple[int, int, int, Optional[int], uuid.UUID, uuid.UUID]
+Overlay = Dict[bytes, Optional[Row]]
+
+
+# ---------------------------------------------------------------------------
+# File layout
+# ---------------------------------------------------------------------------
+
+
+def write_file(path: str, stamp: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+    """Write ``arrays`` with the ``stamp`` header to a temporary file, then move it over ``path``."""
+    sections = {}
+    offset = 0
+    for name, array in arrays.items():
+        sections[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps({**stamp, "format": FORMAT, "sections": sections}).encode()
+    start = -(-(len(MAGIC) + 4 + len(header)) // _ALIGN) * _ALIGN
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(dir=directory, prefix=".analytics-", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as snapshot_file:
+            snapshot_file.write(MAGIC + struct.pack("<I", len(header)) + header)
+            for name, array in arrays.items():
+                snapshot_file.seek(start + sections[name]["offset"])
+                snapshot_file.write(np.ascontiguousarray(array).tobytes())
+            snapshot_file.truncate(start + offset)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def read_stamp(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as snapshot_file:
+        prefix = snapshot_file.read(len(MAGIC) + 4)
+        if len(prefix) < len(MAGIC) + 4 or prefix[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an analytics snapshot")
+        (length,) = struct.unpack("<I", prefix[len(MAGIC) :])
+        stamp = json.loads(snapshot_file.read(length))
+    if stamp.get("format") != FORMAT:
+        raise ValueError(f"{path} has snapshot format {stamp.get('format')}, expected {FORMAT}")
+    return stamp
+
+
+def map_file(path: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """The stamp and read-only array views of a snapshot file."""
+    stamp = read_stamp(path)
+    with open(path, "rb") as snapshot_file:
+        mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    header_length = struct.unpack("<I", mapped[len(MAGIC) : len(MAGIC) + 4])[0]
+    start = -(-(len(MAGIC) + 4 + header_length) // _ALIGN) * _ALIGN
+    arrays = {}
+    for name, section in stamp.pop("sections").items():
+        dtype = np.dtype(section["dtype"])
+        count = int(np.prod(section["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(mapped, dtype, count, start + section["offset"]).reshape(section["shape"])
+    return stamp, arrays
+
+
+# ---------------------------------------------------------------------------
+# Snapshot contents
+# ---------------------------------------------------------------------------
+
+
+def _group_totals(groups: np.ndarray, pnl: np.ndarray, r: np.ndarray, r_present: np.ndarray) -> np.ndarray:
+    """``TradeTotals`` sums per group index, in ``__slots__`` order, as exact int64."""
+    count = int(groups.max()) + 1 if len(groups) else 0
+    if not count:
+        return np.zeros((0, len(TradeTotals.__slots__)), np.int64)
+    order = np.argsort(groups, kind="stable")
+    starts = np.searchsorted(groups[order], np.arange(count))
+    pnl, r, r_present = pnl[order], r[order], r_present[order]
+    r = np.where(r_present, r, 0)
+    columns = (
+        np.ones_like(pnl),
+        pnl > 0,
+        pnl < 0,
+        pnl,
+        np.where(pnl > 0, pnl, 0),
+        np.where(pnl < 0, pnl, 0),
+        r_present,
+        r,
+        r_present & (r > 0),
+        np.where(r > 0, r, 0),
+        r_present & (r < 0),
+        np.where(r < 0, r, 0),
+    )
+    return np.stack([np.add.reduceat(column.astype(np.int64), starts) for column in columns], axis=1)
+
+
+def build_arrays(rows: List[Tuple[bytes, Row]]) -> Dict[str, np.ndarray]:
+    """Snapshot arrays for ``(trade id bytes, row)`` pairs already ordered by exit time."""
+    strategies: Dict[uuid.UUID, int] = {}
+    accounts: Dict[uuid.UUID, int] = {}
+    n = len(rows)
+    ids = np.empty(n, "S16")
+    exit_us = np.empty(n, np.int64)
+    day = np.empty(n, np.int32)
+    pnl = np.empty(n, np.int64)
+    r = np.zeros(n, np.int64)
+    r_present = np.zeros(n, np.bool_)
+    strategy = np.empty(n, np.int32)
+    account = np.empty(n, np.int32)
+    for index, (trade_id, (exit_value, day_value, pnl_value, r_value, strategy_id, account_id)) in enumerate(rows):
+        ids[index] = trade_id
+        exit_us[index] = exit_value
+        day[index] = day_value
+        pnl[index] = pnl_value
+        if r_value is not None:
+            r[index] = r_value
+            r_present[index] = True
+        strategy[index] = strategies.setdefault(strategy_id, len(strategies))
+        account[index] = accounts.setdefault(account_id, len(accounts))
+
+    order = np.argsort(ids, kind="stable")
+    return {
+        "exit_us": exit_us,
+        "day": day,
+        "pnl": pnl,
+        "r": r,
+        "r_present": r_present,
+        "strategy": strategy,
+        "account": account,
+        "ids_sorted": ids[order],
+        "id_position": order.astype(np.int32),
+        "strategy_ids": np.array([key.bytes for key in strategies], "S16"),
+        "account_ids": np.array([key.bytes for key in accounts], "S16"),
+        "strategy_totals": _group_totals(strategy, pnl, r, r_present),
+        "account_totals": _group_totals(account, pnl, r, r_present),
+    }
+
+
+def _uuid(value: bytes) -> uuid.UUID:
+    # ``S16`` drops trailing NUL bytes when an element is read back.
+    return uuid.UUID(bytes=bytes(value).ljust(16, b"\0"))
+
+
+class Base:
+    """The mapped file: rows as of ``snapshot``."""
+
+    def __init__(self, stamp: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+        self.snapshot = changes.Snapshot.parse(stamp["snapshot"])
+        self.database: str = stamp["database"]
+        self.arrays = arrays
+        self.strategy_ids = [_uuid(value) for value in arrays["strategy_ids"]]
+        self.account_ids = [_uuid(value) for value in arrays["account_ids"]]
+
+    def __len__(self) -> int:
+        return len(self.arrays["pnl"])
+
+    def position(self, trade_id: bytes) -> int:
+        """Index of the trade's row, or -1 when the file does not contain it."""
+        ids = self.arrays["ids_sorted"]
+        index = int(np.searchsorted(ids, np.array(trade_id, "S16")))
+        if index < len(ids) and bytes(ids[index]).ljust(16, b"\0") == trade_id:
+            return int(self.arrays["id_position"][index])
+        return -1
+
+    def row(self, position: int) -> Row:
+        arrays = self.arrays
+        return (
+            int(arrays["exit_us"][position]),
+            int(arrays["day"][position]),
+            int(arrays["pnl"][position]),
+            int(arrays["r"][position]) if arrays["r_present"][position] else None,
+            self.strategy_ids[arrays["strategy"][position]],
+            self.account_ids[arrays["account"][position]],
+        )
+
+    def rows(self, skip: np.ndarray) -> List[Tuple[bytes, Row]]:
+        """Every row not flagged in ``skip``, in exit-time order."""
+        arrays = self.arrays
+        ids = np.empty(len(self), "S16")
+        ids[arrays["id_position"]] = arrays["ids_sorted"]
+        return [(bytes(ids[position]).ljust(16, b"\0"), self.row(position)) for position in np.flatnonzero(~skip)]
+
+
+class AnalyticsView:
+    """Dashboard figures from the mapped rows plus the trades changed since; immutable."""
+
+    def __init__(self, base: Base, overlay: Overlay, snapshot: changes.Snapshot) -> None:
+        self.base = base
+        self.overlay = overlay
+        self.snapshot = snapshot
+
+    @cached_property
+    def _replaced(self) -> Dict[bytes, int]:
+        """Base positions of the overlaid trades that the file contains."""
+        positions = {trade_id: self.base.position(trade_id) for trade_id in self.overlay}
+        return {trade_id: position for trade_id, position in positions.items() if position >= 0}
+
+    def trade_count(self) -> int:
+        added = sum(1 for row in self.overlay.values() if row is not None)
+        return len(self.base) - len(self._replaced) + added
+
+    def _totals(self, key: str, ids: List[uuid.UUID], index: int) -> Dict[uuid.UUID, TradeTotals]:
+        totals = {ids[group]: TradeTotals.from_sums(sums) for group, sums in enumerate(self.base.arrays[key])}
+        for position in self._replaced.values():
+            old = self.base.row(position)
+            totals[old[index]].add(old[2], old[3], -1)
+        for row in self.overlay.values():
+            if row is not None:
+                totals.setdefault(row[index], TradeTotals()).add(row[2], row[3])
+        return {group: group_totals for group, group_totals in totals.items() if group_totals.trades}
+
+    @cached_property
+    def strategy_totals(self) -> Dict[uuid.UUID, TradeTotals]:
+        return self._totals("strategy_totals", self.base.strategy_ids, 4)
+
+    @cached_property
+    def account_totals(self) -> Dict[uuid.UUID, TradeTotals]:
+        return self._totals("account_totals", self.base.account_ids, 5)
+
+    def kpis(self) -> schemas.KPIsResponse:
+        overall = TradeTotals()
+        for totals in self.strategy_totals.values():
+            overall.merge(totals)
+        return overall.kpis()
+
+    @cached_property
+    def _curve(self) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self.base.arrays
+        exit_us, day, pnl = arrays["exit_us"], arrays["day"], arrays["pnl"]
+        if self.overlay:
+            keep = np.ones(len(self.base), np.bool_)
+            keep[list(self._replaced.values())] = False
+            exit_us, day, pnl = exit_us[keep], day[keep], pnl[keep]
+            added = sorted(row[:3] for row in self.overlay.values() if row is not None)
+            if added:
+                new_exit, new_day, new_pnl = (np.array(column, np.int64) for column in zip(*added))
+                at = np.searchsorted(exit_us, new_exit, side="right")
+                exit_us, day, pnl = np.insert(exit_us, at, new_exit), np.insert(day, at, new_day), np.insert(pnl, at, new_pnl)
+        return day, np.cumsum(pnl, dtype=np.int64)
+
+    def equity_curve_columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Like ``crud.get_equity_curve_columns``: exit days since the epoch and cumulative PnL micros."""
+        return self._curve
+
+    def equity_curve_points(self) -> List[Dict[str, object]]:
+        """Like ``crud.get_equity_curve_points``: one point per trade, in exit-time order."""
+        day, cumulative = self._curve
+        labels = np.datetime_as_string(day.astype("datetime64[D]")).tolist()
+        return [
+            {"date": label, "cumulative_pnl": from_micros(value)} for label, value in zip(labels, cumulative.tolist())
+        ]
+
+    def rows(self) -> List[Tuple[bytes, Row]]:
+        """All current rows in exit-time order, for writing a new file."""
+        skip = np.zeros(len(self.base), np.bool_)
+        skip[list(self._replaced.values())] = True
+        rows = self.base.rows(skip)
+        added = sorted(((row, trade_id) for trade_id, row in self.overlay.items() if row is not None), key=lambda item: item[0][0])
+        merged: List[Tuple[bytes, Row]] = []
+        index = 0
+        for row, trade_id in added:
+            while index < len(rows) and rows[index][1][0] <= row[0]:
+                merged.append(rows[index])
+                index += 1
+            merged.append((trade_id, row))
+        merged.extend(rows[index:])
+        return merged
+
+
+# ---------------------------------------------------------------------------
+# Loading and catching up
+# ---------------------------------------------------------------------------
+
+
+def _row_select():
+    trade = models.Trade
+    return select(
+        trade.id,
+        cast(func.extract("epoch", trade.exit_timestamp) * 1_000_000, BigInteger),
+        func.date(trade.exit_timestamp),
+        scaled_column(trade.pnl),
+        scaled_column(trade.r_multiple),
+        trade.strategy_id,
+        trade.account_id,
+    )
+
+
+def _as_row(values) -> Tuple[bytes, Row]:
+    trade_id, exit_us, exit_day, pnl, r_multiple, strategy_id, account_id = values
+    return trade_id.bytes, (exit_us, exit_day.toordinal() - _EPOCH_ORDINAL, pnl, r_multiple, strategy_id, account_id)
+
+
+Unseen = Tuple[changes.Snapshot, List[uuid.UUID]]
+
+
+def _unseen_trades(connection, snapshot: changes.Snapshot) -> Unseen:
+    """Trades logged by transactions ``snapshot`` did not see, with the snapshot of this read.
+
+    Without any, ``snapshot`` itself is returned: nothing needs catching up.
+    """
+    log = models.ChangeLogEntry
+    rows = connection.execute(
+        select(log.entity_id, changes.snapshot_text())
+        .distinct()
+        .where(log.entity == models.ChangeEntity.TRADE, snapshot.unseen(log.xid))
+    ).all()
+    if not rows:
+        return snapshot, []
+    return changes.Snapshot.parse(rows[0][1]), [trade_id for trade_id, _ in rows]
+
+
+class AnalyticsSnapshot:
+    """This process's view of the snapshot file; ``current`` is thread-safe."""
+
+    def __init__(self, path: str = ANALYTICS_SNAPSHOT_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._view: Optional[AnalyticsView] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def current(self, db: Session) -> Optional[AnalyticsView]:
+        """The view including every change ``db`` can see, or ``None`` when disabled."""
+        if not self.path:
+            return None
+        # Reading would leave a session that had not started a transaction idle in one.
+        started = not db.in_transaction()
+        try:
+            return self._current(db)
+        finally:
+            if started:
+                db.rollback()
+
+    def _current(self, db: Session) -> AnalyticsView:
+        view = self._view
+        if view is not None:
+            unseen = _unseen_trades(db, view.snapshot)
+            if not unseen[1]:
+                return view
+        with self._lock:
+            if self._view is None:
+                self._view = self._load(db.get_bind())
+            if self._view is not view:
+                # Loaded or caught up by another request in the meantime.
+                unseen = _unseen_trades(db, self._view.snapshot)
+            try:
+                self._view = self._catch_up(db, self._view, unseen)
+            except ValueError as exc:
+                logger.warning("Reloading analytics snapshot %s: %s", self.path, exc)
+                self._view = self._load(db.get_bind())
+            return self._view
+
+    def warm(self, engine: Engine) -> None:
+        """Map (or build) the file ahead of the first dashboard request."""
+        with self._lock:
+            if self._view is None:
+                self._view = self._load(engine)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._view = None
+
+    def _load(self, engine: Engine) -> AnalyticsView:
+        with unbudgeted(), engine.connect().execution_options(isolation_level="REPEATABLE READ") as connection:
+            latest = changes.current_snapshot(connection)
+            database = connection.execute(select(func.current_database())).scalar_one()
+            count = connection.execute(select(func.count()).select_from(models.Trade)).scalar_one()
+            try:
+                base = Base(*map_file(self.path))
+                # A file that saw transactions this database has not started is from elsewhere.
+                if base.database != database or base.snapshot.xmax > latest.xmax:
+                    raise ValueError(f"snapshot of {base.database} at {base.snapshot}, database {database} is at {latest}")
+                view = self._catch_up(connection, AnalyticsView(base, {}, base.snapshot), write=False)
+                if view.trade_count() != count:
+                    raise ValueError(f"snapshot has {view.trade_count()} trades, the table {count}")
+                if len(view.overlay) > ANALYTICS_SNAPSHOT_MAX_OVERLAY:
+                    view = self._write(view.rows(), view.snapshot, database)
+                return view
+            except FileNotFoundError:
+                logger.info("No analytics snapshot at %s; building one", self.path)
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("Rebuilding analytics snapshot %s: %s", self.path, exc)
+            return self._build(connection, latest, database)
+
+    def _build(self, connection: Connection, snapshot: changes.Snapshot, database: str) -> AnalyticsView:
+        """Scan ``trades`` (in the caller's repeatable-read transaction, at ``snapshot``) and write the file."""
+        trade = models.Trade
+        result = connection.execution_options(stream_results=True).execute(
+            _row_select().order_by(trade.exit_timestamp, trade.id)
+        )
+        rows = [_as_row(values) for values in result]
+        return self._write(rows, snapshot, database)
+
+    def _write(self, rows: List[Tuple[bytes, Row]], snapshot: changes.Snapshot, database: str) -> AnalyticsView:
+        write_file(self.path, {"snapshot": str(snapshot), "database": database}, build_arrays(rows))
+        return AnalyticsView(Base(*map_file(self.path)), {}, snapshot)
+
+    def _catch_up(
+        self, connection, view: AnalyticsView, unseen: Optional[Unseen] = None, write: bool = True
+    ) -> AnalyticsView:
+        latest, changed = _unseen_trades(connection, view.snapshot) if unseen is None else unseen
+        if not changed:
+            return view
+        if len(view.overlay) + len(changed) > ANALYTICS_SNAPSHOT_REBUILD_CHANGES:
+            raise ValueError(f"{len(changed)} trades changed since the snapshot")
+
+        overlay: Overlay = dict(view.overlay)
+        overlay.update((trade_id.bytes, None) for trade_id in changed)
+        for start in range(0, len(changed), _FETCH_CHUNK):
+            chunk = changed[start : start + _FETCH_CHUNK]
+            overlay.update(_as_row(values) for values in connection.execute(_row_select().where(models.Trade.id.in_(chunk))))
+        view = AnalyticsView(view.base, overlay, latest)
+        if write and len(overlay) > ANALYTICS_SNAPSHOT_MAX_OVERLAY:
+            view = self._compact(connection, view)
+        return view
+
+    def _compact(self, connection, view: AnalyticsView) -> AnalyticsView:
+        """Map a newer file another worker wrote, or write one from ``view``."""
+        try:
+            stamp = read_stamp(self.path)
+        except (OSError, ValueError):
+            stamp = {}
+        written = changes.Snapshot.parse(stamp["snapshot"]) if "snapshot" in stamp else None
+        if stamp.get("database") == view.base.database and written and written.xmax > view.base.snapshot.xmax:
+            newer = Base(*map_file(self.path))
+            return self._catch_up(connection, AnalyticsView(newer, {}, newer.snapshot), write=False)
+        return self._write(view.rows(), view.snapshot, view.base.database)
+
+
+snapshot = AnalyticsSnapshot()
@@ -0,0 +1,186 @@
+"""Change feed: a commit-ordered log of writes to trades, accounts, strategies and tags.
+
+Every ORM commit that adds, modifies or deletes one of these entities appends a row per
+entity to ``change_log``; deletes are recorded as tombstones. A trade's balance ledger entry
+also marks its account as changed, since the account's live balance moved. Clients keep a
+replica in sync by polling ``GET /api/changes?since=<seq>`` with the last ``seq`` they saw.
+
+Writers take no lock, so ``seq`` follows insert order rather than commit order: a transaction
+can commit rows with a smaller ``seq`` after a later one committed. Each row therefore also
+records the id of the transaction that wrote it (``xid``). Readers only hand out rows below
+their snapshot's ``xmin`` (the oldest transaction still running), ordered by ``(xid, seq)``:
+every transaction below that horizon has ended, so no row can later appear before a position a
+client has passed. In-process readers that hold a snapshot (the live dashboard, the analytics
+snapshot) instead keep it as a ``Snapshot`` and ask which logged transactions it did not see.
+
+Writers also queue the ``NOTIFY`` that other API workers invalidate their caches on (see
+``app.invalidation``). Bulk SQL writers outside the ORM
+(``app.recompute``) call ``record_changes_from`` themselves.
+"""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import BigInteger, Text, and_, cast, event, func, insert, literal, or_, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Select
+
+from . import invalidation, models
+
+TRACKED_ENTITIES = {
+    models.Trade: models.ChangeEntity.TRADE,
+    models.Account: models.ChangeEntity.ACCOUNT,
+    models.Strategy: models.ChangeEntity.STRATEGY,
+    models.Tag: models.ChangeEntity.TAG,
+}
+
+PendingChanges = Dict[Tuple[models.ChangeEntity, uuid.UUID], bool]
+
+_PENDING_KEY = "pending_changes"
+# Session.info keys holding the last ``seq`` written by the most recent commit, and the id of
+# the transaction it was written in.
+COMMITTED_SEQ_KEY = "committed_change_seq"
+COMMITTED_XID_KEY = "committed_change_xid"
+# Session.info key for ``[before, after]`` trade facts (``live.describe``) a writer adds before
+# committing; they ride along in the commit's notification.
+TRADE_FACTS_KEY = "notify_trade_facts"
+
+
+# ---------------------------------------------------------------------------
+# Visibility
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A parsed ``pg_snapshot`` (``xmin:xmax:xip,...``): which transactions a read saw.
+
+    Transactions below ``xmin`` had ended; those from ``xmax`` on had not started; ``xip``
+    lists the ones in between that were still running.
+    """
+
+    xmin: int
+    xmax: int
+    xip: FrozenSet[int] = frozenset()
+
+    @classmethod
+    def parse(cls, value: str) -> "Snapshot":
+        xmin, xmax, xip = value.split(":")
+        return cls(int(xmin), int(xmax), frozenset(int(xid) for xid in xip.split(",") if xid))
+
+    def __str__(self) -> str:
+        return f"{self.xmin}:{self.xmax}:{','.join(map(str, sorted(self.xip)))}"
+
+    def sees(self, xid: int) -> bool:
+        """Whether changes committed by transaction ``xid`` are visible in this snapshot."""
+        return xid < self.xmin or (xid < self.xmax and xid not in self.xip)
+
+    def unseen(self, xid: ColumnElement) -> ColumnElement:
+        """SQL counterpart of ``not sees(xid)``; a range on ``ix_change_log_xid_seq``."""
+        return and_(xid >= self.xmin, or_(xid >= self.xmax, xid.in_(sorted(self.xip))))
+
+
+def _as_bigint(xid8: ColumnElement) -> ColumnElement:
+    # xid8 has no cast to bigint; its text form is the same 64-bit number.
+    return cast(cast(xid8, Text), BigInteger)
+
+
+def horizon() -> ColumnElement:
+    """The statement's ``xmin``: every transaction with a smaller id has committed or aborted."""
+    return _as_bigint(func.pg_snapshot_xmin(func.pg_current_snapshot()))
+
+
+def snapshot_text() -> ColumnElement:
+    """The reading statement's snapshot, for ``Snapshot.parse``; in repeatable read, the transaction's."""
+    return cast(func.pg_current_snapshot(), Text)
+
+
+def current_snapshot(connection) -> Snapshot:
+    return Snapshot.parse(connection.execute(select(snapshot_text())).scalar_one())
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+
+def _notify(connection: Connection, payload: str) -> None:
+    """Queue the commit's notification; Postgres delivers it only if the transaction commits."""
+    connection.execute(
+        text("SELECT pg_notify(:channel, :payload)"), {"channel": invalidation.CHANGE_CHANNEL, "payload": payload}
+    )
+
+
+def record_changes(
+    connection: Connection, changes: PendingChanges, trade_facts: Optional[List[Any]] = None
+) -> Optional[Tuple[int, int]]:
+    """Append ``{(entity, id): deleted}`` to the change log in the caller's transaction.
+
+    Returns the last ``seq`` written and the id of the transaction.
+    """
+    if not changes:
+        return None
+    log = models.ChangeLogEntry
+    written = connection.execute(
+        insert(log).returning(log.seq, log.xid),
+        [
+            {"entity": entity, "entity_id": entity_id, "deleted": deleted}
+            for (entity, entity_id), deleted in changes.items()
+        ],
+    ).all()
+    seq, xid = max(seq for seq, _ in written), written[0].xid
+    _notify(connection, invalidation.notification_payload({entity for entity, _ in changes}, seq, xid, trade_facts))
+    return seq, xid
+
+
+def record_changes_from(connection: Connection, entity: models.ChangeEntity, ids: Select) -> None:
+    """Append an upsert for every id returned by ``ids`` (a single-column select)."""
+    _notify(connection, invalidation.notification_payload([entity]))
+    table = models.ChangeLogEntry.__table__
+    connection.execute(
+        insert(table).from_select(
+            ["entity", "entity_id"],
+            select(literal(entity, type_=table.c.entity.type), ids.subquery().c[0]),
+        )
+    )
+
+
+# ---------------------------------------------------------------------------
+# Session hooks
+# ---------------------------------------------------------------------------
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, _flush_context) -> None:
+    pending: PendingChanges = session.info.setdefault(_PENDING_KEY, {})
+    for obj in session.new:
+        if isinstance(obj, models.AccountLedgerEntry):
+            pending[(models.ChangeEntity.ACCOUNT, obj.account_id)] = False
+        elif type(obj) in TRACKED_ENTITIES:
+            pending[(TRACKED_ENTITIES[type(obj)], obj.id)] = False
+    for obj in session.dirty:
+        if type(obj) in TRACKED_ENTITIES and session.is_modified(obj):
+            pending[(TRACKED_ENTITIES[type(obj)], obj.id)] = False
+    for obj in session.deleted:
+        if type(obj) in TRACKED_ENTITIES:
+            pending[(TRACKED_ENTITIES[type(obj)], obj.id)] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _write_changes(session: Session) -> None:
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    trade_facts = session.info.pop(TRADE_FACTS_KEY, None)
+    written = record_changes(session.connection(), pending, trade_facts) if pending else None
+    session.info[COMMITTED_SEQ_KEY], session.info[COMMITTED_XID_KEY] = written or (None, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(TRADE_FACTS_KEY, None)
+
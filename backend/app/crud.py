@@ -1,18 +1,25 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from datetime import datetime
+from datetime import date, datetime, timezone
 from decimal import Decimal
-from typing import Dict, Iterable, List, Optional, Tuple
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import uuid
 
-from sqlalchemy import and_, func
+import numpy as np
+from sqlalchemy import ARRAY, Date, DateTime, Row, Text, and_, bindparam, cast, func, lambda_stmt, select, text, tuple_
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 from sqlalchemy.orm import Session, joinedload
 
-from . import models, schemas
-from .services import calculations
+from . import analytics_snapshot, changes, live, models, schemas
+from .query_budget import query_budget
+from .tracing import traced
+from .services import calculations, fixed_point
+from .services.totals import TradeTotals
 
 DECIMAL_ZERO = Decimal("0")
+EPOCH = date(1970, 1, 1)
 
 
 # ---------------------------------------------------------------------------
@@ -29,6 +36,7 @@ def _unique_sequence(values: Iterable[str]) -> List[str]:
     return list(seen.keys())
 
 
+@traced()
 def _ensure_account(db: Session, account_id: uuid.UUID) -> models.Account:
     account = db.get(models.Account, account_id)
     if not account:
@@ -36,6 +44,7 @@ def _ensure_account(db: Session, account_id: uuid.UUID) -> models.Account:
     return account
 
 
+@traced()
 def _ensure_strategy(db: Session, strategy_id: uuid.UUID) -> models.Strategy:
     strategy = db.get(models.Strategy, strategy_id)
     if not strategy:
@@ -43,13 +52,26 @@ def _ensure_strategy(db: Session, strategy_id: uuid.UUID) -> models.Strategy:
     return strategy
 
 
+@traced()
+@query_budget(1)
 def _get_or_create_tags(db: Session, tag_names: Iterable[str]) -> List[models.Tag]:
-    tags: List[models.Tag] = []
+    """Tags matching ``tag_names`` case-insensitively, creating missing ones; one lookup for all."""
+    requested: Dict[str, str] = {}
     for tag_name in _unique_sequence(tag_names):
         normalized_tag = tag_name.strip()
-        if not normalized_tag:
-            continue
-        tag = db.query(models.Tag).filter(models.Tag.name.ilike(normalized_tag)).first()
+        if normalized_tag:
+            requested.setdefault(normalized_tag.lower(), normalized_tag)
+    if not requested:
+        return []
+
+    existing: Dict[str, models.Tag] = {}
+    matches = db.query(models.Tag).filter(func.lower(models.Tag.name).in_(list(requested)))
+    for tag in matches.order_by(models.Tag.created_at):
+        existing.setdefault(tag.name.lower(), tag)
+
+    tags: List[models.Tag] = []
+    for key, normalized_tag in requested.items():
+        tag = existing.get(key)
         if not tag:
             tag = models.Tag(name=normalized_tag, type="custom")
             db.add(tag)
@@ -79,15 +101,88 @@ def _apply_trade_filters(
     if direction:
         query = query.filter(models.Trade.direction == direction)
     if start_date:
-        query = query.filter(models.Trade.entry_timestamp >= start_date)
+        # Trades never exit before they enter, so the extra exit_timestamp bound is redundant
+        # for results but lets Postgres prune exit-month partitions.
+        query = query.filter(models.Trade.entry_timestamp >= start_date, models.Trade.exit_timestamp >= start_date)
     if end_date:
         query = query.filter(models.Trade.exit_timestamp <= end_date)
     return query
 
 
-def _update_account_balance(account: models.Account, delta: Decimal) -> None:
-    current = account.current_balance or account.initial_balance
-    account.current_balance = current + delta
+def _apply_trade_filter_lambdas(
+    stmt: StatementLambdaElement,
+    *,
+    symbol: Optional[str] = None,
+    strategy_id: Optional[uuid.UUID] = None,
+    account_id: Optional[uuid.UUID] = None,
+    session: Optional[models.TradeSession] = None,
+    direction: Optional[models.TradeDirection] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> StatementLambdaElement:
+    """Lambda-statement twin of ``_apply_trade_filters`` for the hot trade queries.
+
+    Every filter is its own lambda, so each filter combination has a stable cache key and
+    SQLAlchemy reuses the compiled SQL, only extracting the new bound values per request.
+    """
+    if symbol:
+        stmt += lambda s: s.where(models.Trade.symbol == symbol)
+    if strategy_id:
+        stmt += lambda s: s.where(models.Trade.strategy_id == strategy_id)
+    if account_id:
+        stmt += lambda s: s.where(models.Trade.account_id == account_id)
+    if session:
+        stmt += lambda s: s.where(models.Trade.session == session)
+    if direction:
+        stmt += lambda s: s.where(models.Trade.direction == direction)
+    if start_date:
+        stmt += lambda s: s.where(models.Trade.entry_timestamp >= start_date, models.Trade.exit_timestamp >= start_date)
+    if end_date:
+        stmt += lambda s: s.where(models.Trade.exit_timestamp <= end_date)
+    return stmt
+
+
+def _announce_trade_change(db: Session, before: Optional[List], trade: models.Trade) -> None:
+    """Describe the change in the commit's notification, for other workers' live dashboards."""
+    # Flushed first so that a reassigned strategy shows up in ``strategy_id``.
+    db.flush()
+    after = live.describe(trade)
+    # An empty list still tells listeners that the commit moved no dashboard figures.
+    described = db.info.setdefault(changes.TRADE_FACTS_KEY, [])
+    if before != after:
+        described.append([before, after])
+
+
+@traced()
+def _publish_trade_change(db: Session, before: Optional[live.TradeFacts], trade: models.Trade) -> None:
+    """Push a committed trade change to live dashboard subscribers, if there are any."""
+    if live.hub.active:
+        live.hub.publish(
+            db.info.get(changes.COMMITTED_SEQ_KEY),
+            db.info.get(changes.COMMITTED_XID_KEY),
+            before,
+            live.TradeFacts.from_trade(trade),
+        )
+
+
+@traced()
+def _journal_balance(
+    db: Session,
+    account_id: uuid.UUID,
+    amount: Decimal,
+    kind: models.LedgerEntryKind,
+    *,
+    occurred_at: datetime,
+    trade_id: Optional[uuid.UUID] = None,
+) -> None:
+    """Append a balance change; the account row itself is never read or locked here."""
+    if amount == DECIMAL_ZERO:
+        return
+    db.add(
+        models.AccountLedgerEntry(
+            account_id=account_id, trade_id=trade_id, kind=kind, amount=amount, occurred_at=occurred_at
+        )
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -95,6 +190,7 @@ def _update_account_balance(account: models.Account, delta: Decimal) -> None:
 # ---------------------------------------------------------------------------
 
 
+@traced()
 def create_strategy(db: Session, payload: schemas.StrategyCreate) -> models.Strategy:
     strategy = models.Strategy(
         name=payload.name.strip(),
@@ -114,14 +210,17 @@ def create_strategy(db: Session, payload: schemas.StrategyCreate) -> models.Stra
     return strategy
 
 
+@traced()
 def list_strategies(db: Session) -> List[models.Strategy]:
     return db.query(models.Strategy).order_by(models.Strategy.name.asc()).all()
 
 
+@traced()
 def get_strategy(db: Session, strategy_id: uuid.UUID) -> Optional[models.Strategy]:
     return db.get(models.Strategy, strategy_id)
 
 
+@traced()
 def update_strategy(db: Session, strategy_id: uuid.UUID, payload: schemas.StrategyUpdate) -> models.Strategy:
     strategy = _ensure_strategy(db, strategy_id)
 
@@ -137,6 +236,7 @@ def update_strategy(db: Session, strategy_id: uuid.UUID, payload: schemas.Strate
     return strategy
 
 
+@traced()
 def delete_strategy(db: Session, strategy_id: uuid.UUID) -> None:
     strategy = _ensure_strategy(db, strategy_id)
     has_trades = db.query(models.Trade.id).filter(models.Trade.strategy_id == strategy_id).first()
@@ -151,15 +251,14 @@ def delete_strategy(db: Session, strategy_id: uuid.UUID) -> None:
 # ---------------------------------------------------------------------------
 
 
+@traced()
 def create_account(db: Session, payload: schemas.AccountCreate) -> models.Account:
-    current_balance = payload.current_balance if payload.current_balance is not None else payload.initial_balance
-
     account = models.Account(
         name=payload.name.strip(),
         type=payload.type,
         broker_platform=payload.broker_platform,
         initial_balance=payload.initial_balance,
-        current_balance=current_balance,
+        compacted_balance=payload.initial_balance,
         commission_split_percent=payload.commission_split_percent,
         max_daily_drawdown=payload.max_daily_drawdown,
         max_overall_drawdown=payload.max_overall_drawdown,
@@ -171,25 +270,57 @@ def create_account(db: Session, payload: schemas.AccountCreate) -> models.Accoun
         notes=payload.notes,
     )
     db.add(account)
+    db.flush()
+    if payload.current_balance is not None:
+        _journal_balance(
+            db,
+            account.id,
+            payload.current_balance - payload.initial_balance,
+            models.LedgerEntryKind.ADJUSTMENT,
+            occurred_at=datetime.now(timezone.utc),
+        )
     db.commit()
     db.refresh(account)
     return account
 
 
+@traced()
 def list_accounts(db: Session) -> List[models.Account]:
     return db.query(models.Account).order_by(models.Account.name.asc()).all()
 
 
+@traced()
 def get_account(db: Session, account_id: uuid.UUID) -> Optional[models.Account]:
     return db.get(models.Account, account_id)
 
 
+@traced()
 def update_account(db: Session, account_id: uuid.UUID, payload: schemas.AccountUpdate) -> models.Account:
-    account = _ensure_account(db, account_id)
+    # The row lock makes concurrent edits of one account take turns, so a balance set by one
+    # is the base the next adjustment is measured from.
+    account = (
+        db.query(models.Account).filter(models.Account.id == account_id).with_for_update().populate_existing().first()
+    )
+    if not account:
+        raise ValueError("Account not found")
     update_data = payload.model_dump(exclude_unset=True)
     if "name" in update_data and update_data["name"]:
         update_data["name"] = update_data["name"].strip()
 
+    # Setting the balance records the difference as an adjustment instead of overwriting it.
+    target_balance = update_data.pop("current_balance", None)
+    if target_balance is not None:
+        # Re-read once the lock is held: a locking statement that had to wait still computes
+        # the pending ledger sum from the snapshot it started with.
+        db.refresh(account, ["current_balance"])
+        _journal_balance(
+            db,
+            account.id,
+            target_balance - account.current_balance,
+            models.LedgerEntryKind.ADJUSTMENT,
+            occurred_at=datetime.now(timezone.utc),
+        )
+
     for field, value in update_data.items():
         setattr(account, field, value)
 
@@ -198,6 +329,7 @@ def update_account(db: Session, account_id: uuid.UUID, payload: schemas.AccountU
     return account
 
 
+@traced()
 def delete_account(db: Session, account_id: uuid.UUID) -> None:
     account = _ensure_account(db, account_id)
     has_trades = db.query(models.Trade.id).filter(models.Trade.account_id == account_id).first()
@@ -212,6 +344,7 @@ def delete_account(db: Session, account_id: uuid.UUID) -> None:
 # ---------------------------------------------------------------------------
 
 
+@traced()
 def create_trade(db: Session, payload: schemas.TradeCreate) -> models.Trade:
     account = _ensure_account(db, payload.account_id)
     strategy = _ensure_strategy(db, payload.strategy_id)
@@ -253,23 +386,29 @@ def create_trade(db: Session, payload: schemas.TradeCreate) -> models.Trade:
 
     trade.tags = _get_or_create_tags(db, payload.tag_names)
 
-    _update_account_balance(account, pnl)
-
     db.add(trade)
+    db.flush()
+    _journal_balance(
+        db, account.id, pnl, models.LedgerEntryKind.TRADE, occurred_at=trade.exit_timestamp, trade_id=trade.id
+    )
+    _announce_trade_change(db, None, trade)
     db.commit()
     db.refresh(trade)
+    _publish_trade_change(db, None, trade)
     return trade
 
 
+@traced()
 def get_trade(db: Session, trade_id: uuid.UUID) -> Optional[models.Trade]:
-    return (
-        db.query(models.Trade)
+    stmt = lambda_stmt(
+        lambda: select(models.Trade)
         .options(joinedload(models.Trade.strategy), joinedload(models.Trade.account), joinedload(models.Trade.tags))
-        .filter(models.Trade.id == trade_id)
-        .first()
+        .where(models.Trade.id == trade_id)
     )
+    return db.execute(stmt).unique().scalars().first()
 
 
+@traced()
 def list_trades(
     db: Session,
     *,
@@ -283,11 +422,57 @@ def list_trades(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
 ) -> List[models.Trade]:
-    query = (
-        db.query(models.Trade)
+    stmt = lambda_stmt(
+        lambda: select(models.Trade)
         .options(joinedload(models.Trade.strategy), joinedload(models.Trade.account), joinedload(models.Trade.tags))
         .order_by(models.Trade.exit_timestamp.desc())
     )
+    stmt = _apply_trade_filter_lambdas(
+        stmt,
+        symbol=symbol,
+        strategy_id=strategy_id,
+        account_id=account_id,
+        session=session,
+        direction=direction,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    stmt += lambda s: s.offset(skip).limit(limit)
+    return list(db.execute(stmt).unique().scalars())
+
+
+def _load_by_ids(db: Session, model, ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, object]:
+    unique_ids = set(ids)
+    if not unique_ids:
+        return {}
+    return {row.id: row for row in db.query(model).filter(model.id.in_(unique_ids)).all()}
+
+
+@traced()
+def list_trades_normalized(
+    db: Session,
+    *,
+    skip: int,
+    limit: int,
+    symbol: Optional[str] = None,
+    strategy_id: Optional[uuid.UUID] = None,
+    account_id: Optional[uuid.UUID] = None,
+    session: Optional[models.TradeSession] = None,
+    direction: Optional[models.TradeDirection] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> Tuple[
+    List[schemas.NormalizedTrade],
+    Dict[uuid.UUID, models.Account],
+    Dict[uuid.UUID, models.Strategy],
+    Dict[uuid.UUID, models.Tag],
+]:
+    """Return a page of trades plus each referenced account, strategy and tag exactly once.
+
+    Related rows are fetched with one ``IN`` query per entity type rather than joined onto
+    every trade row.
+    """
+    query = db.query(models.Trade).order_by(models.Trade.exit_timestamp.desc())
     query = _apply_trade_filters(
         query,
         symbol=symbol,
@@ -298,9 +483,82 @@ def list_trades(
         start_date=start_date,
         end_date=end_date,
     )
-    return query.offset(skip).limit(limit).all()
+    return _normalize_trades(db, query.offset(skip).limit(limit).all())
+
+
+@traced()
+def _normalize_trades(
+    db: Session, trades: List[models.Trade]
+) -> Tuple[
+    List[schemas.NormalizedTrade],
+    Dict[uuid.UUID, models.Account],
+    Dict[uuid.UUID, models.Strategy],
+    Dict[uuid.UUID, models.Tag],
+]:
+    if not trades:
+        return [], {}, {}, {}
+
+    tag_ids_by_trade: Dict[uuid.UUID, List[uuid.UUID]] = defaultdict(list)
+    tag_links = (
+        db.query(models.trade_tags.c.trade_id, models.trade_tags.c.tag_id)
+        .filter(models.trade_tags.c.trade_id.in_([trade.id for trade in trades]))
+        .all()
+    )
+    for trade_id, tag_id in tag_links:
+        tag_ids_by_trade[trade_id].append(tag_id)
+
+    normalized: List[schemas.NormalizedTrade] = []
+    for trade in trades:
+        item = schemas.NormalizedTrade.model_validate(trade)
+        item.tag_ids = tag_ids_by_trade.get(trade.id, [])
+        normalized.append(item)
+
+    accounts = _load_by_ids(db, models.Account, (trade.account_id for trade in trades))
+    strategies = _load_by_ids(db, models.Strategy, (trade.strategy_id for trade in trades))
+    tags = _load_by_ids(db, models.Tag, (tag_id for _, tag_id in tag_links))
+    return normalized, accounts, strategies, tags
 
 
+def stream_trade_rows(
+    db: Session,
+    *,
+    chunk_size: int = 1000,
+    symbol: Optional[str] = None,
+    strategy_id: Optional[uuid.UUID] = None,
+    account_id: Optional[uuid.UUID] = None,
+    session: Optional[models.TradeSession] = None,
+    direction: Optional[models.TradeDirection] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> Iterator[Row]:
+    """Yield flat trade rows through a server-side cursor, ``chunk_size`` rows per fetch.
+
+    Tags are aggregated in SQL into a ``|``-separated ``tags`` column so no ORM objects or
+    relationship collections are held in memory.
+    """
+    tag_names = (
+        select(func.string_agg(models.Tag.name, "|"))
+        .select_from(models.trade_tags.join(models.Tag, models.Tag.id == models.trade_tags.c.tag_id))
+        .where(models.trade_tags.c.trade_id == models.Trade.id)
+        .scalar_subquery()
+    )
+    stmt = select(*models.Trade.__table__.columns, tag_names.label("tags")).order_by(
+        models.Trade.exit_timestamp.asc(), models.Trade.id.asc()
+    )
+    stmt = _apply_trade_filters(
+        stmt,
+        symbol=symbol,
+        strategy_id=strategy_id,
+        account_id=account_id,
+        session=session,
+        direction=direction,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    yield from db.execute(stmt.execution_options(yield_per=chunk_size))
+
+
+@traced()
 def get_trade_count(
     db: Session,
     *,
@@ -312,9 +570,9 @@ def get_trade_count(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
 ) -> int:
-    query = db.query(func.count(models.Trade.id))
-    query = _apply_trade_filters(
-        query,
+    stmt = lambda_stmt(lambda: select(func.count(models.Trade.id)))
+    stmt = _apply_trade_filter_lambdas(
+        stmt,
         symbol=symbol,
         strategy_id=strategy_id,
         account_id=account_id,
@@ -323,24 +581,34 @@ def get_trade_count(
         start_date=start_date,
         end_date=end_date,
     )
-    return query.scalar() or 0
+    return db.execute(stmt).scalar() or 0
 
 
+@traced()
 def update_trade(db: Session, trade_id: uuid.UUID, payload: schemas.TradeUpdate) -> models.Trade:
-    trade = db.query(models.Trade).filter(models.Trade.id == trade_id).first()
+    # The row lock makes concurrent edits of one trade take turns, so each reverses the ledger
+    # entry the previous one journaled rather than the same original PnL.
+    trade = (
+        db.query(models.Trade).filter(models.Trade.id == trade_id).with_for_update().populate_existing().first()
+    )
     if not trade:
         raise ValueError("Trade not found")
 
-    original_account = trade.account
+    original_account_id = trade.account_id
     original_pnl = trade.pnl
+    original_exit = trade.exit_timestamp
+    original_facts = live.TradeFacts.from_trade(trade, with_name=False)
+    original_described = live.describe(trade)
 
     update_data = payload.model_dump(exclude_unset=True, by_alias=True)
 
     if "strategy_id" in update_data and update_data["strategy_id"]:
         trade.strategy = _ensure_strategy(db, update_data.pop("strategy_id"))
 
+    account_id = original_account_id
     if "account_id" in update_data and update_data["account_id"]:
         trade.account = _ensure_account(db, update_data.pop("account_id"))
+        account_id = trade.account.id
 
     confirmations = update_data.pop("confirmations", None)
     if confirmations is not None:
@@ -384,143 +652,361 @@ def update_trade(db: Session, trade_id: uuid.UUID, payload: schemas.TradeUpdate)
     if trade.confirmations is not None:
         trade.confirmations_count = len(trade.confirmations)
 
-    if original_account.id == trade.account.id:
-        _update_account_balance(trade.account, pnl - original_pnl)
-    else:
-        _update_account_balance(original_account, -original_pnl)
-        _update_account_balance(trade.account, pnl)
+    # Replace the trade's ledger contribution: reverse the old entry, then journal the new one.
+    if (original_account_id, original_pnl, original_exit) != (account_id, pnl, trade.exit_timestamp):
+        _journal_balance(
+            db,
+            original_account_id,
+            -original_pnl,
+            models.LedgerEntryKind.TRADE,
+            occurred_at=original_exit,
+            trade_id=trade.id,
+        )
+        _journal_balance(
+            db, account_id, pnl, models.LedgerEntryKind.TRADE, occurred_at=trade.exit_timestamp, trade_id=trade.id
+        )
 
+    _announce_trade_change(db, original_described, trade)
     db.commit()
     db.refresh(trade)
+    _publish_trade_change(db, original_facts, trade)
     return trade
 
 
+# ---------------------------------------------------------------------------
+# Balance ledger
+# ---------------------------------------------------------------------------
+
+
+@traced()
+def compact_balance_ledger(db: Session) -> int:
+    """Fold pending ledger entries into the accounts' compacted balances; returns entries folded.
+
+    One statement marks the entries and adds them up, so it is safe against concurrent writers
+    (entries committed meanwhile stay pending) and against concurrent compactions.
+    """
+    folded = db.execute(
+        text(
+            """
+            WITH folded AS (
+                UPDATE account_ledger SET compacted = true WHERE compacted IS false
+                RETURNING account_id, amount
+            ), totals AS (
+                SELECT account_id, sum(amount) AS amount, count(*) AS entries FROM folded GROUP BY account_id
+            )
+            UPDATE accounts SET current_balance = accounts.current_balance + totals.amount
+            FROM totals WHERE accounts.id = totals.account_id
+            RETURNING totals.entries
+            """
+        )
+    ).scalars()
+    total = sum(folded)
+    db.commit()
+    return total
+
+
+@traced()
+def get_balance_history(db: Session, account_id: uuid.UUID) -> List[schemas.BalancePoint]:
+    """End-of-day balances from the ledger, starting at the initial balance."""
+    account = _ensure_account(db, account_id)
+    day = func.date(models.AccountLedgerEntry.occurred_at)
+    rows = db.execute(
+        select(day, func.sum(models.AccountLedgerEntry.amount))
+        .where(models.AccountLedgerEntry.account_id == account_id)
+        .group_by(day)
+        .order_by(day)
+    ).all()
+    balance = account.initial_balance
+    points: List[schemas.BalancePoint] = []
+    for entry_day, amount in rows:
+        balance += amount
+        points.append(schemas.BalancePoint(date=entry_day.isoformat(), balance=balance))
+    return points
+
+
+@traced()
+def reconcile_account(db: Session, account_id: uuid.UUID) -> schemas.BalanceReconciliation:
+    """Compare the live balance with the full ledger, and the journaled trade PnL with the trades."""
+    account = _ensure_account(db, account_id)
+    entry = models.AccountLedgerEntry
+    is_trade = entry.kind.in_([models.LedgerEntryKind.TRADE, models.LedgerEntryKind.CORRECTION])
+    journaled, adjustments, pending = db.execute(
+        select(
+            func.coalesce(func.sum(entry.amount).filter(is_trade), 0),
+            func.coalesce(func.sum(entry.amount).filter(~is_trade), 0),
+            func.count().filter(entry.compacted.is_(False)),
+        ).where(entry.account_id == account_id)
+    ).one()
+    # Each trade's entry is its PnL rounded to cents, as the ledger stores it.
+    trade_pnl = db.execute(
+        select(func.coalesce(func.sum(func.round(models.Trade.pnl, 2)), 0)).where(models.Trade.account_id == account_id)
+    ).scalar_one()
+
+    ledger_balance = account.initial_balance + journaled + adjustments
+    return schemas.BalanceReconciliation(
+        account_id=account.id,
+        current_balance=account.current_balance,
+        ledger_balance=ledger_balance,
+        trade_pnl=trade_pnl,
+        journaled_trade_pnl=journaled,
+        adjustments=adjustments,
+        pending_entries=pending,
+        balanced=account.current_balance == ledger_balance and trade_pnl == journaled,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Change feed
+# ---------------------------------------------------------------------------
+
+
+@traced()
+def list_changes(db: Session, *, since: int, limit: int) -> schemas.ChangeFeed:
+    """Current state of every entity changed after ``since``, reading at most ``limit`` log rows.
+
+    Several changes to one entity within the page collapse into its latest state; entities
+    that no longer exist are reported as deleted. Rows are read in ``(xid, seq)`` order up to
+    the commit horizon (see ``app.changes``); ``since`` is the ``seq`` of the last row read.
+    """
+    log = models.ChangeLogEntry
+    since_xid = func.coalesce(select(log.xid).where(log.seq == since).scalar_subquery(), 0)
+    entries = db.execute(
+        select(log.seq, log.entity, log.entity_id, log.deleted)
+        .where(tuple_(log.xid, log.seq) > tuple_(since_xid, since), log.xid < changes.horizon())
+        .order_by(log.xid, log.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest: changes.PendingChanges = {}
+    for _, entity, entity_id, deleted in entries:
+        latest[(entity, entity_id)] = deleted
+    upserted: Dict[models.ChangeEntity, List[uuid.UUID]] = defaultdict(list)
+    deleted_ids: Dict[models.ChangeEntity, List[uuid.UUID]] = defaultdict(list)
+    for (entity, entity_id), deleted in latest.items():
+        (deleted_ids if deleted else upserted)[entity].append(entity_id)
+
+    loaded = {
+        entity: _load_by_ids(db, model, upserted[entity]) for model, entity in changes.TRACKED_ENTITIES.items()
+    }
+    for entity, ids in upserted.items():
+        deleted_ids[entity].extend(entity_id for entity_id in ids if entity_id not in loaded[entity])
+
+    trades, _, _, _ = _normalize_trades(db, list(loaded[models.ChangeEntity.TRADE].values()))
+    return schemas.ChangeFeed(
+        since=since,
+        next_since=entries[-1].seq if entries else since,
+        has_more=has_more,
+        trades=trades,
+        accounts=loaded[models.ChangeEntity.ACCOUNT],
+        strategies=loaded[models.ChangeEntity.STRATEGY],
+        tags=loaded[models.ChangeEntity.TAG],
+        deleted=schemas.DeletedEntities(
+            trades=deleted_ids[models.ChangeEntity.TRADE],
+            accounts=deleted_ids[models.ChangeEntity.ACCOUNT],
+            strategies=deleted_ids[models.ChangeEntity.STRATEGY],
+            tags=deleted_ids[models.ChangeEntity.TAG],
+        ),
+    )
+
+
 # ---------------------------------------------------------------------------
 # Dashboard & analytics helpers
 # ---------------------------------------------------------------------------
 
 
+def _micros(column):
+    """A ``Numeric(18, 6)`` column as exact integer micro-units, so aggregations never build Decimals."""
+    return fixed_point.scaled_column(column)
+
+
+@traced()
 def get_kpis(db: Session) -> schemas.KPIsResponse:
-    trades = db.query(models.Trade).all()
-    if not trades:
-        return schemas.KPIsResponse(
-            total_pnl=Decimal("0"),
-            win_rate=0.0,
-            total_trades=0,
-            winning_trades=0,
-            losing_trades=0,
-            average_win=Decimal("0"),
-            average_loss=Decimal("0"),
-            profit_factor=0.0,
+    view = analytics_snapshot.snapshot.current(db)
+    if view is not None:
+        return view.kpis()
+    pnls: List[int] = db.execute(select(_micros(models.Trade.pnl))).scalars().all()
+    return TradeTotals.from_rows((pnl, None) for pnl in pnls).kpis()
+
+
+@traced()
+def get_trade_totals(db: Session) -> Tuple[changes.Snapshot, int, List[live.TotalsRow]]:
+    """Dashboard totals per strategy and exit day, with the snapshot they were read in.
+
+    All are read in one repeatable-read transaction, so the totals contain exactly the trade
+    changes of the transactions the snapshot sees. The highest change-log ``seq`` visible is
+    returned for clients' reference.
+    """
+    db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    as_of, seq = db.execute(
+        select(changes.snapshot_text(), func.coalesce(func.max(models.ChangeLogEntry.seq), 0))
+    ).one()
+
+    day = func.date(models.Trade.exit_timestamp)
+    rows = db.execute(
+        select(models.Trade.strategy_id, models.Strategy.name, day, *_trade_sums())
+        .join(models.Strategy, models.Strategy.id == models.Trade.strategy_id)
+        .group_by(models.Trade.strategy_id, models.Strategy.name, day)
+    ).all()
+    return changes.Snapshot.parse(as_of), seq, [
+        (strategy_id, name, trade_day.isoformat(), TradeTotals.from_sums(values))
+        for strategy_id, name, trade_day, *values in rows
+    ]
+
+
+@traced()
+def resolve_trade_facts(db: Session, described: List[Optional[List]]) -> Optional[List[Optional[live.TradeFacts]]]:
+    """Facts another worker ``live.describe``d, with exit days and strategy names read here.
+
+    Days come from ``date()`` in this database session, as in ``get_trade_totals``. Returns
+    ``None`` when a strategy no longer exists.
+    """
+    present = [facts for facts in described if facts is not None]
+    if not present:
+        return [None] * len(described)
+    exit_time = func.unnest(bindparam("exit_times", sorted({facts[1] for facts in present}), ARRAY(Text)))
+    exit_time = exit_time.column_valued("exit_time")
+    days = dict(db.execute(select(exit_time, cast(func.date(cast(exit_time, DateTime(timezone=True))), Text))).all())
+    strategy_ids = {uuid.UUID(facts[0]) for facts in present}
+    names = dict(
+        db.execute(select(models.Strategy.id, models.Strategy.name).where(models.Strategy.id.in_(strategy_ids))).all()
+    )
+    if len(names) < len(strategy_ids):
+        return None
+    resolved: List[Optional[live.TradeFacts]] = []
+    for facts in described:
+        if facts is None:
+            resolved.append(None)
+            continue
+        strategy_id = uuid.UUID(facts[0])
+        resolved.append(
+            live.TradeFacts(
+                strategy_id=strategy_id,
+                day=days[facts[1]],
+                pnl=facts[2],
+                r_multiple=facts[3],
+                strategy_name=names[strategy_id],
+            )
         )
+    return resolved
 
-    total_trades = len(trades)
-    wins = [t for t in trades if t.pnl > DECIMAL_ZERO]
-    losses = [t for t in trades if t.pnl < DECIMAL_ZERO]
-
-    total_pnl = sum((t.pnl for t in trades), start=DECIMAL_ZERO)
-    total_wins = sum((t.pnl for t in wins), start=DECIMAL_ZERO)
-    total_losses = sum((t.pnl for t in losses), start=DECIMAL_ZERO)
-
-    average_win = total_wins / len(wins) if wins else DECIMAL_ZERO
-    average_loss = total_losses / len(losses) if losses else DECIMAL_ZERO
-
-    profit_factor = float(total_wins / abs(total_losses)) if total_losses != DECIMAL_ZERO else float("inf")
-    win_rate = len(wins) / total_trades if total_trades else 0.0
-
-    return schemas.KPIsResponse(
-        total_pnl=total_pnl,
-        win_rate=win_rate,
-        total_trades=total_trades,
-        winning_trades=len(wins),
-        losing_trades=len(losses),
-        average_win=average_win,
-        average_loss=average_loss,
-        profit_factor=profit_factor,
+
+def _trade_sums() -> Tuple:
+    """Aggregates over trades in ``TradeTotals.__slots__`` order, for ``TradeTotals.from_sums``."""
+    pnl = _micros(models.Trade.pnl)
+    r_multiple = _micros(models.Trade.r_multiple)
+    return (
+        func.count(),
+        func.count().filter(pnl > 0),
+        func.count().filter(pnl < 0),
+        func.sum(pnl),
+        func.sum(pnl).filter(pnl > 0),
+        func.sum(pnl).filter(pnl < 0),
+        func.count(r_multiple),
+        func.sum(r_multiple),
+        func.count().filter(r_multiple > 0),
+        func.sum(r_multiple).filter(r_multiple > 0),
+        func.count().filter(r_multiple < 0),
+        func.sum(r_multiple).filter(r_multiple < 0),
     )
 
 
+@traced()
+def get_equity_curve_points(db: Session) -> List[Dict[str, object]]:
+    """Equity curve as plain dicts shaped like ``schemas.EquityCurvePoint``, built from two columns."""
+    view = analytics_snapshot.snapshot.current(db)
+    if view is not None:
+        return view.equity_curve_points()
+    rows = db.execute(
+        select(models.Trade.exit_timestamp, _micros(models.Trade.pnl)).order_by(models.Trade.exit_timestamp.asc())
+    ).all()
+    return _equity_curve(rows)
+
+
+def _equity_curve(rows: Iterable[Tuple[datetime, int]]) -> List[Dict[str, object]]:
+    """Points for ``(exit_timestamp, pnl micros)`` rows in exit order."""
+    cumulative = 0
+    points: List[Dict[str, object]] = []
+    for exit_timestamp, pnl in rows:
+        cumulative += pnl
+        points.append({"date": exit_timestamp.strftime("%Y-%m-%d"), "cumulative_pnl": fixed_point.from_micros(cumulative)})
+    return points
+
+
+@traced()
+def get_equity_curve_columns(db: Session) -> Tuple[np.ndarray, np.ndarray]:
+    """The equity curve as two arrays: exit days since the epoch (int32) and cumulative PnL micros (int64)."""
+    view = analytics_snapshot.snapshot.current(db)
+    if view is not None:
+        return view.equity_curve_columns()
+    exit_day = func.date(models.Trade.exit_timestamp, type_=Date) - EPOCH
+    rows = db.execute(select(exit_day, _micros(models.Trade.pnl)).order_by(models.Trade.exit_timestamp.asc())).all()
+    columns = np.fromiter(chain.from_iterable(rows), np.int64, 2 * len(rows)).reshape(len(rows), 2)
+    return columns[:, 0].astype(np.int32), np.cumsum(columns[:, 1])
+
+
+@traced()
 def get_equity_curve(db: Session) -> List[schemas.EquityCurvePoint]:
-    trades = db.query(models.Trade).order_by(models.Trade.exit_timestamp.asc()).all()
-    cumulative = DECIMAL_ZERO
-    curve: List[schemas.EquityCurvePoint] = []
-    for trade in trades:
-        cumulative += trade.pnl
-        curve.append(
-            schemas.EquityCurvePoint(
-                date=trade.exit_timestamp.strftime("%Y-%m-%d"),
-                cumulative_pnl=cumulative,
-            )
-        )
-    return curve
+    return [schemas.EquityCurvePoint(**point) for point in get_equity_curve_points(db)]
 
 
+@traced()
 def get_performance_by_tag(db: Session) -> List[schemas.PerformanceByTag]:
-    trades = (
-        db.query(models.Trade)
-        .join(models.Trade.tags)
-        .options(joinedload(models.Trade.tags))
-        .all()
-    )
-    if not trades:
-        return []
+    return _tag_performance(db)
 
-    accumulator: Dict[str, Dict[str, Decimal]] = defaultdict(lambda: {"pnl": DECIMAL_ZERO, "wins": DECIMAL_ZERO, "count": 0})
 
-    for trade in trades:
-        for tag in trade.tags:
-            stats = accumulator[tag.name]
-            stats["pnl"] += trade.pnl
-            stats["count"] += 1
-            if trade.pnl > DECIMAL_ZERO:
-                stats["wins"] += 1
-
-    result: List[schemas.PerformanceByTag] = []
-    for tag_name, stats in accumulator.items():
-        win_rate = float(stats["wins"] / stats["count"]) if stats["count"] else 0.0
-        result.append(
-            schemas.PerformanceByTag(
-                tag_name=tag_name,
-                total_pnl=stats["pnl"],
-                win_rate=win_rate,
-                trade_count=stats["count"],
-            )
+def _tag_performance(db: Session, **filters) -> List[schemas.PerformanceByTag]:
+    pnl = _micros(models.Trade.pnl)
+    stmt = (
+        select(models.Tag.name, func.sum(pnl), func.count().filter(pnl > 0), func.count())
+        .select_from(models.Trade)
+        .join(models.Trade.tags)
+        .group_by(models.Tag.name)
+        .order_by(models.Tag.name)
+    )
+    return [
+        schemas.PerformanceByTag(
+            tag_name=tag_name,
+            total_pnl=fixed_point.from_micros(total_pnl),
+            win_rate=float(Decimal(wins) / count),
+            trade_count=count,
         )
-    return result
+        for tag_name, total_pnl, wins, count in db.execute(_apply_trade_filters(stmt, **filters)).all()
+    ]
 
 
-def _summarize_trades(trades: List[models.Trade]) -> Tuple[int, float, float, float, float, float, Decimal]:
-    if not trades:
-        return 0, 0.0, 0.0, 0.0, 0.0, 0.0, DECIMAL_ZERO
-
-    total_trades = len(trades)
-    total_pnl = sum((t.pnl for t in trades), start=DECIMAL_ZERO)
-    wins = [t for t in trades if t.pnl > DECIMAL_ZERO]
-    losses = [t for t in trades if t.pnl < DECIMAL_ZERO]
-
-    win_rate = len(wins) / total_trades if total_trades else 0.0
-
-    gross_profit = sum((t.pnl for t in wins), start=DECIMAL_ZERO)
-    gross_loss = sum((t.pnl for t in losses), start=DECIMAL_ZERO)
-    profit_factor = float(gross_profit / abs(gross_loss)) if gross_loss != DECIMAL_ZERO else float("inf")
-
-    r_values = [t.r_multiple for t in trades if t.r_multiple is not None]
-    if r_values:
-        total_r = float(sum(r_values))
-        average_r = total_r / len(r_values)
-        win_r = [val for val in r_values if val > 0]
-        loss_r = [val for val in r_values if val < 0]
-        avg_win_r = sum(win_r) / len(win_r) if win_r else 0.0
-        avg_loss_r = sum(loss_r) / len(loss_r) if loss_r else 0.0
-        expectancy_r = win_rate * avg_win_r - (1 - win_rate) * abs(avg_loss_r)
-    else:
-        total_r = 0.0
-        average_r = 0.0
-        expectancy_r = 0.0
-
-    return total_trades, win_rate, expectancy_r, profit_factor, total_r, average_r, total_pnl
+def _grouped_trade_totals(
+    db: Session,
+    group_column,
+    *,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    session: Optional[models.TradeSession],
+    direction: Optional[models.TradeDirection],
+) -> Dict[uuid.UUID, TradeTotals]:
+    if start_date is None and end_date is None and session is None and direction is None:
+        view = analytics_snapshot.snapshot.current(db)
+        if view is not None:
+            return view.strategy_totals if group_column is models.Trade.strategy_id else view.account_totals
+
+    query = db.query(group_column, _micros(models.Trade.pnl), _micros(models.Trade.r_multiple)).filter(
+        group_column.isnot(None)
+    )
+    query = _apply_trade_filters(
+        query,
+        session=session,
+        direction=direction,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    grouped: Dict[uuid.UUID, TradeTotals] = defaultdict(TradeTotals)
+    for group_id, pnl, r_multiple in query.all():
+        grouped[group_id].add(pnl, r_multiple)
+    return grouped
 
 
+@traced()
 def get_strategy_dashboard(
     db: Session,
     *,
@@ -529,31 +1015,22 @@ def get_strategy_dashboard(
     session: Optional[models.TradeSession] = None,
     direction: Optional[models.TradeDirection] = None,
 ) -> List[schemas.StrategyDashboardSummary]:
-    base_query = (
-        db.query(models.Trade)
-        .options(joinedload(models.Trade.strategy))
-        .filter(models.Trade.strategy_id.isnot(None))
-    )
-    base_query = _apply_trade_filters(
-        base_query,
-        session=session,
-        direction=direction,
-        start_date=start_date,
-        end_date=end_date,
+    grouped = _grouped_trade_totals(
+        db, models.Trade.strategy_id, start_date=start_date, end_date=end_date, session=session, direction=direction
     )
-    trades = base_query.all()
+    return _strategy_summaries(db, grouped)
 
-    grouped: Dict[uuid.UUID, List[models.Trade]] = defaultdict(list)
-    for trade in trades:
-        grouped[trade.strategy_id].append(trade)
+
+def _strategy_summaries(db: Session, grouped: Dict[uuid.UUID, TradeTotals]) -> List[schemas.StrategyDashboardSummary]:
+    strategies = _load_by_ids(db, models.Strategy, grouped)
 
     summaries: List[schemas.StrategyDashboardSummary] = []
-    for strategy_id, strat_trades in grouped.items():
-        total_trades, win_rate, expectancy_r, profit_factor, total_r, average_r, total_pnl = _summarize_trades(strat_trades)
+    for strategy_id, totals in grouped.items():
+        total_trades, win_rate, expectancy_r, profit_factor, total_r, average_r, total_pnl = totals.summary()
         summaries.append(
             schemas.StrategyDashboardSummary(
                 strategy_id=strategy_id,
-                strategy_name=strat_trades[0].strategy.name,
+                strategy_name=strategies[strategy_id].name,
                 trades=total_trades,
                 win_rate=win_rate,
                 expectancy_r=expectancy_r,
@@ -566,6 +1043,7 @@ def get_strategy_dashboard(
     return summaries
 
 
+@traced()
 def get_account_dashboard(
     db: Session,
     *,
@@ -574,31 +1052,22 @@ def get_account_dashboard(
     session: Optional[models.TradeSession] = None,
     direction: Optional[models.TradeDirection] = None,
 ) -> List[schemas.AccountDashboardSummary]:
-    base_query = (
-        db.query(models.Trade)
-        .options(joinedload(models.Trade.account))
-        .filter(models.Trade.account_id.isnot(None))
+    grouped = _grouped_trade_totals(
+        db, models.Trade.account_id, start_date=start_date, end_date=end_date, session=session, direction=direction
     )
-    base_query = _apply_trade_filters(
-        base_query,
-        session=session,
-        direction=direction,
-        start_date=start_date,
-        end_date=end_date,
-    )
-    trades = base_query.all()
+    return _account_summaries(db, grouped)
 
-    grouped: Dict[uuid.UUID, List[models.Trade]] = defaultdict(list)
-    for trade in trades:
-        grouped[trade.account_id].append(trade)
+
+def _account_summaries(db: Session, grouped: Dict[uuid.UUID, TradeTotals]) -> List[schemas.AccountDashboardSummary]:
+    accounts = _load_by_ids(db, models.Account, grouped)
 
     summaries: List[schemas.AccountDashboardSummary] = []
-    for account_id, account_trades in grouped.items():
-        total_trades, win_rate, expectancy_r, profit_factor, total_r, average_r, total_pnl = _summarize_trades(account_trades)
+    for account_id, totals in grouped.items():
+        total_trades, win_rate, expectancy_r, profit_factor, total_r, average_r, total_pnl = totals.summary()
         summaries.append(
             schemas.AccountDashboardSummary(
                 account_id=account_id,
-                account_name=account_trades[0].account.name,
+                account_name=accounts[account_id].name,
                 trades=total_trades,
                 win_rate=win_rate,
                 expectancy_r=expectancy_r,
@@ -606,7 +1075,53 @@ def get_account_dashboard(
                 total_r=total_r,
                 average_r=average_r,
                 total_pnl=total_pnl,
-                current_balance=account_trades[0].account.current_balance,
+                current_balance=accounts[account_id].current_balance,
             )
         )
     return summaries
+
+
+@traced()
+def get_dashboard_bundle(
+    db: Session,
+    *,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    session: Optional[models.TradeSession] = None,
+    direction: Optional[models.TradeDirection] = None,
+) -> Dict[str, object]:
+    """Every dashboard view for the same filters, as a plain dict shaped like ``schemas.DashboardBundle``.
+
+    Strategy and account totals come from one ``GROUPING SETS`` aggregate, and the equity curve
+    from one ordered pass over two columns; the KPIs are the strategy totals merged. Unfiltered,
+    the analytics snapshot serves everything but the tags.
+    """
+    filters = dict(start_date=start_date, end_date=end_date, session=session, direction=direction)
+    view = analytics_snapshot.snapshot.current(db) if not any(filters.values()) else None
+    if view is not None:
+        equity_curve = view.equity_curve_points()
+        by_strategy, by_account = view.strategy_totals, view.account_totals
+    else:
+        trade = models.Trade
+        grouped = select(trade.strategy_id, trade.account_id, *_trade_sums()).group_by(
+            func.grouping_sets(trade.strategy_id, trade.account_id)
+        )
+        by_strategy, by_account = {}, {}
+        for strategy_id, account_id, *sums in db.execute(_apply_trade_filters(grouped, **filters)):
+            if strategy_id is not None:
+                by_strategy[strategy_id] = TradeTotals.from_sums(sums)
+            else:
+                by_account[account_id] = TradeTotals.from_sums(sums)
+        points = select(trade.exit_timestamp, _micros(trade.pnl)).order_by(trade.exit_timestamp.asc())
+        equity_curve = _equity_curve(db.execute(_apply_trade_filters(points, **filters)))
+
+    overall = TradeTotals()
+    for totals in by_strategy.values():
+        overall.merge(totals)
+    return {
+        "kpis": overall.kpis().model_dump(),
+        "equity_curve": equity_curve,
+        "performance_by_tag": [summary.model_dump() for summary in _tag_performance(db, **filters)],
+        "strategies": [summary.model_dump() for summary in _strategy_summaries(db, by_strategy)],
+        "accounts": [summary.model_dump() for summary in _account_summaries(db, by_account)],
+    }
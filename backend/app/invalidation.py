@@ -0,0 +1,174 @@
+"""Cross-process invalidation: tell every API worker which kinds of entity other writers changed.
+
+Each commit that appends to the change log (see ``app.changes``) also sends a Postgres
+``NOTIFY`` on ``CHANGE_CHANNEL``, queued right after its change-log rows. Its payload names
+the entity kinds written (``trade``, ``account``, ``strategy``, ``tag``), the sending process,
+and the commit's last change-log ``seq`` and transaction id. Trade writes through the ORM also
+list each trade's facts before and after (``trades``), so other workers' live dashboards apply
+them as deltas. Postgres delivers it only if the transaction commits.
+
+Every worker runs one ``ChangeListener`` thread with its own ``LISTEN`` connection. The thread
+drains whatever notifications have arrived, merges them and calls each registered handler once
+with ``(entities, local, messages)``:
+
+* ``entities`` is the set of ``models.ChangeEntity`` written, or ``None`` when anything may
+  have changed. That happens after the listen connection was lost, since notifications sent
+  meanwhile are gone.
+* ``local`` is true when every merged write came from this process. In-process caches usually
+  applied those already.
+* ``messages`` are the decoded payloads, in the order they arrived.
+
+Handlers run on the listener thread, so a slow one delays the next batch but never a request.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import select
+import threading
+import uuid
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+from . import models
+
+CHANGE_CHANNEL = "journal_changes"
+# Run the listener in API processes; tools and tests that never cache can turn it off.
+CHANGE_LISTENER = os.getenv("CHANGE_LISTENER", "true").lower() in {"1", "true", "yes"}
+# Longest wait before a lost listen connection is retried.
+CHANGE_LISTENER_MAX_BACKOFF = float(os.getenv("CHANGE_LISTENER_MAX_BACKOFF", "30"))
+
+logger = logging.getLogger(__name__)
+
+# Identifies notifications sent by this process.
+PROCESS_TOKEN = uuid.uuid4().hex
+
+# Postgres rejects payloads of 8000 bytes or more.
+_MAX_PAYLOAD = 7900
+
+Entities = Optional[FrozenSet[models.ChangeEntity]]
+Handler = Callable[[Entities, bool, List[Dict[str, Any]]], None]
+
+
+def notification_payload(
+    entities: Iterable[models.ChangeEntity],
+    seq: Optional[int] = None,
+    xid: Optional[int] = None,
+    trades: Optional[List[Any]] = None,
+) -> str:
+    message: Dict[str, Any] = {"origin": PROCESS_TOKEN, "entities": sorted({entity.value for entity in entities})}
+    if seq is not None:
+        message.update(seq=seq, xid=xid)
+    if trades is not None:
+        payload = json.dumps({**message, "trades": trades})
+        if len(payload.encode()) <= _MAX_PAYLOAD:
+            return payload
+    # Without ``trades``, listeners treat the commit's trades as unknown.
+    return json.dumps(message)
+
+
+def merge_payloads(payloads: List[str]) -> Tuple[Entities, bool, List[Dict[str, Any]]]:
+    """One ``(entities, local, messages)`` for a batch of payloads; unreadable ones invalidate everything."""
+    entities: Optional[set] = set()
+    local = True
+    messages: List[Dict[str, Any]] = []
+    for payload in payloads:
+        try:
+            message = json.loads(payload)
+            kinds = {models.ChangeEntity(value) for value in message["entities"]}
+        except (ValueError, KeyError, TypeError):
+            return None, False, []
+        local = local and message.get("origin") == PROCESS_TOKEN
+        entities |= kinds
+        messages.append(message)
+    return frozenset(entities), local, messages
+
+
+class ChangeListener:
+    """Background thread turning ``CHANGE_CHANNEL`` notifications into handler calls."""
+
+    def __init__(self, engine: Engine, poll_seconds: float = 1.0) -> None:
+        self.engine = engine
+        self.poll_seconds = poll_seconds
+        self._handlers: List[Handler] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.listening = threading.Event()
+
+    def subscribe(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.engine.dialect.driver != "psycopg2":
+            driver = self.engine.dialect.driver
+            logger.warning("Change notifications need psycopg2, not %s; workers will miss each other's writes", driver)
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="change-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.listening.clear()
+
+    def dispatch(self, entities: Entities, local: bool, messages: Optional[List[Dict[str, Any]]] = None) -> None:
+        for handler in self._handlers:
+            try:
+                handler(entities, local, messages or [])
+            except Exception:
+                logger.exception("Change handler %r failed", handler)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        connected_before = False
+        while not self._stop.is_set():
+            try:
+                connection = self._connect()
+            except Exception:
+                logger.warning("Cannot listen for changes; retrying in %.0fs", backoff, exc_info=True)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, CHANGE_LISTENER_MAX_BACKOFF)
+                continue
+            backoff = 1.0
+            try:
+                if connected_before:
+                    # Notifications sent while disconnected were lost.
+                    self.dispatch(None, False)
+                connected_before = True
+                self.listening.set()
+                self._listen(connection)
+            except Exception:
+                logger.warning("Lost the change listener connection", exc_info=True)
+            finally:
+                self.listening.clear()
+                connection.close()
+
+    def _connect(self):
+        pooled = self.engine.raw_connection()
+        # A LISTEN session must stay open; take it out of the pool for good.
+        pooled.detach()
+        connection = pooled.dbapi_connection
+        # End the transaction a pre-ping may have opened; autocommit cannot change inside one.
+        connection.rollback()
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+        return connection
+
+    def _listen(self, connection) -> None:
+        while not self._stop.is_set():
+            if select.select([connection], [], [], self.poll_seconds) == ([], [], []):
+                continue
+            connection.poll()
+            payloads = [notify.payload for notify in connection.notifies]
+            connection.notifies.clear()
+            if payloads:
+                self.dispatch(*merge_payloads(payloads))
@@ -0,0 +1,243 @@
+"""Live dashboard: push KPI, equity-curve and per-strategy deltas to WebSocket subscribers.
+
+While anyone is subscribed, the hub keeps the dashboard's additive totals in memory, loaded
+once from the database together with the snapshot they were read in. Each committed
+trade create/update (including CSV imports) calls ``hub.publish`` with the trade's old and new
+facts. The hub moves that one trade between totals, builds one delta message and hands the
+same encoded text to every subscriber, so a write costs the same however many dashboards are open.
+
+Messages are JSON objects with a ``type`` and a change-log ``seq``:
+
+* ``snapshot`` (first message, and again whenever the totals are reloaded): ``seq`` is the
+  highest one the totals include; ``kpis``, daily
+  ``equity_curve`` points (``date``/``cumulative_pnl``) and ``strategies`` summaries; it
+  replaces everything the client had
+* ``delta``: the last ``seq`` of the commit, the new ``kpis``, ``equity_curve`` changes and the updated summary of each
+  strategy touched (``trades == 0`` means the strategy has no trades left). A curve change
+  ``date``/``pnl_change``/``trades`` adds ``pnl_change`` to every point on or after ``date``,
+  inserting the day if it is missing; ``trades`` is the day's remaining trade count, and the
+  point is dropped when it reaches 0
+
+A subscriber that falls ``LIVE_QUEUE_SIZE`` messages behind is disconnected and should reconnect
+for a fresh snapshot. State is per process. A trade write in another worker reaches the hub
+through ``app.invalidation``: its notification carries the trade's ``describe``d facts before
+and after, and ``app.main`` publishes them like a local write. Changes notified without facts
+(``app.recompute``, strategy renames, deletes) make the hub ``reload`` its totals and send every
+subscriber a new snapshot.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import changes, models, schemas
+from .services.fixed_point import decimal_to_micros, from_micros, to_micros
+from .services.serialization import dumps
+from .services.totals import TradeTotals
+
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+
+# (strategy_id, strategy_name, day, totals of that strategy's trades exiting that day)
+TotalsRow = Tuple[uuid.UUID, str, str, TradeTotals]
+# (snapshot the totals were read in, highest change-log seq they include, totals)
+Loader = Callable[[], Tuple[changes.Snapshot, int, List[TotalsRow]]]
+
+
+@dataclass(frozen=True)
+class TradeFacts:
+    """What the dashboard needs to know about one trade, in micro-units."""
+
+    strategy_id: uuid.UUID
+    day: str
+    pnl: int
+    r_multiple: Optional[int]
+    strategy_name: Optional[str] = field(default=None, compare=False)
+
+    @classmethod
+    def from_trade(cls, trade: models.Trade, with_name: bool = True) -> "TradeFacts":
+        """Facts from loaded columns; ``with_name`` also reads the strategy (possibly a query)."""
+        return cls(
+            strategy_id=trade.strategy_id,
+            day=trade.exit_timestamp.strftime("%Y-%m-%d"),
+            pnl=to_micros(trade.pnl),
+            r_multiple=None if trade.r_multiple is None else to_micros(trade.r_multiple),
+            strategy_name=trade.strategy.name if with_name else None,
+        )
+
+
+def describe(trade: models.Trade) -> List[Any]:
+    """JSON-ready facts of a trade for other workers: strategy id, exit time, PnL and R in micro-units.
+
+    The exit day and strategy name are left to the receiving worker (``crud.resolve_trade_facts``),
+    since an exit time that has not been written yet is still in the client's UTC offset. Figures
+    are rounded like their columns, as they may not have been reloaded since the flush.
+    """
+    r_multiple = None if trade.r_multiple is None else decimal_to_micros(Decimal(trade.r_multiple))
+    return [str(trade.strategy_id), trade.exit_timestamp.isoformat(), decimal_to_micros(Decimal(trade.pnl)), r_multiple]
+
+
+class _DashboardState:
+    def __init__(self, as_of: changes.Snapshot, seq: int, rows: List[TotalsRow]) -> None:
+        self.as_of = as_of
+        self.seq = seq
+        self.overall = TradeTotals()
+        self.strategies: Dict[uuid.UUID, TradeTotals] = defaultdict(TradeTotals)
+        self.strategy_names: Dict[uuid.UUID, str] = {}
+        self.daily_trades: Dict[str, int] = defaultdict(int)
+        self.daily_pnl: Dict[str, int] = defaultdict(int)
+        for strategy_id, strategy_name, day, totals in rows:
+            self.overall.merge(totals)
+            self.strategies[strategy_id].merge(totals)
+            self.strategy_names[strategy_id] = strategy_name
+            self.daily_trades[day] += totals.trades
+            self.daily_pnl[day] += totals.pnl
+
+    def _strategy_summary(self, strategy_id: uuid.UUID) -> Dict[str, Any]:
+        trades, win_rate, expectancy_r, profit_factor, total_r, average_r, total_pnl = self.strategies[
+            strategy_id
+        ].summary()
+        return schemas.StrategyDashboardSummary(
+            strategy_id=strategy_id,
+            strategy_name=self.strategy_names[strategy_id],
+            trades=trades,
+            win_rate=win_rate,
+            expectancy_r=expectancy_r,
+            profit_factor=profit_factor,
+            total_r=total_r,
+            average_r=average_r,
+            total_pnl=total_pnl,
+        ).model_dump()
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        curve = []
+        for day in sorted(self.daily_trades):
+            cumulative += self.daily_pnl[day]
+            curve.append({"date": day, "cumulative_pnl": from_micros(cumulative)})
+        return {
+            "type": "snapshot",
+            "seq": self.seq,
+            "kpis": self.overall.kpis().model_dump(),
+            "equity_curve": curve,
+            "strategies": [self._strategy_summary(strategy_id) for strategy_id in self.strategies],
+        }
+
+    def apply(self, seq: Optional[int], before: Optional[TradeFacts], after: Optional[TradeFacts]) -> Dict[str, Any]:
+        """Move one trade from ``before`` to ``after`` and describe what changed."""
+        curve_changes: Dict[str, int] = defaultdict(int)
+        count_changes: Dict[str, int] = defaultdict(int)
+        touched: List[uuid.UUID] = []
+        for facts, sign in ((before, -1), (after, 1)):
+            if facts is None:
+                continue
+            self.overall.add(facts.pnl, facts.r_multiple, sign)
+            self.strategies[facts.strategy_id].add(facts.pnl, facts.r_multiple, sign)
+            if facts.strategy_name is not None:
+                self.strategy_names[facts.strategy_id] = facts.strategy_name
+            self.daily_trades[facts.day] += sign
+            self.daily_pnl[facts.day] += sign * facts.pnl
+            curve_changes[facts.day] += sign * facts.pnl
+            count_changes[facts.day] += sign
+            if facts.strategy_id not in touched:
+                touched.append(facts.strategy_id)
+
+        summaries = [self._strategy_summary(strategy_id) for strategy_id in touched]
+        for strategy_id in touched:
+            if not self.strategies[strategy_id].trades:
+                del self.strategies[strategy_id]
+        curve = [
+            {"date": day, "pnl_change": from_micros(change), "trades": self.daily_trades[day]}
+            for day, change in sorted(curve_changes.items())
+            if change or count_changes[day]
+        ]
+        for day in curve_changes:
+            if not self.daily_trades[day]:
+                del self.daily_trades[day], self.daily_pnl[day]
+        return {
+            "type": "delta",
+            "seq": seq,
+            "kpis": self.overall.kpis().model_dump(),
+            "equity_curve": curve,
+            "strategies": summaries,
+        }
+
+
+class DashboardHub:
+    """Fan-out of dashboard deltas to subscribers' asyncio queues; ``publish`` is thread-safe."""
+
+    def __init__(self, queue_size: int = LIVE_QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._state: Optional[_DashboardState] = None
+
+    @property
+    def active(self) -> bool:
+        """Cheap pre-check for writers: no facts need to be gathered while nobody listens."""
+        return bool(self._subscribers)
+
+    def subscribe(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, load: Loader) -> None:
+        """Register ``queue`` and put a snapshot on it; blocking, call from a worker thread."""
+        with self._lock:
+            # Registered before loading: a commit that finds no subscribers is already in the load,
+            # and one that finds this queue waits for the lock and is then checked against ``as_of``.
+            self._subscribers[queue] = loop
+            if self._state is None:
+                try:
+                    self._state = _DashboardState(*load())
+                except BaseException:
+                    del self._subscribers[queue]
+                    raise
+            loop.call_soon_threadsafe(self._offer, queue, dumps(self._state.snapshot()).decode())
+
+    def reload(self, load: Loader) -> None:
+        """Rebuild the totals from the database and send subscribers a new snapshot; blocking."""
+        with self._lock:
+            if not self._subscribers:
+                return
+            self._state = _DashboardState(*load())
+            message = dumps(self._state.snapshot()).decode()
+            for queue, loop in self._subscribers.items():
+                loop.call_soon_threadsafe(self._offer, queue, message)
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.pop(queue, None)
+            if not self._subscribers:
+                self._state = None
+
+    def publish(
+        self, seq: Optional[int], xid: Optional[int], before: Optional[TradeFacts], after: Optional[TradeFacts]
+    ) -> None:
+        """Apply one committed trade change; ``seq`` and ``xid`` are from its change-log rows."""
+        if before == after or not self._subscribers:
+            return
+        with self._lock:
+            state = self._state
+            # Commits the loaded snapshot saw are already in the totals. ``seq`` cannot tell: it
+            # follows insert order, not commit order.
+            if state is None or (xid is not None and state.as_of.sees(xid)):
+                return
+            message = dumps(state.apply(seq, before, after)).decode()
+            for queue, loop in self._subscribers.items():
+                loop.call_soon_threadsafe(self._offer, queue, message)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: str) -> None:
+        if queue.full():
+            # Too far behind to catch up with deltas; ``None`` tells the endpoint to disconnect.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        else:
+            queue.put_nowait(message)
+
+
+hub = DashboardHub()
@@ -1,9 +1,129 @@
-from fastapi import FastAPI
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
+
+import anyio
+import anyio.to_thread
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from app import analytics_snapshot, crud, database, invalidation, live, metrics, models, partitioning, query_budget, tracing
+from app.routers import accounts, admin, changes, dashboard, strategies, trades
+
+# Routes that touch the database are plain ``def`` handlers: FastAPI runs them in this
+# threadpool so blocking SQLAlchemy calls never stall the event loop. By default it matches
+# the connection pool; more threads than connections would only queue on checkout.
+DB_POOL_CAPACITY = database.DB_POOL_SIZE + database.DB_MAX_OVERFLOW
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", str(DB_POOL_CAPACITY)))
+# How often pending balance ledger entries are folded into accounts; 0 disables compaction.
+LEDGER_COMPACTION_SECONDS = float(os.getenv("LEDGER_COMPACTION_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+# Writes by other processes that change the live dashboard's totals.
+LIVE_DASHBOARD_ENTITIES = frozenset({models.ChangeEntity.TRADE, models.ChangeEntity.STRATEGY})
+
+change_listener = invalidation.ChangeListener(database.engine)
+
+
+def _compact_balance_ledger() -> int:
+    db = database.SessionLocal()
+    try:
+        return crud.compact_balance_ledger(db)
+    finally:
+        db.close()
+
+
+def update_live_dashboard(entities: invalidation.Entities, local: bool, messages: List[Dict[str, Any]]) -> None:
+    """Apply other workers' trade changes to the live dashboard.
+
+    Notifications that describe their trades are published as deltas; any other change to
+    trades or strategies (``app.recompute``, a renamed strategy) reloads the totals.
+    """
+    if local or not live.hub.active or (entities is not None and entities.isdisjoint(LIVE_DASHBOARD_ENTITIES)):
+        return
+    remote = [
+        message
+        for message in messages
+        if message["origin"] != invalidation.PROCESS_TOKEN
+        and not LIVE_DASHBOARD_ENTITIES.isdisjoint(models.ChangeEntity(value) for value in message["entities"])
+    ]
+    db = database.SessionLocal()
+    try:
+        if entities is not None and all("trades" in message for message in remote):
+            trade_changes = [(message, pair) for message in remote for pair in message["trades"]]
+            resolved = crud.resolve_trade_facts(db, [facts for _, pair in trade_changes for facts in pair])
+            if resolved is not None:
+                for index, (message, _) in enumerate(trade_changes):
+                    live.hub.publish(message["seq"], message["xid"], resolved[2 * index], resolved[2 * index + 1])
+                return
+        live.hub.reload(lambda: crud.get_trade_totals(db))
+    finally:
+        db.close()
+
+
+change_listener.subscribe(update_live_dashboard)
+
+
+async def warm_analytics_snapshot() -> None:
+    try:
+        await anyio.to_thread.run_sync(analytics_snapshot.snapshot.warm, database.engine)
+    except Exception:
+        logger.exception("Loading the analytics snapshot failed; dashboards will load it on first use")
+
 
-from app.routers import accounts, dashboard, strategies, trades
+async def compact_balance_ledger_periodically(interval: float) -> None:
+    while True:
+        await anyio.sleep(interval)
+        try:
+            await anyio.to_thread.run_sync(_compact_balance_ledger)
+        except Exception:
+            logger.exception("Balance ledger compaction failed")
 
-app = FastAPI(title="Trading Journal API", version="2.0.0")
+
+def ensure_future_partitions() -> None:
+    """Create the coming months' trade partitions; of workers starting together, one does it."""
+    if partitioning.TRADES_PARTITIONING != "monthly":
+        return
+    with database.engine.begin() as connection:
+        # The others skip rather than queue: the first one's partitions serve them too.
+        if partitioning.is_partitioned(connection) and partitioning.try_lock_partitions(connection):
+            partitioning.ensure_future_partitions(connection)
+
+
+def check_threadpool_size() -> None:
+    if THREADPOOL_SIZE > DB_POOL_CAPACITY:
+        logger.warning(
+            "THREADPOOL_SIZE=%d exceeds the %d database connections (DB_POOL_SIZE + DB_MAX_OVERFLOW); "
+            "the extra threads wait up to DB_POOL_TIMEOUT for a connection",
+            THREADPOOL_SIZE,
+            DB_POOL_CAPACITY,
+        )
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    check_threadpool_size()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    ensure_future_partitions()
+    if invalidation.CHANGE_LISTENER:
+        change_listener.start()
+    try:
+        async with anyio.create_task_group() as tasks:
+            if analytics_snapshot.snapshot.enabled:
+                tasks.start_soon(warm_analytics_snapshot)
+            if LEDGER_COMPACTION_SECONDS > 0:
+                tasks.start_soon(compact_balance_ledger_periodically, LEDGER_COMPACTION_SECONDS)
+            yield
+            tasks.cancel_scope.cancel()
+    finally:
+        await anyio.to_thread.run_sync(change_listener.stop)
+
+
+app = FastAPI(title="Trading Journal API", version="2.0.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -14,11 +134,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+@app.middleware("http")
+async def mark_recent_writes(request: Request, call_next):
+    """Stamp successful writes so the client's next reads skip the (possibly lagging) replica."""
+    response = await call_next(request)
+    if database.read_replica_enabled() and request.method in WRITE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            database.LAST_WRITE_COOKIE,
+            str(time.time()),
+            max_age=max(int(database.DB_READ_YOUR_WRITES_SECONDS), 1),
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
+# Counts each request's SQL statements against its route's ``route_budget``.
+app.add_middleware(query_budget.QueryBudgetMiddleware)
+
+# Starts sampled traces; the root span covers every middleware but the metrics one.
+app.add_middleware(tracing.TracingMiddleware)
+
+# Outermost, so latency covers every other middleware.
+app.add_middleware(metrics.RequestMetricsMiddleware)
+
 # Include routers
 app.include_router(trades.router, prefix="/api", tags=["trades"])
 app.include_router(strategies.router, prefix="/api", tags=["strategies"])
 app.include_router(accounts.router, prefix="/api", tags=["accounts"])
 app.include_router(dashboard.router, prefix="/api", tags=["dashboard"])
+app.include_router(changes.router, prefix="/api", tags=["changes"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
 
 
 @app.get("/")
@@ -29,3 +178,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
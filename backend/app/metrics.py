@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import database
+
+# A request whose queries return more rows than this is logged as a warning; 0 disables it.
+METRICS_ROWS_WARNING = int(os.getenv("METRICS_ROWS_WARNING", "100000"))
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Dict[str, str]
+
+# Pool status key -> (metric name, type, help)
+_POOL_METRICS: List[Tuple[str, str, str, str]] = [
+    ("size", "db_pool_size", "gauge", "Configured number of persistent pool connections."),
+    ("checked_out", "db_pool_checked_out", "gauge", "Connections currently checked out of the pool."),
+    ("checked_in", "db_pool_checked_in", "gauge", "Idle connections currently held by the pool."),
+    ("overflow", "db_pool_overflow", "gauge", "Connections open beyond the pool size."),
+    ("max_overflow", "db_pool_max_overflow", "gauge", "Configured maximum overflow connections."),
+    ("checkouts_total", "db_pool_checkouts_total", "counter", "Connections handed out by the pool."),
+    (
+        "checkout_wait_seconds_total",
+        "db_pool_checkout_wait_seconds_total",
+        "counter",
+        "Time spent waiting for a pool connection.",
+    ),
+    (
+        "checkout_wait_seconds_max",
+        "db_pool_checkout_wait_seconds_max",
+        "gauge",
+        "Longest single wait for a pool connection.",
+    ),
+    (
+        "overflow_checkouts_total",
+        "db_pool_overflow_checkouts_total",
+        "counter",
+        "Checkouts made while the pool was in overflow.",
+    ),
+    ("checkout_timeouts_total", "db_pool_checkout_timeouts_total", "counter", "Checkouts that hit the pool timeout."),
+]
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return "{" + body + "}"
+
+
+def format_metric(name: str, metric_type: str, help_text: str, samples: Iterable[Tuple[Labels, float]]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return lines
+
+
+def engines() -> Dict[str, Engine]:
+    result = {"primary": database.engine}
+    if database.read_replica_enabled():
+        result["replica"] = database.read_engine
+    return result
+
+
+def pools() -> Dict[str, database.InstrumentedQueuePool]:
+    return {name: engine.pool for name, engine in engines().items()}
+
+
+def pool_metrics() -> List[str]:
+    statuses = {name: database.pool_status(pool) for name, pool in pools().items()}
+    lines: List[str] = []
+    for key, name, metric_type, help_text in _POOL_METRICS:
+        samples = [({"pool": pool_name}, status[key]) for pool_name, status in statuses.items()]
+        lines.extend(format_metric(name, metric_type, help_text, samples))
+    return lines
+
+
+def statement_cache_metrics() -> List[str]:
+    counts = database.statement_cache_stats.snapshot()
+    lines = format_metric(
+        "db_statement_cache_total",
+        "counter",
+        "Executed statements by compiled-statement cache outcome.",
+        [({"result": result}, count) for result, count in counts.items()],
+    )
+    lines += format_metric(
+        "db_statement_cache_hit_ratio",
+        "gauge",
+        "Share of cacheable statements served from the compiled-statement cache.",
+        [({}, database.statement_cache_stats.hit_ratio())],
+    )
+    lines += format_metric(
+        "db_statement_cache_entries",
+        "gauge",
+        "Compiled statements currently held in the engine cache.",
+        [({"pool": name}, len(engine._compiled_cache or ())) for name, engine in engines().items()],
+    )
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Per-route request metrics
+# ---------------------------------------------------------------------------
+
+
+class Histogram:
+    """Prometheus histogram with a fixed label set; ``observe`` is thread-safe."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], label_names: Sequence[str]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        # label values -> (per-bucket counts, last one for +Inf, sum)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, label_values: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            counts, total = self._series.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(values, list(counts), total[0]) for values, (counts, total) in sorted(self._series.items())]
+        for values, counts, total in series:
+            labels = dict(zip(self.label_names, values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': str(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter with a fixed label set; ``inc`` is thread-safe."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, label_values: Tuple[str, ...], amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            samples = [(dict(zip(self.label_names, values)), value) for values, value in sorted(self._values.items())]
+        return format_metric(self.name, "counter", self.help_text, samples)
+
+
+ROUTE_LABELS = ("method", "route")
+_SIZE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+http_requests = Counter("http_requests_total", "Completed HTTP requests.", ("method", "route", "status"))
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    ROUTE_LABELS,
+)
+http_request_db_duration = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL statements per request.",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    ROUTE_LABELS,
+)
+http_request_statements = Histogram(
+    "http_request_sql_statements", "SQL statements executed per request.", _SIZE_BUCKETS[:8], ROUTE_LABELS
+)
+http_request_rows = Histogram(
+    "http_request_sql_rows", "Rows returned by SQL statements per request.", _SIZE_BUCKETS, ROUTE_LABELS
+)
+http_response_size = Histogram(
+    "http_response_size_bytes",
+    "Response body size per request.",
+    (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+    ROUTE_LABELS,
+)
+REQUEST_METRICS = (
+    http_requests,
+    http_request_duration,
+    http_request_db_duration,
+    http_request_statements,
+    http_request_rows,
+    http_response_size,
+)
+
+
+class RequestStats:
+    """SQL work done on behalf of the current request."""
+
+    __slots__ = ("statements", "db_seconds", "rows")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+
+
+# Set per request by ``RequestMetricsMiddleware``; threadpool handlers run in a copy of the
+# request's context, so they see (and update) the same ``RequestStats``.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    if current_request.get() is not None:
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_request_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = current_request.get()
+    if stats is None or not conn.info.get("statement_started"):
+        return
+    stats.db_seconds += time.perf_counter() - conn.info["statement_started"].pop()
+    stats.statements += 1
+    # Server-side cursors report rows as they are fetched, not here.
+    if cursor.description is not None and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_statement_timer(exception_context) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("statement_started"):
+        connection.info["statement_started"].pop()
+
+
+def _route_label(scope: dict) -> str:
+    """The matched route template, so ``/api/trades/{trade_id}`` is one series, not one per trade."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording latency, SQL work and response size per route."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        response = {"status": 500, "bytes": 0}
+
+        async def send_and_measure(message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            current_request.reset(token)
+            self.record(scope, stats, time.perf_counter() - started, response["status"], response["bytes"])
+
+    @staticmethod
+    def record(scope: dict, stats: RequestStats, seconds: float, status: int, size: int) -> None:
+        labels = (scope["method"], _route_label(scope))
+        http_requests.inc((*labels, str(status)))
+        http_request_duration.observe(labels, seconds)
+        http_request_db_duration.observe(labels, stats.db_seconds)
+        http_request_statements.observe(labels, stats.statements)
+        http_request_rows.observe(labels, stats.rows)
+        http_response_size.observe(labels, size)
+        if METRICS_ROWS_WARNING and stats.rows > METRICS_ROWS_WARNING:
+            logger.warning(
+                "%s %s read %d rows in %d statements (%.3fs in SQL, %.3fs total)",
+                *labels,
+                stats.rows,
+                stats.statements,
+                stats.db_seconds,
+                seconds,
+            )
+
+
+def request_metrics() -> List[str]:
+    lines: List[str] = []
+    for metric in REQUEST_METRICS:
+        lines.extend(metric.render())
+    return lines
+
+
+def render_prometheus() -> str:
+    return "\n".join(pool_metrics() + statement_cache_metrics() + request_metrics()) + "\n"
@@ -12,9 +12,16 @@ from sqlalchemy import (
     Text,
     Enum as SqlEnum,
     Date,
+    Index,
+    BigInteger,
+    Boolean,
+    Identity,
+    false,
+    select,
+    text,
 )
 from sqlalchemy.dialects.postgresql import ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -44,12 +51,27 @@ class TradeSession(str, enum.Enum):
     ASIA = "Asia"
 
 
+class LedgerEntryKind(str, enum.Enum):
+    TRADE = "trade"
+    ADJUSTMENT = "adjustment"
+    CORRECTION = "correction"
+
+
+class ChangeEntity(str, enum.Enum):
+    TRADE = "trade"
+    ACCOUNT = "account"
+    STRATEGY = "strategy"
+    TAG = "tag"
+
+
 # Association table for many-to-many relationship between trades and tags
 trade_tags = Table(
     "trade_tags",
     Base.metadata,
     Column("trade_id", UUID(as_uuid=True), ForeignKey("trades.id", ondelete="CASCADE"), primary_key=True),
     Column("tag_id", UUID(as_uuid=True), ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    # The primary key covers lookups by trade_id; tag-side joins need their own index.
+    Index("ix_trade_tags_tag_id", "tag_id"),
 )
 
 
@@ -92,7 +114,8 @@ class Account(Base):
     )
     broker_platform = Column(String(120), nullable=True)
     initial_balance = Column(Numeric(15, 2), nullable=False)
-    current_balance = Column(Numeric(15, 2), nullable=False)
+    # Balance as of the last ledger compaction; ``current_balance`` (below) adds pending entries.
+    compacted_balance = Column("current_balance", Numeric(15, 2), nullable=False)
     commission_split_percent = Column(Numeric(5, 2), nullable=True)
     max_daily_drawdown = Column(Numeric(15, 2), nullable=True)
     max_overall_drawdown = Column(Numeric(15, 2), nullable=True)
@@ -110,6 +133,15 @@ class Account(Base):
 
 class Trade(Base):
     __tablename__ = "trades"
+    # Matched to the filters in crud._apply_trade_filters combined with the
+    # ``exit_timestamp DESC`` ordering used by trade listings.
+    __table_args__ = (
+        Index("ix_trades_exit_timestamp", "exit_timestamp"),
+        Index("ix_trades_entry_timestamp", "entry_timestamp"),
+        Index("ix_trades_account_id_exit_timestamp", "account_id", "exit_timestamp"),
+        Index("ix_trades_strategy_id_exit_timestamp", "strategy_id", "exit_timestamp"),
+        Index("ix_trades_symbol_exit_timestamp", "symbol", "exit_timestamp"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     symbol = Column(String(20), nullable=False)
@@ -183,3 +215,67 @@ class Tag(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     trades = relationship("Trade", secondary=trade_tags, back_populates="tags")
+
+
+class AccountLedgerEntry(Base):
+    """Append-only balance change for an account.
+
+    Trade writes only insert entries, so concurrent writers never update (or lock) the account
+    row. ``crud.compact_balance_ledger`` periodically folds pending entries into
+    ``Account.compacted_balance``; entries are kept for balance history and reconciliation.
+    """
+
+    __tablename__ = "account_ledger"
+    __table_args__ = (
+        Index("ix_account_ledger_account_id_occurred_at", "account_id", "occurred_at"),
+        Index("ix_account_ledger_pending", "account_id", postgresql_where=Column("compacted").is_(False)),
+    )
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    # No foreign key: trades may be partitioned, and reversals outlive edited trades.
+    trade_id = Column(UUID(as_uuid=True), nullable=True)
+    kind = Column(
+        SqlEnum(
+            LedgerEntryKind,
+            name="ledger_entry_kind_enum",
+            values_callable=lambda enum_cls: [e.value for e in enum_cls],
+        ),
+        nullable=False,
+    )
+    amount = Column(Numeric(15, 2), nullable=False)
+    occurred_at = Column(DateTime(timezone=True), nullable=False)
+    compacted = Column(Boolean, nullable=False, default=False, server_default=false())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# Live balance: compacted balance plus entries not yet folded in (served by ix_account_ledger_pending).
+Account.current_balance = column_property(
+    Account.compacted_balance
+    + select(func.coalesce(func.sum(AccountLedgerEntry.amount), 0))
+    .where(AccountLedgerEntry.account_id == Account.id, AccountLedgerEntry.compacted.is_(False))
+    .correlate_except(AccountLedgerEntry)
+    .scalar_subquery()
+)
+
+
+class ChangeLogEntry(Base):
+    """One committed write to a trade, account, strategy or tag (see ``app.changes``)."""
+
+    __tablename__ = "change_log"
+    __table_args__ = (Index("ix_change_log_xid_seq", "xid", "seq"),)
+
+    seq = Column(BigInteger, Identity(), primary_key=True)
+    # Id of the writing transaction, for ordering rows by commit (see ``app.changes.Snapshot``).
+    xid = Column(BigInteger, nullable=False, server_default=text("pg_current_xact_id()::text::bigint"))
+    entity = Column(
+        SqlEnum(
+            ChangeEntity,
+            name="change_entity_enum",
+            values_callable=lambda enum_cls: [e.value for e in enum_cls],
+        ),
+        nullable=False,
+    )
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false())
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
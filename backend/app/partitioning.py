@@ -0,0 +1,265 @@
+"""Optional monthly range partitioning of ``trades`` on ``exit_timestamp`` (Postgres only).
+
+Partitioning is switched on by running migrations with ``TRADES_PARTITIONING=monthly``.
+The partitioned table's primary key becomes ``(id, exit_timestamp)``, so
+``trade_tags.trade_id`` can no longer carry a foreign key to ``trades``; the ORM
+relationship keeps the association rows in step.
+
+Partitions are named ``trades_yYYYYmMM``. A ``trades_default`` partition catches rows
+outside the existing ranges, and creating a partition moves its rows out of the default
+first. Usage::
+
+    python -m app.partitioning ensure --months-ahead 6
+    python -m app.partitioning ensure --from 2019-01
+    python -m app.partitioning detach --month 2021-03
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+TRADES_PARTITIONING = os.getenv("TRADES_PARTITIONING", "none").lower()
+TRADES_PARTITION_MONTHS_AHEAD = int(os.getenv("TRADES_PARTITION_MONTHS_AHEAD", "3"))
+
+DEFAULT_PARTITION = "trades_default"
+# Advisory lock ("trades" in ASCII) serializing partition changes between processes.
+PARTITION_LOCK_KEY = 0x747261646573
+
+# Secondary indexes on trades; keep in sync with models.Trade.__table_args__.
+TRADE_INDEXES = {
+    "ix_trades_exit_timestamp": "exit_timestamp",
+    "ix_trades_entry_timestamp": "entry_timestamp",
+    "ix_trades_account_id_exit_timestamp": "account_id, exit_timestamp",
+    "ix_trades_strategy_id_exit_timestamp": "strategy_id, exit_timestamp",
+    "ix_trades_symbol_exit_timestamp": "symbol, exit_timestamp",
+}
+
+
+# ---------------------------------------------------------------------------
+# Month helpers
+# ---------------------------------------------------------------------------
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"trades_y{month.year:04d}m{month.month:02d}"
+
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+# ---------------------------------------------------------------------------
+# Introspection
+# ---------------------------------------------------------------------------
+
+
+def is_partitioned(connection: Connection) -> bool:
+    return bool(
+        connection.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'trades')"
+            )
+        ).scalar()
+    )
+
+
+def list_partitions(connection: Connection) -> List[str]:
+    return list(
+        connection.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits i "
+                "JOIN pg_class child ON child.oid = i.inhrelid "
+                "WHERE i.inhparent = 'trades'::regclass ORDER BY child.relname"
+            )
+        ).scalars()
+    )
+
+
+# ---------------------------------------------------------------------------
+# Partition maintenance
+# ---------------------------------------------------------------------------
+
+
+def lock_partitions(connection: Connection) -> None:
+    """Wait for other partition changes; the lock is held until the transaction ends."""
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+
+
+def try_lock_partitions(connection: Connection) -> bool:
+    """Like ``lock_partitions`` but returns ``False`` at once if another transaction holds the lock."""
+    return bool(connection.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY}).scalar())
+
+
+def create_partition(connection: Connection, month: date) -> bool:
+    """Create the partition for ``month``, moving any matching rows out of the default partition.
+
+    Returns ``False`` when the partition already exists. Concurrent callers are serialized,
+    so the one that waited finds the partition instead of failing to create it again.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    lock_partitions(connection)
+    if name in list_partitions(connection):
+        return False
+
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    in_range = f"exit_timestamp >= '{lower}' AND exit_timestamp < '{upper}'"
+    connection.execute(text(f"CREATE TABLE {name} (LIKE trades INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    if DEFAULT_PARTITION in list_partitions(connection):
+        connection.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+        connection.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+    connection.execute(text(f"ALTER TABLE trades ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+    return True
+
+
+def ensure_partitions(connection: Connection, first_month: date, last_month: date) -> List[str]:
+    created: List[str] = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if create_partition(connection, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_future_partitions(
+    connection: Connection, months_ahead: int = TRADES_PARTITION_MONTHS_AHEAD, today: Optional[date] = None
+) -> List[str]:
+    current = month_start(today or datetime.utcnow().date())
+    return ensure_partitions(connection, current, add_months(current, months_ahead))
+
+
+def detach_partition(connection: Connection, month: date) -> str:
+    """Detach a month from ``trades``, leaving a standalone table that can be archived or dropped."""
+    name = partition_name(month_start(month))
+    if name not in list_partitions(connection):
+        raise ValueError(f"Partition {name} not found")
+    connection.execute(text(f"ALTER TABLE trades DETACH PARTITION {name}"))
+    return name
+
+
+# ---------------------------------------------------------------------------
+# Conversion (used by the alembic migration)
+# ---------------------------------------------------------------------------
+
+
+def _create_trade_constraints(connection: Connection, primary_key: str) -> None:
+    connection.execute(text(f"ALTER TABLE trades ADD CONSTRAINT trades_pkey PRIMARY KEY ({primary_key})"))
+    connection.execute(
+        text(
+            "ALTER TABLE trades ADD CONSTRAINT trades_account_id_fkey "
+            "FOREIGN KEY (account_id) REFERENCES accounts (id) ON DELETE RESTRICT"
+        )
+    )
+    connection.execute(
+        text(
+            "ALTER TABLE trades ADD CONSTRAINT trades_strategy_id_fkey "
+            "FOREIGN KEY (strategy_id) REFERENCES strategies (id) ON DELETE RESTRICT"
+        )
+    )
+    for index_name, columns in TRADE_INDEXES.items():
+        connection.execute(text(f"CREATE INDEX {index_name} ON trades ({columns})"))
+
+
+def convert_to_partitioned(connection: Connection, months_ahead: int = TRADES_PARTITION_MONTHS_AHEAD) -> None:
+    """Rebuild ``trades`` as a monthly partitioned table, keeping every row."""
+    if is_partitioned(connection):
+        return
+
+    connection.execute(text("ALTER TABLE trade_tags DROP CONSTRAINT IF EXISTS trade_tags_trade_id_fkey"))
+    connection.execute(text("ALTER TABLE trades RENAME TO trades_unpartitioned"))
+    connection.execute(
+        text(
+            "CREATE TABLE trades (LIKE trades_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            "PARTITION BY RANGE (exit_timestamp)"
+        )
+    )
+    connection.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF trades DEFAULT"))
+
+    first, last = connection.execute(
+        text("SELECT min(exit_timestamp), max(exit_timestamp) FROM trades_unpartitioned")
+    ).one()
+    today = month_start(datetime.utcnow().date())
+    first_month = month_start(first.date()) if first else today
+    last_month = max(month_start(last.date()) if last else today, add_months(today, months_ahead))
+    ensure_partitions(connection, first_month, last_month)
+
+    connection.execute(text("INSERT INTO trades SELECT * FROM trades_unpartitioned"))
+    connection.execute(text("DROP TABLE trades_unpartitioned"))
+    _create_trade_constraints(connection, primary_key="id, exit_timestamp")
+
+
+def convert_to_plain(connection: Connection) -> None:
+    """Fold a partitioned ``trades`` table (attached partitions only) back into a single table."""
+    if not is_partitioned(connection):
+        return
+
+    connection.execute(text("ALTER TABLE trades RENAME TO trades_partitioned"))
+    connection.execute(
+        text("CREATE TABLE trades (LIKE trades_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    )
+    connection.execute(text("INSERT INTO trades SELECT * FROM trades_partitioned"))
+    connection.execute(text("DROP TABLE trades_partitioned CASCADE"))
+    _create_trade_constraints(connection, primary_key="id")
+    connection.execute(text("DELETE FROM trade_tags WHERE trade_id NOT IN (SELECT id FROM trades)"))
+    connection.execute(
+        text(
+            "ALTER TABLE trade_tags ADD CONSTRAINT trade_tags_trade_id_fkey "
+            "FOREIGN KEY (trade_id) REFERENCES trades (id) ON DELETE CASCADE"
+        )
+    )
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+
+def _parse_month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from .database import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.partitioning", description=__doc__.split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure = commands.add_parser("ensure", help="create missing monthly partitions")
+    ensure.add_argument("--months-ahead", type=int, default=TRADES_PARTITION_MONTHS_AHEAD)
+    ensure.add_argument("--from", dest="first_month", type=_parse_month, help="also backfill from YYYY-MM")
+
+    detach = commands.add_parser("detach", help="detach a month for archiving")
+    detach.add_argument("--month", type=_parse_month, required=True, help="YYYY-MM")
+
+    args = parser.parse_args(argv)
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            parser.error("trades is not partitioned; run migrations with TRADES_PARTITIONING=monthly")
+        if args.command == "ensure":
+            created = ensure_future_partitions(connection, args.months_ahead)
+            if args.first_month:
+                created += ensure_partitions(connection, args.first_month, month_start(datetime.utcnow().date()))
+            print(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+        else:
+            print(f"Detached {detach_partition(connection, args.month)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Query budgets: cap the SQL statements a route or ``crud`` function may emit, and spot N+1s.
+
+``query_budget(limit)`` works as a context manager or decorator; ``route_budget(limit)``
+declares a route's budget, which ``QueryBudgetMiddleware`` checks over the whole request,
+including lazy loads made while the response model is serialized. Savepoints and ``SET``
+statements are not counted.
+
+Over budget, a ``QueryBudgetExceeded`` is raised when ``QUERY_BUDGET_MODE`` is ``raise`` (the
+test suite's setting) and a warning is logged otherwise. Independently of any budget, every
+request logs a warning when one statement ran ``QUERY_REPEAT_WARNING`` or more times, the usual
+sign of a relationship being loaded once per row.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from collections import Counter
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .slow_queries import normalize_sql
+
+# ``raise`` turns an exceeded budget into an error; anything else only logs it.
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "warn")
+# Executions of one statement within a request that are reported as a likely N+1; 0 disables it.
+QUERY_REPEAT_WARNING = int(os.getenv("QUERY_REPEAT_WARNING", "10"))
+
+logger = logging.getLogger(__name__)
+
+_BOOKKEEPING = ("SET ", "SAVEPOINT ", "RELEASE SAVEPOINT ", "ROLLBACK TO SAVEPOINT ")
+
+F = TypeVar("F", bound=Callable)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Statements executed while this counter is active, by SQL text."""
+
+    __slots__ = ("statements", "by_statement")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.by_statement: Counter = Counter()
+
+    def record(self, statement: str) -> None:
+        self.statements += 1
+        self.by_statement[statement] += 1
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        if not self.by_statement:
+            return None, 0
+        return self.by_statement.most_common(1)[0]
+
+
+# Counters of the enclosing budgets; threadpool handlers run in a copy of the request's context
+# and so add to the same counters.
+_active: ContextVar[Tuple[QueryCounter, ...]] = ContextVar("query_budget_counters", default=())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    counters = _active.get()
+    if counters and not statement.startswith(_BOOKKEEPING):
+        for counter in counters:
+            counter.record(statement)
+
+
+def check(counter: QueryCounter, limit: Optional[int], name: str, strict: Optional[bool] = None) -> None:
+    """Warn about a likely N+1 and enforce ``limit`` for work counted under ``name``."""
+    statement, repeats = counter.most_repeated()
+    if QUERY_REPEAT_WARNING and repeats >= QUERY_REPEAT_WARNING:
+        logger.warning("%s ran one statement %d times, a likely N+1: %s", name, repeats, normalize_sql(statement))
+    if limit is None or counter.statements <= limit:
+        return
+    message = f"{name} executed {counter.statements} SQL statements, over its budget of {limit}"
+    if strict if strict is not None else QUERY_BUDGET_MODE == "raise":
+        listing = "\n".join(f"  {count} x {normalize_sql(sql)}" for sql, count in counter.by_statement.most_common())
+        raise QueryBudgetExceeded(f"{message}:\n{listing}")
+    logger.warning(message)
+
+
+class query_budget(ContextDecorator):
+    """Count the statements run inside the block or decorated function and check ``limit``.
+
+    ``strict`` overrides ``QUERY_BUDGET_MODE``; tests pin exact query counts with
+    ``query_budget(n, strict=True)``.
+    """
+
+    def __init__(self, limit: Optional[int], name: Optional[str] = None, *, strict: Optional[bool] = None) -> None:
+        self.limit = limit
+        self.name = name
+        self.strict = strict
+        self.counter = QueryCounter()
+        self._tokens = []
+
+    def __call__(self, function: F) -> F:
+        if self.name is None:
+            self.name = f"{function.__module__.rpartition('.')[2]}.{function.__qualname__}"
+        return super().__call__(function)
+
+    def _recreate_cm(self) -> "query_budget":
+        # A fresh counter per call, so concurrent calls of a decorated function do not share one.
+        return query_budget(self.limit, self.name, strict=self.strict)
+
+    def __enter__(self) -> QueryCounter:
+        self.counter = QueryCounter()
+        self._tokens.append(_active.set((*_active.get(), self.counter)))
+        return self.counter
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        _active.reset(self._tokens.pop())
+        if exc_type is None:
+            check(self.counter, self.limit, self.name or "query block", self.strict)
+
+
+@contextmanager
+def unbudgeted() -> Iterator[None]:
+    """Run one-off work, such as loading a cache, without counting it against the enclosing budgets."""
+    token = _active.set(())
+    try:
+        yield
+    finally:
+        _active.reset(token)
+
+
+def route_budget(limit: int) -> Callable[[F], F]:
+    """Declare the statements a route may run per request, enforced by ``QueryBudgetMiddleware``."""
+
+    def declare(endpoint: F) -> F:
+        endpoint.query_budget = limit
+        return endpoint
+
+    return declare
+
+
+class QueryBudgetMiddleware:
+    """ASGI middleware counting each request's statements against its route's budget."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = QueryCounter()
+        token = _active.set((*_active.get(), counter))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _active.reset(token)
+        route = scope.get("route")
+        if route is not None:
+            name = f"{scope['method']} {route.path}"
+            check(counter, getattr(getattr(route, "endpoint", None), "query_budget", None), name)
@@ -0,0 +1,362 @@
+"""Recompute derived trade metrics and account balances for the whole journal.
+
+Run after fixing imported data or changing how a metric is defined::
+
+    python -m app.recompute --workers 8 --chunk-size 20000
+    python -m app.recompute --dry-run
+
+Trades are read in primary-key order in chunks of scaled integers, recomputed with
+``calculations.calculate_trade_metrics_batch`` in worker processes, and only rows whose
+stored ``pnl``/``risk_per_trade``/``rr_planned``/``r_multiple`` differ are written back, one
+``COPY`` plus ``UPDATE ... FROM`` per chunk. Account balances are then reconciled against the
+trades, journaling any drift as ``correction`` entries in the balance ledger. Each chunk commits
+on its own, so an interrupted run can simply be repeated.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import column, func, select, table, update
+from sqlalchemy.engine import Connection, Engine
+
+from . import changes, models
+from .services import calculations
+from .services.fixed_point import (
+    AMOUNT_SCALE,
+    PRICE_SCALE,
+    QUANTITY_SCALE,
+    decimal_to_micros,
+    from_micros,
+    round_scaled,
+    scaled_column,
+    scaled_text,
+)
+
+RECOMPUTE_CHUNK_SIZE = int(os.getenv("RECOMPUTE_CHUNK_SIZE", "20000"))
+
+METRIC_COLUMNS = ("pnl", "risk_per_trade", "rr_planned", "r_multiple")
+
+Chunk = Dict[str, list]
+# (trade id, pnl, risk_per_trade, rr_planned, r_multiple) in micro-units
+MetricRow = Tuple[uuid.UUID, int, Optional[int], Optional[int], Optional[int]]
+
+
+@dataclass
+class ChunkResult:
+    changed: List[MetricRow]
+    drift: Dict[str, int]
+    pnl_drift_micros: int
+
+
+@dataclass
+class RecomputeReport:
+    trades: int = 0
+    trades_changed: int = 0
+    column_drift: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(METRIC_COLUMNS, 0))
+    pnl_drift: Decimal = Decimal("0")
+    accounts: int = 0
+    balance_drift: List[Tuple[str, Decimal, Decimal]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def lines(self) -> List[str]:
+        lines = [
+            f"Trades scanned: {self.trades}, changed: {self.trades_changed} in {self.seconds:.1f}s",
+            "Column drift: " + ", ".join(f"{name}={count}" for name, count in self.column_drift.items()),
+            f"Net PnL drift: {self.pnl_drift}",
+            f"Accounts: {self.accounts}, balances corrected: {len(self.balance_drift)}",
+        ]
+        lines += [f"  {name}: {old} -> {new}" for name, old, new in self.balance_drift]
+        return lines
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+
+def _chunk_query(after: Optional[uuid.UUID], chunk_size: int):
+    trade = models.Trade
+    query = select(
+        trade.id,
+        trade.direction,
+        scaled_column(trade.entry_price),
+        scaled_column(trade.exit_price),
+        scaled_column(trade.quantity, QUANTITY_SCALE),
+        scaled_column(trade.commissions, QUANTITY_SCALE),
+        scaled_column(trade.stop_loss_planned),
+        scaled_column(trade.take_profit_planned),
+        *(scaled_column(getattr(trade, name)) for name in METRIC_COLUMNS),
+    )
+    if after is not None:
+        query = query.where(trade.id > after)
+    return query.order_by(trade.id).limit(chunk_size)
+
+
+CHUNK_FIELDS = (
+    "id",
+    "direction",
+    "entry_price",
+    "exit_price",
+    "quantity",
+    "commissions",
+    "stop_loss",
+    "take_profit",
+    *(f"stored_{name}" for name in METRIC_COLUMNS),
+)
+
+
+def iter_trade_chunks(engine: Engine, chunk_size: int) -> Iterator[Chunk]:
+    """Yield trades as column lists of scaled integers, using keyset pagination on ``id``."""
+    after: Optional[uuid.UUID] = None
+    while True:
+        with engine.connect() as connection:
+            rows = connection.execute(_chunk_query(after, chunk_size)).all()
+        if not rows:
+            return
+        yield dict(zip(CHUNK_FIELDS, map(list, zip(*rows))))
+        after = rows[-1][0]
+
+
+# ---------------------------------------------------------------------------
+# Computing (runs in worker processes)
+# ---------------------------------------------------------------------------
+
+
+def stored_metrics(inputs: Chunk) -> Iterator[Tuple[int, Optional[int], Optional[int], Optional[int]]]:
+    """Yield ``(pnl, risk_per_trade, rr_planned, r_multiple)`` in micro-units as the columns store them.
+
+    ``inputs`` holds the scaled-integer input columns of ``calculate_trade_metrics_batch``.
+    """
+    batch = calculations.calculate_trade_metrics_batch(
+        direction=inputs["direction"],
+        entry_price=inputs["entry_price"],
+        exit_price=inputs["exit_price"],
+        quantity=inputs["quantity"],
+        commissions=inputs["commissions"],
+        stop_loss=inputs["stop_loss"],
+        take_profit=inputs["take_profit"],
+    )
+    for pnl, risk, rr_planned, r_multiple in zip(
+        batch.pnl.tolist(), batch.risk_per_trade.tolist(), batch.rr_planned.tolist(), batch.r_multiple.tolist()
+    ):
+        # Round exactly as Postgres does when storing into Numeric(18, 6).
+        yield (
+            round_scaled(pnl, AMOUNT_SCALE, PRICE_SCALE),
+            None if risk is None else round_scaled(risk, AMOUNT_SCALE, PRICE_SCALE),
+            None if rr_planned is None else decimal_to_micros(rr_planned),
+            None if r_multiple is None else decimal_to_micros(r_multiple),
+        )
+
+
+def recompute_chunk(chunk: Chunk) -> ChunkResult:
+    """Recompute one chunk and return only the rows whose stored metrics differ."""
+    stored_columns = [chunk[f"stored_{name}"] for name in METRIC_COLUMNS]
+    drift = dict.fromkeys(METRIC_COLUMNS, 0)
+    changed: List[MetricRow] = []
+    pnl_drift = 0
+
+    for index, (trade_id, computed) in enumerate(zip(chunk["id"], stored_metrics(chunk))):
+        stored = tuple(stored_values[index] for stored_values in stored_columns)
+        if computed == stored:
+            continue
+        for name, new, old in zip(METRIC_COLUMNS, computed, stored):
+            if new != old:
+                drift[name] += 1
+        pnl_drift += computed[0] - stored[0]
+        changed.append((trade_id, *computed))
+
+    return ChunkResult(changed=changed, drift=drift, pnl_drift_micros=pnl_drift)
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+
+_STAGING_TABLE = "recomputed_trade_metrics"
+
+
+def copy_text(value: Optional[int], scale: int = PRICE_SCALE) -> str:
+    """COPY text for a scaled value, avoiding a Decimal per cell."""
+    return "\\N" if value is None else scaled_text(value, scale)
+
+
+def write_metrics(connection: Connection, rows: List[MetricRow]) -> None:
+    """COPY ``rows`` into a per-connection staging table, then update ``trades`` in one statement.
+
+    Postgres/psycopg2 only: building an equivalent ``UPDATE ... FROM (VALUES ...)`` in SQLAlchemy
+    spends seconds per chunk just compiling the statement.
+    """
+    if not rows:
+        return
+    connection.exec_driver_sql(
+        f"CREATE TEMPORARY TABLE IF NOT EXISTS {_STAGING_TABLE} "
+        "(id uuid PRIMARY KEY, pnl numeric(18, 6), risk_per_trade numeric(18, 6), "
+        "rr_planned numeric(18, 6), r_multiple numeric(18, 6)) ON COMMIT DELETE ROWS"
+    )
+    buffer = io.StringIO()
+    for trade_id, *metrics in rows:
+        buffer.write(f"{trade_id}\t" + "\t".join(map(copy_text, metrics)) + "\n")
+    buffer.seek(0)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {_STAGING_TABLE} FROM STDIN", buffer)
+    assignments = ", ".join(f"{name} = staged.{name}" for name in METRIC_COLUMNS)
+    connection.exec_driver_sql(
+        f"UPDATE trades SET {assignments} FROM {_STAGING_TABLE} AS staged WHERE trades.id = staged.id"
+    )
+    changes.record_changes_from(
+        connection, models.ChangeEntity.TRADE, select(column("id")).select_from(table(_STAGING_TABLE))
+    )
+
+
+def _ledger_sum(ledger, *conditions):
+    return (
+        select(func.coalesce(func.sum(ledger.c.amount), 0))
+        .where(ledger.c.account_id == models.Account.__table__.c.id, *conditions)
+        .scalar_subquery()
+    )
+
+
+def rebuild_balances(connection: Connection, dry_run: bool = False) -> Tuple[int, List[Tuple[str, Decimal, Decimal]]]:
+    """Bring every account's ledger and balance back in line with its trades; returns the corrections.
+
+    The journaled trade PnL is topped up with a ``correction`` entry wherever it differs from the
+    trades' PnL (rounded to cents per trade, as the ledger stores it), and the compacted balance is
+    reset to ``initial_balance`` plus the compacted entries, discarding any stray direct writes.
+    """
+    accounts = models.Account.__table__
+    trades = models.Trade.__table__
+    ledger = models.AccountLedgerEntry.__table__
+    trade_kinds = [models.LedgerEntryKind.TRADE, models.LedgerEntryKind.CORRECTION]
+
+    trade_pnl = (
+        select(func.coalesce(func.sum(func.round(trades.c.pnl, 2)), 0))
+        .where(trades.c.account_id == accounts.c.id)
+        .scalar_subquery()
+    )
+    journaled = _ledger_sum(ledger, ledger.c.kind.in_(trade_kinds))
+    compacted = _ledger_sum(ledger, ledger.c.compacted.is_(True))
+    pending = _ledger_sum(ledger, ledger.c.compacted.is_(False))
+    expected = select(
+        accounts.c.id,
+        accounts.c.name,
+        (accounts.c.current_balance + pending).label("current"),
+        (trade_pnl - journaled).label("correction"),
+        (accounts.c.initial_balance + compacted).label("compacted"),
+        (accounts.c.initial_balance + compacted + pending + trade_pnl - journaled).label("balance"),
+    ).subquery("expected")
+
+    total = connection.execute(select(func.count()).select_from(accounts)).scalar_one()
+    drifted = connection.execute(
+        select(expected).where(expected.c.current != expected.c.balance).order_by(expected.c.name)
+    ).all()
+    if drifted and not dry_run:
+        now = func.now()
+        corrections = [
+            {"account_id": row.id, "kind": models.LedgerEntryKind.CORRECTION, "amount": row.correction}
+            for row in drifted
+            if row.correction != 0
+        ]
+        if corrections:
+            # Corrections are written already compacted and folded into the balance below.
+            connection.execute(
+                ledger.insert().values(occurred_at=now, compacted=True),
+                corrections,
+            )
+        connection.execute(
+            update(accounts)
+            .where(accounts.c.id.in_([row.id for row in drifted]))
+            .values(current_balance=accounts.c.initial_balance + compacted)
+        )
+        changes.record_changes(connection, {(models.ChangeEntity.ACCOUNT, row.id): False for row in drifted})
+    return total, [(row.name, row.current, row.balance) for row in drifted]
+
+
+# ---------------------------------------------------------------------------
+# Orchestration
+# ---------------------------------------------------------------------------
+
+
+def _apply(engine: Engine, report: RecomputeReport, result: ChunkResult, dry_run: bool) -> None:
+    report.trades_changed += len(result.changed)
+    for name, count in result.drift.items():
+        report.column_drift[name] += count
+    report.pnl_drift += from_micros(result.pnl_drift_micros)
+    if not dry_run:
+        with engine.begin() as connection:
+            write_metrics(connection, result.changed)
+
+
+def recompute_journal(
+    engine: Engine,
+    *,
+    workers: int = 1,
+    chunk_size: int = RECOMPUTE_CHUNK_SIZE,
+    dry_run: bool = False,
+    balances: bool = True,
+) -> RecomputeReport:
+    """Recompute every trade's metrics, then account balances. ``workers <= 1`` runs inline."""
+    started = time.perf_counter()
+    report = RecomputeReport()
+    chunks = iter_trade_chunks(engine, chunk_size)
+
+    if workers <= 1:
+        for chunk in chunks:
+            report.trades += len(chunk["id"])
+            _apply(engine, report, recompute_chunk(chunk), dry_run)
+    else:
+        # Bounded submission keeps at most two chunks per worker in memory.
+        pending: Deque[Future] = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk in chunks:
+                report.trades += len(chunk["id"])
+                pending.append(pool.submit(recompute_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    _apply(engine, report, pending.popleft().result(), dry_run)
+            while pending:
+                _apply(engine, report, pending.popleft().result(), dry_run)
+
+    if balances:
+        with engine.begin() as connection:
+            report.accounts, report.balance_drift = rebuild_balances(connection, dry_run=dry_run)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from .database import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.recompute", description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (1 = inline)")
+    parser.add_argument("--chunk-size", type=int, default=RECOMPUTE_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="report drift without writing")
+    parser.add_argument("--skip-balances", action="store_true", help="leave account balances untouched")
+    args = parser.parse_args(argv)
+
+    report = recompute_journal(
+        engine,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        dry_run=args.dry_run,
+        balances=not args.skip_balances,
+    )
+    print("\n".join(report.lines()))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,23 +5,24 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from .. import crud, schemas
-from ..database import get_db
+from ..database import get_analytics_db, get_db, get_read_db
+from ..tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/accounts", response_model=List[schemas.Account])
-async def list_accounts(db: Session = Depends(get_db)):
+def list_accounts(db: Session = Depends(get_read_db)):
     return crud.list_accounts(db=db)
 
 
 @router.post("/accounts", response_model=schemas.Account, status_code=status.HTTP_201_CREATED)
-async def create_account(account: schemas.AccountCreate, db: Session = Depends(get_db)):
+def create_account(account: schemas.AccountCreate, db: Session = Depends(get_db)):
     return crud.create_account(db=db, payload=account)
 
 
 @router.get("/accounts/{account_id}", response_model=schemas.Account)
-async def get_account(account_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_account(account_id: uuid.UUID, db: Session = Depends(get_db)):
     account = crud.get_account(db=db, account_id=account_id)
     if not account:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
@@ -29,7 +30,7 @@ async def get_account(account_id: uuid.UUID, db: Session = Depends(get_db)):
 
 
 @router.put("/accounts/{account_id}", response_model=schemas.Account)
-async def update_account(account_id: uuid.UUID, account: schemas.AccountUpdate, db: Session = Depends(get_db)):
+def update_account(account_id: uuid.UUID, account: schemas.AccountUpdate, db: Session = Depends(get_db)):
     try:
         return crud.update_account(db=db, account_id=account_id, payload=account)
     except ValueError as exc:
@@ -37,8 +38,24 @@ async def update_account(account_id: uuid.UUID, account: schemas.AccountUpdate,
 
 
 @router.delete("/accounts/{account_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_account(account_id: uuid.UUID, db: Session = Depends(get_db)):
+def delete_account(account_id: uuid.UUID, db: Session = Depends(get_db)):
     try:
         crud.delete_account(db=db, account_id=account_id)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.get("/accounts/{account_id}/balance-history", response_model=List[schemas.BalancePoint])
+def get_balance_history(account_id: uuid.UUID, db: Session = Depends(get_analytics_db)):
+    try:
+        return crud.get_balance_history(db=db, account_id=account_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.get("/accounts/{account_id}/reconciliation", response_model=schemas.BalanceReconciliation)
+def reconcile_account(account_id: uuid.UUID, db: Session = Depends(get_db)):
+    try:
+        return crud.reconcile_account(db=db, account_id=account_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
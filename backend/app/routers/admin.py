@@ -0,0 +1,80 @@
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+
+from .. import schemas
+from ..slow_queries import slow_query_log
+from ..tracing import TracedRoute, trace_log
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.get("/admin/slow-queries", response_model=List[schemas.SlowQuery])
+def list_slow_queries(
+    caller: Optional[str] = Query(default=None, description="only statements run by this function, e.g. crud.get_kpis"),
+    fingerprint: Optional[str] = None,
+    min_ms: float = Query(default=0, ge=0),
+    with_plan: bool = False,
+    limit: int = Query(default=100, ge=1, le=1000),
+):
+    """Recent slow statements of this process, newest first."""
+    entries = [
+        entry
+        for entry in reversed(slow_query_log.entries())
+        if entry["duration_ms"] >= min_ms
+        and (caller is None or entry["caller"] == caller)
+        and (fingerprint is None or entry["fingerprint"] == fingerprint)
+        and (not with_plan or entry["plan"] is not None)
+    ]
+    return entries[:limit]
+
+
+@router.get("/admin/slow-queries/summary", response_model=List[schemas.SlowQueryGroup])
+def summarize_slow_queries():
+    """Slow statements grouped by normalized SQL, by total time spent."""
+    groups: Dict[str, dict] = {}
+    for entry in slow_query_log.entries():
+        group = groups.setdefault(
+            entry["fingerprint"],
+            {"fingerprint": entry["fingerprint"], "sql": entry["sql"], "callers": [], "count": 0, "total_ms": 0.0},
+        )
+        if entry["caller"] and entry["caller"] not in group["callers"]:
+            group["callers"].append(entry["caller"])
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        group["max_ms"] = max(group.get("max_ms", 0.0), entry["duration_ms"])
+        group["last_at"] = entry["at"]
+    return sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)
+
+
+@router.get("/admin/traces", response_model=List[schemas.TraceSummary])
+def list_traces(
+    name: Optional[str] = Query(default=None, description="only this route, e.g. POST /api/trades"),
+    min_ms: float = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    """Recently sampled requests of this process, newest first."""
+    summaries = []
+    for trace in reversed(trace_log.entries()):
+        if (name is not None and trace["name"] != name) or (trace["duration_ms"] or 0) < min_ms:
+            continue
+        statements = [span for span in trace["spans"] if span["kind"] == "sql"]
+        summaries.append(
+            {
+                **trace,
+                "span_count": len(trace["spans"]),
+                "sql_statements": len(statements),
+                "sql_ms": round(sum(span["duration_ms"] or 0 for span in statements), 3),
+            }
+        )
+        if len(summaries) == limit:
+            break
+    return summaries
+
+
+@router.get("/admin/traces/{trace_id}", response_model=schemas.TraceDetail)
+def get_trace(trace_id: str):
+    trace = trace_log.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return trace
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from .. import crud, schemas
+from ..database import get_read_db
+from ..query_budget import route_budget
+from ..tracing import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.get("/changes", response_model=schemas.ChangeFeed)
+@route_budget(9)
+def list_changes(
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=500, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+):
+    return crud.list_changes(db=db, since=since, limit=limit)
@@ -1,37 +1,69 @@
+import asyncio
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+import anyio
+from fastapi import APIRouter, Depends, Request, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, live, models, schemas
+from ..database import get_analytics_db, get_db
+from ..query_budget import route_budget
+from ..services import arrow
+from ..services.serialization import FastJSONResponse
+from ..tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/dashboard/kpis", response_model=schemas.KPIsResponse)
-async def get_dashboard_kpis(db: Session = Depends(get_db)):
+@route_budget(3)
+def get_dashboard_kpis(db: Session = Depends(get_analytics_db)):
     return crud.get_kpis(db=db)
 
 
-@router.get("/dashboard/equity-curve", response_model=List[schemas.EquityCurvePoint])
-async def get_equity_curve(db: Session = Depends(get_db)):
-    return crud.get_equity_curve(db=db)
+@router.get(
+    "/dashboard/equity-curve",
+    response_model=List[schemas.EquityCurvePoint],
+    responses={200: {"content": {arrow.ARROW_STREAM_MEDIA_TYPE: {}}}},
+)
+@route_budget(3)
+def get_equity_curve(request: Request, db: Session = Depends(get_analytics_db)):
+    if arrow.wants_arrow(request.headers.get("accept")):
+        table = arrow.equity_curve_table(*crud.get_equity_curve_columns(db=db))
+        return arrow.ArrowStreamResponse(table, headers=arrow.VARY_ACCEPT)
+    return FastJSONResponse(crud.get_equity_curve_points(db=db), headers=arrow.VARY_ACCEPT)
 
 
 @router.get("/dashboard/performance-by-tag", response_model=List[schemas.PerformanceByTag])
-async def get_performance_by_tag(db: Session = Depends(get_db)):
+@route_budget(1)
+def get_performance_by_tag(db: Session = Depends(get_analytics_db)):
     return crud.get_performance_by_tag(db=db)
 
 
+@router.get("/dashboard/bundle", response_model=schemas.DashboardBundle)
+@route_budget(6)
+def get_dashboard_bundle(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    session: Optional[models.TradeSession] = None,
+    direction: Optional[models.TradeDirection] = None,
+    db: Session = Depends(get_analytics_db),
+):
+    return FastJSONResponse(
+        crud.get_dashboard_bundle(db=db, start_date=start_date, end_date=end_date, session=session, direction=direction)
+    )
+
+
 @router.get("/dashboard/strategies", response_model=List[schemas.StrategyDashboardSummary])
-async def get_strategy_dashboard(
+@route_budget(4)
+def get_strategy_dashboard(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     session: Optional[models.TradeSession] = None,
     direction: Optional[models.TradeDirection] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_analytics_db),
 ):
     return crud.get_strategy_dashboard(
         db=db,
@@ -43,12 +75,13 @@ async def get_strategy_dashboard(
 
 
 @router.get("/dashboard/accounts", response_model=List[schemas.AccountDashboardSummary])
-async def get_account_dashboard(
+@route_budget(4)
+def get_account_dashboard(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     session: Optional[models.TradeSession] = None,
     direction: Optional[models.TradeDirection] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_analytics_db),
 ):
     return crud.get_account_dashboard(
         db=db,
@@ -57,3 +90,30 @@ async def get_account_dashboard(
         session=session,
         direction=direction,
     )
+
+
+@router.websocket("/dashboard/live")
+async def live_dashboard(websocket: WebSocket, db: Session = Depends(get_db)):
+    """Push a dashboard snapshot, then a delta per committed trade change (see ``app.live``)."""
+    await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=live.hub.queue_size)
+    try:
+        await run_in_threadpool(live.hub.subscribe, queue, asyncio.get_running_loop(), lambda: crud.get_trade_totals(db))
+    finally:
+        db.close()
+
+    async def close_on_disconnect(cancel_scope: anyio.CancelScope) -> None:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+        cancel_scope.cancel()
+
+    try:
+        async with anyio.create_task_group() as tasks:
+            tasks.start_soon(close_on_disconnect, tasks.cancel_scope)
+            while (message := await queue.get()) is not None:
+                await websocket.send_text(message)
+            # Fell too far behind: the client reconnects for a fresh snapshot.
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            tasks.cancel_scope.cancel()
+    finally:
+        live.hub.unsubscribe(queue)
@@ -2,16 +2,20 @@ import csv
 import io
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, Union
 import uuid
 
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from .. import crud, models, schemas
-from ..database import get_db
+from ..database import get_db, get_read_db
+from ..query_budget import route_budget
+from ..services import export, serialization
+from ..tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/trades/confirmations/options", response_model=list[str])
@@ -20,15 +24,46 @@ async def list_confirmation_options() -> list[str]:
 
 
 @router.post("/trades", response_model=schemas.Trade, status_code=status.HTTP_201_CREATED)
-async def create_trade(trade: schemas.TradeCreate, db: Session = Depends(get_db)):
+@route_budget(13)
+def create_trade(trade: schemas.TradeCreate, db: Session = Depends(get_db)):
     try:
         return crud.create_trade(db=db, payload=trade)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
 
+@router.get("/trades/export")
+def export_trades(
+    export_format: export.ExportFormat = Query(default=export.ExportFormat.CSV, alias="format"),
+    symbol: Optional[str] = None,
+    strategy_id: Optional[uuid.UUID] = None,
+    account_id: Optional[uuid.UUID] = None,
+    session: Optional[models.TradeSession] = None,
+    direction: Optional[models.TradeDirection] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
+):
+    rows = crud.stream_trade_rows(
+        db=db,
+        symbol=symbol,
+        strategy_id=strategy_id,
+        account_id=account_id,
+        session=session,
+        direction=direction,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    return StreamingResponse(
+        export.WRITERS[export_format](rows),
+        media_type=export.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="trades.{export_format.value}"'},
+    )
+
+
 @router.get("/trades/{trade_id}", response_model=schemas.Trade)
-async def get_trade(trade_id: uuid.UUID, db: Session = Depends(get_db)):
+@route_budget(1)
+def get_trade(trade_id: uuid.UUID, db: Session = Depends(get_db)):
     trade = crud.get_trade(db=db, trade_id=trade_id)
     if not trade:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trade not found")
@@ -36,15 +71,17 @@ async def get_trade(trade_id: uuid.UUID, db: Session = Depends(get_db)):
 
 
 @router.put("/trades/{trade_id}", response_model=schemas.Trade)
-async def update_trade(trade_id: uuid.UUID, trade_update: schemas.TradeUpdate, db: Session = Depends(get_db)):
+@route_budget(14)
+def update_trade(trade_id: uuid.UUID, trade_update: schemas.TradeUpdate, db: Session = Depends(get_db)):
     try:
         return crud.update_trade(db=db, trade_id=trade_id, payload=trade_update)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
 
-@router.get("/trades", response_model=schemas.TradeListResponse)
-async def list_trades(
+@router.get("/trades", response_model=Union[schemas.TradeListResponse, schemas.NormalizedTradeListResponse])
+@route_budget(6)
+def list_trades(
     page: int = Query(default=1, ge=1),
     per_page: int = Query(default=20, ge=1, le=100),
     symbol: Optional[str] = None,
@@ -54,13 +91,11 @@ async def list_trades(
     direction: Optional[models.TradeDirection] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
+    normalized: bool = False,
+    db: Session = Depends(get_read_db),
 ):
     skip = (page - 1) * per_page
-    trades = crud.list_trades(
-        db=db,
-        skip=skip,
-        limit=per_page,
+    filters = dict(
         symbol=symbol,
         strategy_id=strategy_id,
         account_id=account_id,
@@ -69,27 +104,40 @@ async def list_trades(
         start_date=start_date,
         end_date=end_date,
     )
-    total = crud.get_trade_count(
-        db=db,
-        symbol=symbol,
-        strategy_id=strategy_id,
-        account_id=account_id,
-        session=session,
-        direction=direction,
-        start_date=start_date,
-        end_date=end_date,
+    total = crud.get_trade_count(db=db, **filters)
+
+    if normalized:
+        trades, accounts, strategies, tags = crud.list_trades_normalized(db=db, skip=skip, limit=per_page, **filters)
+        return serialization.FastJSONResponse(
+            {
+                "trades": serialization.normalized_trades_to_dicts(trades),
+                "accounts": serialization.entities_to_dict(accounts, schemas.Account),
+                "strategies": serialization.entities_to_dict(strategies, schemas.Strategy),
+                "tags": serialization.entities_to_dict(tags, schemas.Tag),
+                "total": total,
+                "page": page,
+                "per_page": per_page,
+            }
+        )
+
+    trades = crud.list_trades(db=db, skip=skip, limit=per_page, **filters)
+    return serialization.FastJSONResponse(
+        {
+            "trades": serialization.trades_to_dicts(trades),
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+        }
     )
 
-    return schemas.TradeListResponse(trades=trades, total=total, page=page, per_page=per_page)
-
 
 @router.post("/trades/csv")
-async def upload_trades_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def upload_trades_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be a CSV")
 
     try:
-        contents = await file.read()
+        contents = file.file.read()
         csv_reader = csv.DictReader(io.StringIO(contents.decode("utf-8")))
         created = 0
 
@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import date, datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 
@@ -250,6 +250,55 @@ class TradeListResponse(BaseModel):
     per_page: int
 
 
+class NormalizedTrade(TradeBase, TradeComputedFields):
+    """Trade without embedded relations; related entities are side-loaded by id."""
+
+    id: uuid.UUID
+    tag_ids: List[uuid.UUID] = Field(default_factory=list)
+    confirmations: List[str]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+
+
+class NormalizedTradeListResponse(BaseModel):
+    trades: List[NormalizedTrade]
+    accounts: Dict[uuid.UUID, Account]
+    strategies: Dict[uuid.UUID, Strategy]
+    tags: Dict[uuid.UUID, Tag]
+    total: int
+    page: int
+    per_page: int
+
+
+# ---------------------------------------------------------------------------
+# Change feed schemas
+# ---------------------------------------------------------------------------
+
+
+class DeletedEntities(BaseModel):
+    trades: List[uuid.UUID] = Field(default_factory=list)
+    accounts: List[uuid.UUID] = Field(default_factory=list)
+    strategies: List[uuid.UUID] = Field(default_factory=list)
+    tags: List[uuid.UUID] = Field(default_factory=list)
+
+
+class ChangeFeed(BaseModel):
+    """Entities changed after ``since``; pass ``next_since`` as ``since`` on the next request."""
+
+    since: int
+    next_since: int
+    has_more: bool
+    trades: List[NormalizedTrade]
+    accounts: Dict[uuid.UUID, Account]
+    strategies: Dict[uuid.UUID, Strategy]
+    tags: Dict[uuid.UUID, Tag]
+    deleted: DeletedEntities
+
+
 # ---------------------------------------------------------------------------
 # Dashboard schemas
 # ---------------------------------------------------------------------------
@@ -271,6 +320,22 @@ class EquityCurvePoint(BaseModel):
     cumulative_pnl: Decimal
 
 
+class BalancePoint(BaseModel):
+    date: str
+    balance: Decimal
+
+
+class BalanceReconciliation(BaseModel):
+    account_id: uuid.UUID
+    current_balance: Decimal
+    ledger_balance: Decimal
+    trade_pnl: Decimal
+    journaled_trade_pnl: Decimal
+    adjustments: Decimal
+    pending_entries: int
+    balanced: bool
+
+
 class PerformanceByTag(BaseModel):
     tag_name: str
     total_pnl: Decimal
@@ -301,3 +366,73 @@ class AccountDashboardSummary(BaseModel):
     average_r: float
     total_pnl: Decimal
     current_balance: Decimal
+
+
+class DashboardBundle(BaseModel):
+    kpis: KPIsResponse
+    equity_curve: List[EquityCurvePoint]
+    performance_by_tag: List[PerformanceByTag]
+    strategies: List[StrategyDashboardSummary]
+    accounts: List[AccountDashboardSummary]
+
+
+# ---------------------------------------------------------------------------
+# Admin schemas
+# ---------------------------------------------------------------------------
+
+
+class SlowQuery(BaseModel):
+    at: datetime
+    duration_ms: float
+    fingerprint: str
+    caller: Optional[str]
+    sql: str
+    parameters: Any
+    rows: int
+    plan: Optional[str]
+    plan_error: Optional[str] = None
+
+
+class SlowQueryGroup(BaseModel):
+    """Slow executions of one normalized statement."""
+
+    fingerprint: str
+    sql: str
+    callers: List[str]
+    count: int
+    total_ms: float
+    max_ms: float
+    last_at: datetime
+
+
+class TraceSpan(BaseModel):
+    span_id: int
+    parent_id: Optional[int]
+    name: str
+    kind: str
+    start_ms: float
+    duration_ms: Optional[float]
+    attributes: Dict[str, Any]
+
+
+class TraceSummary(BaseModel):
+    trace_id: str
+    name: str
+    started_at: datetime
+    duration_ms: Optional[float]
+    attributes: Dict[str, Any]
+    span_count: int
+    sql_statements: int
+    sql_ms: float
+
+
+class TraceDetail(BaseModel):
+    """A sampled request; spans link to their parent by ``parent_id``, ``start_ms`` counts from the request start."""
+
+    trace_id: str
+    name: str
+    started_at: datetime
+    duration_ms: Optional[float]
+    attributes: Dict[str, Any]
+    dropped_spans: int
+    spans: List[TraceSpan]
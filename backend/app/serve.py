@@ -0,0 +1,48 @@
+"""Serve the API with one uvicorn worker process per CPU.
+
+Every worker is a separate process with its own connection pool, threadpool, metrics,
+slow-query log, traces and in-process caches. Writes reach the other workers' caches through
+``app.invalidation``. Size the database for ``workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW + 1)``
+connections; the extra one per worker is its change listener.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from typing import List, Optional
+
+import uvicorn
+
+# Worker processes; 0 means one per CPU.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Idle keep-alive connections are closed after this; keep it above any load balancer's idle timeout.
+KEEP_ALIVE_SECONDS = int(os.getenv("KEEP_ALIVE_SECONDS", "75"))
+
+
+def worker_count(requested: int = WEB_CONCURRENCY) -> int:
+    return requested if requested > 0 else os.cpu_count() or 1
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="worker processes (0 = one per CPU)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=worker_count(args.workers),
+        log_level=args.log_level,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
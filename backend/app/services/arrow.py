@@ -0,0 +1,97 @@
+"""Arrow IPC responses for numeric analytics series.
+
+Routes that return long numeric series (the equity curve) also answer ``Accept:
+application/vnd.apache.arrow.stream`` with an Arrow IPC stream: one record batch of columns
+built straight from integer arrays, without a dict or ``Decimal`` per point. Clients read it with
+``pyarrow.ipc.open_stream``, ``apache-arrow`` in the browser or any other Arrow library.
+
+Dates are ``date32`` columns. Amounts follow ``JSON_DECIMAL_MODE``: exact ``decimal128(38, 6)``
+by default, ``float64`` in ``float`` mode. JSON stays the default whenever the client does not
+rank Arrow strictly higher.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+from fastapi.responses import Response
+
+from .fixed_point import MICROS, PRICE_SCALE
+from .serialization import DECIMAL_MODE
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+JSON_MEDIA_TYPE = "application/json"
+
+# Responses of negotiated routes differ by ``Accept``; caches must key on it.
+VARY_ACCEPT = {"Vary": "Accept"}
+
+
+def negotiate(accept: Optional[str], offered: Sequence[str]) -> str:
+    """The offered media type ``accept`` ranks highest; the first offered on ties or without a match."""
+    if not accept:
+        return offered[0]
+    ranges: Dict[str, float] = {}
+    for part in accept.split(","):
+        media_range, *parameters = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges[media_range.lower()] = quality
+
+    def quality_of(media_type: str) -> float:
+        # The most specific matching range decides.
+        for media_range in (media_type, f"{media_type.partition('/')[0]}/*", "*/*"):
+            if media_range in ranges:
+                return ranges[media_range]
+        return 0.0
+
+    best = max(offered, key=lambda media_type: (quality_of(media_type), -offered.index(media_type)))
+    return best if quality_of(best) > 0 else offered[0]
+
+
+def wants_arrow(accept: Optional[str]) -> bool:
+    return negotiate(accept, (JSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE)) == ARROW_STREAM_MEDIA_TYPE
+
+
+def amount_array(micros: np.ndarray):
+    """An Arrow amount column from int64 micro-units, without a Python object per value."""
+    import pyarrow as pa
+
+    micros = np.ascontiguousarray(micros, dtype=np.int64)
+    if DECIMAL_MODE == "float":
+        return pa.array(micros / MICROS, type=pa.float64())
+    # decimal128 values are 16-byte little-endian two's complement: the int64 and its sign word.
+    words = np.empty((len(micros), 2), np.int64)
+    words[:, 0] = micros
+    words[:, 1] = micros >> 63
+    return pa.Array.from_buffers(pa.decimal128(38, PRICE_SCALE), len(micros), [None, pa.py_buffer(words)])
+
+
+def equity_curve_table(days: np.ndarray, cumulative_micros: np.ndarray):
+    """Columns of ``schemas.EquityCurvePoint``: exit days since the epoch and cumulative PnL."""
+    import pyarrow as pa
+
+    return pa.table(
+        {
+            "date": pa.array(np.ascontiguousarray(days, dtype=np.int32), type=pa.date32()),
+            "cumulative_pnl": amount_array(cumulative_micros),
+        }
+    )
+
+
+class ArrowStreamResponse(Response):
+    media_type = ARROW_STREAM_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        import pyarrow as pa
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, content.schema) as writer:
+            writer.write_table(content)
+        return sink.getvalue().to_pybytes()
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from decimal import Decimal
-from typing import Optional
+from decimal import Decimal, getcontext
+from typing import Iterator, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
 
 from ..models import TradeDirection
+from ..tracing import traced
+from .fixed_point import AMOUNT_SCALE, PRICE_SCALE, from_scaled
 
 
 DECIMAL_ZERO = Decimal("0")
@@ -58,6 +62,7 @@ def calculate_r_multiple(*, pnl: Decimal, risk_per_trade: Optional[Decimal]) ->
     return pnl / risk_per_trade
 
 
+@traced()
 def calculate_trade_metrics(
     *,
     direction: TradeDirection,
@@ -86,3 +91,146 @@ def calculate_trade_metrics(
     r_multiple = calculate_r_multiple(pnl=pnl, risk_per_trade=risk_per_trade)
 
     return pnl, risk_per_trade, rr_planned, r_multiple
+
+
+# Commissions are stored at quantity scale; this lifts them to price * quantity scale.
+_COMMISSION_FACTOR = 10**PRICE_SCALE
+
+
+def calculate_trade_metrics_scaled(
+    *,
+    direction: TradeDirection,
+    entry_price: int,
+    exit_price: int,
+    quantity: int,
+    commissions: int,
+    stop_loss: Optional[int],
+    take_profit: Optional[int],
+) -> tuple[int, Optional[int], Optional[Decimal], Optional[Decimal]]:
+    """Integer twin of ``calculate_trade_metrics`` for values held at their column scale.
+
+    Prices are micro-units (``PRICE_SCALE``); quantity and commissions use ``QUANTITY_SCALE``.
+    PnL and risk come back as ints at ``AMOUNT_SCALE``; the ratios are ``Decimal``. For inputs
+    carrying exactly their column's decimal places, ``from_scaled`` of the results equals the
+    ``Decimal`` path digit for digit, exponent included.
+    """
+    if direction == TradeDirection.LONG:
+        pnl = (exit_price - entry_price) * quantity - commissions * _COMMISSION_FACTOR
+    else:
+        pnl = (entry_price - exit_price) * quantity - commissions * _COMMISSION_FACTOR
+
+    if stop_loss is None:
+        return pnl, None, None, None
+
+    risk = abs(entry_price - stop_loss) * quantity
+    if risk <= 0:
+        return pnl, None, None, None
+
+    rr_planned = None
+    if take_profit is not None:
+        reward = abs(take_profit - entry_price) * quantity
+        if reward > 0:
+            rr_planned = Decimal(reward) / Decimal(risk)
+
+    return pnl, risk, rr_planned, Decimal(pnl) / Decimal(risk)
+
+
+# ---------------------------------------------------------------------------
+# Batch calculation
+# ---------------------------------------------------------------------------
+
+_INT64_LIMIT = 2**63 - 1
+
+IntColumn = Union[Sequence[int], np.ndarray]
+OptionalIntColumn = Union[Sequence[Optional[int]], np.ma.MaskedArray]
+
+
+class TradeMetricsBatch(NamedTuple):
+    """Column results of ``calculate_trade_metrics_batch``; masked entries are ``None`` in the scalar API."""
+
+    pnl: np.ndarray
+    risk_per_trade: np.ma.MaskedArray
+    rr_planned: np.ma.MaskedArray
+    r_multiple: np.ma.MaskedArray
+
+    def rows(self) -> Iterator[tuple[Decimal, Optional[Decimal], Optional[Decimal], Optional[Decimal]]]:
+        """Yield per-trade tuples shaped like ``calculate_trade_metrics`` returns."""
+        for pnl, risk, rr_planned, r_multiple in zip(
+            self.pnl.tolist(),
+            self.risk_per_trade.tolist(),
+            self.rr_planned.tolist(),
+            self.r_multiple.tolist(),
+        ):
+            yield (
+                from_scaled(pnl, AMOUNT_SCALE),
+                None if risk is None else from_scaled(risk, AMOUNT_SCALE),
+                rr_planned,
+                r_multiple,
+            )
+
+
+def _masked(values: OptionalIntColumn) -> np.ma.MaskedArray:
+    if isinstance(values, np.ma.MaskedArray):
+        return values
+    mask = np.array([value is None for value in values], dtype=bool)
+    return np.ma.MaskedArray([0 if value is None else value for value in values], mask=mask)
+
+
+def _max_abs(column: np.ndarray) -> int:
+    return int(np.abs(column).max()) if len(column) else 0
+
+
+def _ratios(numerators: np.ndarray, denominators: np.ndarray, valid: np.ndarray) -> np.ma.MaskedArray:
+    result = np.full(len(valid), None, dtype=object)
+    indexes = np.flatnonzero(valid)
+    divide = getcontext().divide  # same as Decimal(a) / Decimal(b), without building the operands
+    # Item-wise assignment: numpy's conversion of a list of Decimals to an array is far slower.
+    for index, numerator, denominator in zip(
+        indexes.tolist(), numerators[indexes].tolist(), denominators[indexes].tolist()
+    ):
+        result[index] = divide(numerator, denominator)
+    return np.ma.MaskedArray(result, mask=~valid)
+
+
+def calculate_trade_metrics_batch(
+    *,
+    direction: Sequence[TradeDirection],
+    entry_price: IntColumn,
+    exit_price: IntColumn,
+    quantity: IntColumn,
+    commissions: IntColumn,
+    stop_loss: OptionalIntColumn,
+    take_profit: OptionalIntColumn,
+) -> TradeMetricsBatch:
+    """Column-wise ``calculate_trade_metrics_scaled`` for bulk imports and recomputes.
+
+    Inputs are equal-length columns at column scale (see ``calculate_trade_metrics_scaled``);
+    ``stop_loss`` and ``take_profit`` may be masked arrays or contain ``None``. Arithmetic runs
+    on int64 arrays, or on exact Python-int object arrays when the inputs could overflow int64.
+    Ratios are ``Decimal`` objects, so results equal the scalar version exactly wherever that
+    version's intermediates fit ``Decimal``'s 28 significant digits (beyond that it rounds).
+    """
+    is_long = np.fromiter((value == TradeDirection.LONG for value in direction), dtype=bool, count=len(direction))
+    stops, targets = _masked(stop_loss), _masked(take_profit)
+    columns = [np.asarray(entry_price), np.asarray(exit_price), stops.data, targets.data]
+    quantities, fees = np.asarray(quantity), np.asarray(commissions)
+
+    largest_price = max(_max_abs(column) for column in columns)
+    bound = 2 * largest_price * _max_abs(quantities) + _max_abs(fees) * _COMMISSION_FACTOR
+    dtype = np.int64 if bound <= _INT64_LIMIT else object
+    entries, exits, stop_data, target_data = (column.astype(dtype) for column in columns)
+    quantities, fees = quantities.astype(dtype), fees.astype(dtype)
+
+    pnl = np.where(is_long, exits - entries, entries - exits) * quantities - fees * _COMMISSION_FACTOR
+
+    risk = np.abs(entries - stop_data) * quantities
+    has_risk = ~np.ma.getmaskarray(stops) & (risk > 0)
+    reward = np.abs(target_data - entries) * quantities
+    has_rr = has_risk & ~np.ma.getmaskarray(targets) & (reward > 0)
+
+    return TradeMetricsBatch(
+        pnl=pnl,
+        risk_per_trade=np.ma.MaskedArray(risk, mask=~has_risk),
+        rr_planned=_ratios(reward, risk, has_rr),
+        r_multiple=_ratios(pnl, risk, has_risk),
+    )
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import csv
+import enum
+import io
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import Row
+
+
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
+
+MEDIA_TYPES: Dict[ExportFormat, str] = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+# (output name, source column). Names follow the CSV importer so an export can be re-uploaded.
+EXPORT_COLUMNS: List[Tuple[str, str]] = [
+    ("id", "id"),
+    ("symbol", "symbol"),
+    ("direction", "direction"),
+    ("quantity", "quantity"),
+    ("session", "session"),
+    ("strategy_id", "strategy_id"),
+    ("account_id", "account_id"),
+    ("entry_datetime", "entry_timestamp"),
+    ("exit_datetime", "exit_timestamp"),
+    ("entry_price", "entry_price"),
+    ("stop_loss_planned", "stop_loss_planned"),
+    ("take_profit_planned", "take_profit_planned"),
+    ("exit_price", "exit_price"),
+    ("commissions", "commissions"),
+    ("risk_per_trade", "risk_per_trade"),
+    ("rr_planned", "rr_planned"),
+    ("pnl", "pnl"),
+    ("r_multiple", "r_multiple"),
+    ("import_method", "import_method"),
+    ("confirmations", "confirmations"),
+    ("confirmations_count", "confirmations_count"),
+    ("notes", "notes"),
+    ("tags", "tags"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+]
+
+LIST_COLUMNS = {"confirmations", "tags"}
+
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return value.split("|") if value else []
+    return list(value)
+
+
+def _record(row: Row) -> Dict[str, Any]:
+    mapping = row._mapping
+    record: Dict[str, Any] = {}
+    for name, source in EXPORT_COLUMNS:
+        value = mapping[source]
+        record[name] = _as_list(value) if name in LIST_COLUMNS else _scalar(value)
+    return record
+
+
+def iter_csv(rows: Iterable[Row], *, chunk_size: int = 1000) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORT_COLUMNS])
+
+    pending = 0
+    for row in rows:
+        record = _record(row)
+        writer.writerow(
+            ["|".join(record[name]) if name in LIST_COLUMNS else record[name] for name, _ in EXPORT_COLUMNS]
+        )
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(rows: Iterable[Row], *, chunk_size: int = 1000) -> Iterator[bytes]:
+    lines: List[str] = []
+    for row in rows:
+        lines.append(json.dumps(_record(row)))
+        if len(lines) >= chunk_size:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose accumulated bytes can be handed off between row groups."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    price = pa.decimal128(18, 6)
+    money = pa.decimal128(15, 2)
+    timestamp = pa.timestamp("us", tz="UTC")
+    types = {
+        "quantity": money,
+        "entry_datetime": timestamp,
+        "exit_datetime": timestamp,
+        "entry_price": price,
+        "stop_loss_planned": price,
+        "take_profit_planned": price,
+        "exit_price": price,
+        "commissions": money,
+        "risk_per_trade": price,
+        "rr_planned": price,
+        "pnl": price,
+        "r_multiple": price,
+        "confirmations": pa.list_(pa.string()),
+        "confirmations_count": pa.int32(),
+        "tags": pa.list_(pa.string()),
+        "created_at": timestamp,
+        "updated_at": timestamp,
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name, _ in EXPORT_COLUMNS])
+
+
+def _parquet_value(name: str, source: str, row_mapping) -> Any:
+    value = row_mapping[source]
+    if name in LIST_COLUMNS:
+        return _as_list(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def iter_parquet(rows: Iterable[Row], *, chunk_size: int = 1000) -> Iterator[bytes]:
+    """Write one Parquet row group per ``chunk_size`` rows, yielding bytes as each group is flushed."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def flush(columns: Dict[str, List[Any]]) -> bytes:
+        writer.write_table(pa.table(columns, schema=schema))
+        return sink.drain()
+
+    columns: Dict[str, List[Any]] = {name: [] for name, _ in EXPORT_COLUMNS}
+    pending = 0
+    for row in rows:
+        mapping = row._mapping
+        for name, source in EXPORT_COLUMNS:
+            columns[name].append(_parquet_value(name, source, mapping))
+        pending += 1
+        if pending >= chunk_size:
+            yield flush(columns)
+            columns = {name: [] for name, _ in EXPORT_COLUMNS}
+            pending = 0
+    if pending:
+        yield flush(columns)
+    writer.close()
+    yield sink.drain()
+
+
+WRITERS: Dict[ExportFormat, Callable[..., Iterator[bytes]]] = {
+    ExportFormat.CSV: iter_csv,
+    ExportFormat.NDJSON: iter_ndjson,
+    ExportFormat.PARQUET: iter_parquet,
+}
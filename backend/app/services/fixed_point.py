@@ -0,0 +1,70 @@
+"""Exact scaled-integer representation of the journal's fixed-point columns.
+
+Prices, PnL, risk and R-multiples are stored as ``Numeric(18, 6)``, quantities and
+commissions as ``Numeric(15, 2)``. Hot paths load these as plain ``int`` values scaled by
+``10**scale`` (micro-units for prices and PnL), do their arithmetic on integers and only
+build ``Decimal`` objects for the response.
+
+A price times a quantity carries ``PRICE_SCALE + QUANTITY_SCALE`` decimal places, so PnL and
+risk computed from inputs are exact at ``AMOUNT_SCALE``.
+"""
+
+from __future__ import annotations
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from sqlalchemy import BigInteger, cast
+from sqlalchemy.sql.elements import ColumnElement
+
+PRICE_SCALE = 6
+QUANTITY_SCALE = 2
+AMOUNT_SCALE = PRICE_SCALE + QUANTITY_SCALE
+
+MICROS = 10**PRICE_SCALE
+
+
+def to_scaled(value: Decimal, scale: int) -> int:
+    """Return ``value * 10**scale`` as an int; raises ``ValueError`` if that would lose digits."""
+    scaled = value.scaleb(scale)
+    integral = scaled.to_integral_value()
+    if scaled != integral:
+        raise ValueError(f"{value} has more than {scale} decimal places")
+    return int(integral)
+
+
+def from_scaled(value: int, scale: int) -> Decimal:
+    """Exact ``Decimal`` for a scaled int, with exponent ``-scale`` like the database returns."""
+    return Decimal(value).scaleb(-scale)
+
+
+def to_micros(value: Decimal) -> int:
+    return to_scaled(value, PRICE_SCALE)
+
+
+def from_micros(value: int) -> Decimal:
+    return from_scaled(value, PRICE_SCALE)
+
+
+def scaled_text(value: int, scale: int) -> str:
+    """Plain decimal text for a scaled int, like ``str(from_scaled(...))`` but without a ``Decimal``."""
+    digits = str(abs(value)).rjust(scale + 1, "0")
+    return f"{'-' if value < 0 else ''}{digits[:-scale]}.{digits[-scale:]}"
+
+
+def round_scaled(value: int, from_scale: int, to_scale: int) -> int:
+    """Rescale to fewer decimal places, rounding half away from zero like Postgres ``numeric``."""
+    factor = 10 ** (from_scale - to_scale)
+    quotient, remainder = divmod(abs(value), factor)
+    if 2 * remainder >= factor:
+        quotient += 1
+    return quotient if value >= 0 else -quotient
+
+
+def decimal_to_micros(value: Decimal) -> int:
+    """Micro-units of ``value`` as stored in a ``Numeric(.., 6)`` column (half away from zero)."""
+    return int(value.scaleb(PRICE_SCALE).to_integral_value(ROUND_HALF_UP))
+
+
+def scaled_column(column: ColumnElement, scale: int = PRICE_SCALE) -> ColumnElement:
+    """SQL expression loading a ``Numeric(.., scale)`` column as exact scaled integers."""
+    return cast(column * 10**scale, BigInteger)
@@ -0,0 +1,115 @@
+"""Fast JSON rendering for large responses.
+
+Hot endpoints (trade pages, equity curves) build plain dicts straight from ORM objects or
+query rows and encode them with orjson, skipping pydantic re-validation of data that came
+out of our own database. Output keys and formats match the pydantic ``response_model`` of
+each endpoint.
+
+Decimal policy, controlled by ``JSON_DECIMAL_MODE``:
+
+* ``string`` (default) - Decimals are emitted as strings, e.g. ``"10.500000"``, exactly
+  like pydantic does. Lossless; clients parse them with a decimal type.
+* ``float`` - Decimals are emitted as JSON numbers. Smaller and faster to parse, but values
+  beyond ~15 significant digits lose precision. Only affects fast-path responses.
+"""
+
+from __future__ import annotations
+
+import os
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from .. import models, schemas
+from ..tracing import traced
+
+DECIMAL_MODE = os.getenv("JSON_DECIMAL_MODE", "string").lower()
+if DECIMAL_MODE not in {"string", "float"}:
+    raise ValueError("JSON_DECIMAL_MODE must be 'string' or 'float'")
+
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value) if DECIMAL_MODE == "float" else str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+@traced()
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ---------------------------------------------------------------------------
+# ORM -> dict builders
+# ---------------------------------------------------------------------------
+
+
+def _field_map(schema: Type[BaseModel], skip: Tuple[str, ...] = ()) -> List[Tuple[str, str]]:
+    """Return ``(output key, attribute name)`` pairs for a response schema, honouring aliases."""
+    return [
+        (field.alias or name, name)
+        for name, field in schema.model_fields.items()
+        if name not in skip
+    ]
+
+
+_TAG_FIELDS = _field_map(schemas.Tag)
+_STRATEGY_FIELDS = _field_map(schemas.Strategy)
+_ACCOUNT_FIELDS = _field_map(schemas.Account)
+_TRADE_FIELDS = _field_map(schemas.Trade, skip=("strategy", "account", "tags"))
+_NORMALIZED_TRADE_FIELDS = _field_map(schemas.NormalizedTrade)
+
+
+def _dump(obj: Any, fields: List[Tuple[str, str]]) -> Dict[str, Any]:
+    return {key: getattr(obj, attribute) for key, attribute in fields}
+
+
+def _memoized(fields: List[Tuple[str, str]]) -> Callable[[Any], Dict[str, Any]]:
+    cache: Dict[Any, Dict[str, Any]] = {}
+
+    def dump(obj: Any) -> Dict[str, Any]:
+        cached = cache.get(obj.id)
+        if cached is None:
+            cached = cache[obj.id] = _dump(obj, fields)
+        return cached
+
+    return dump
+
+
+@traced()
+def trades_to_dicts(trades: List[models.Trade]) -> List[Dict[str, Any]]:
+    """Render trades like ``schemas.Trade``; related entities shared across rows are dumped once."""
+    dump_strategy = _memoized(_STRATEGY_FIELDS)
+    dump_account = _memoized(_ACCOUNT_FIELDS)
+    dump_tag = _memoized(_TAG_FIELDS)
+
+    result: List[Dict[str, Any]] = []
+    for trade in trades:
+        item = _dump(trade, _TRADE_FIELDS)
+        item["strategy"] = dump_strategy(trade.strategy)
+        item["account"] = dump_account(trade.account)
+        item["tags"] = [dump_tag(tag) for tag in trade.tags]
+        result.append(item)
+    return result
+
+
+@traced()
+def normalized_trades_to_dicts(trades: List[schemas.NormalizedTrade]) -> List[Dict[str, Any]]:
+    return [_dump(trade, _NORMALIZED_TRADE_FIELDS) for trade in trades]
+
+
+def entities_to_dict(entities: Dict[Any, Any], schema: Type[BaseModel]) -> Dict[Any, Dict[str, Any]]:
+    fields = _field_map(schema)
+    return {entity_id: _dump(entity, fields) for entity_id, entity in entities.items()}
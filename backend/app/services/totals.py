@@ -0,0 +1,122 @@
+"""Additive trade totals behind the dashboard KPIs and per-group summaries.
+
+Every dashboard figure is derived from a handful of integer sums and counts over trades
+(micro-units, see ``fixed_point``). Keeping those sums instead of the trades means a total can
+be updated for one changed trade by subtracting its old values and adding its new ones, which
+is how the live dashboard (``app.live``) stays current without re-reading the journal.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable, Optional, Tuple
+
+from .. import schemas
+from .fixed_point import from_micros
+
+DECIMAL_ZERO = Decimal("0")
+
+Summary = Tuple[int, float, float, float, float, float, Decimal]
+
+
+class TradeTotals:
+    """Running sums over ``(pnl, r_multiple)`` pairs; ``add(..., sign=-1)`` removes a trade."""
+
+    __slots__ = (
+        "trades",
+        "wins",
+        "losses",
+        "pnl",
+        "gross_profit",
+        "gross_loss",
+        "r_count",
+        "r_sum",
+        "win_r_count",
+        "win_r_sum",
+        "loss_r_count",
+        "loss_r_sum",
+    )
+
+    def __init__(self) -> None:
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, Optional[int]]]) -> "TradeTotals":
+        totals = cls()
+        for pnl, r_multiple in rows:
+            totals.add(pnl, r_multiple)
+        return totals
+
+    @classmethod
+    def from_sums(cls, sums: Iterable[Optional[int]]) -> "TradeTotals":
+        """Build from aggregates listed in ``__slots__`` order (as ``crud.get_trade_totals`` selects them)."""
+        totals = cls()
+        for name, value in zip(cls.__slots__, sums):
+            setattr(totals, name, int(value or 0))
+        return totals
+
+    def add(self, pnl: int, r_multiple: Optional[int], sign: int = 1) -> None:
+        self.trades += sign
+        self.pnl += sign * pnl
+        if pnl > 0:
+            self.wins += sign
+            self.gross_profit += sign * pnl
+        elif pnl < 0:
+            self.losses += sign
+            self.gross_loss += sign * pnl
+        if r_multiple is not None:
+            self.r_count += sign
+            self.r_sum += sign * r_multiple
+            if r_multiple > 0:
+                self.win_r_count += sign
+                self.win_r_sum += sign * r_multiple
+            elif r_multiple < 0:
+                self.loss_r_count += sign
+                self.loss_r_sum += sign * r_multiple
+
+    def merge(self, other: "TradeTotals") -> None:
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def kpis(self) -> schemas.KPIsResponse:
+        if not self.trades:
+            return schemas.KPIsResponse(
+                total_pnl=DECIMAL_ZERO,
+                win_rate=0.0,
+                total_trades=0,
+                winning_trades=0,
+                losing_trades=0,
+                average_win=DECIMAL_ZERO,
+                average_loss=DECIMAL_ZERO,
+                profit_factor=0.0,
+            )
+        return schemas.KPIsResponse(
+            total_pnl=from_micros(self.pnl),
+            win_rate=self.wins / self.trades,
+            total_trades=self.trades,
+            winning_trades=self.wins,
+            losing_trades=self.losses,
+            average_win=from_micros(self.gross_profit) / self.wins if self.wins else DECIMAL_ZERO,
+            average_loss=from_micros(self.gross_loss) / self.losses if self.losses else DECIMAL_ZERO,
+            profit_factor=self._profit_factor(),
+        )
+
+    def summary(self) -> Summary:
+        """``(trades, win_rate, expectancy_r, profit_factor, total_r, average_r, total_pnl)``."""
+        if not self.trades:
+            return 0, 0.0, 0.0, 0.0, 0.0, 0.0, DECIMAL_ZERO
+
+        win_rate = self.wins / self.trades
+        if self.r_count:
+            total_r = float(from_micros(self.r_sum))
+            average_r = total_r / self.r_count
+            avg_win_r = float(from_micros(self.win_r_sum) / self.win_r_count) if self.win_r_count else 0.0
+            avg_loss_r = float(from_micros(self.loss_r_sum) / self.loss_r_count) if self.loss_r_count else 0.0
+            expectancy_r = win_rate * avg_win_r - (1 - win_rate) * abs(avg_loss_r)
+        else:
+            total_r = average_r = expectancy_r = 0.0
+        return self.trades, win_rate, expectancy_r, self._profit_factor(), total_r, average_r, from_micros(self.pnl)
+
+    def _profit_factor(self) -> float:
+        return float(Decimal(self.gross_profit) / Decimal(-self.gross_loss)) if self.gross_loss else float("inf")
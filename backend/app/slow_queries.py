@@ -0,0 +1,191 @@
+"""Slow-query log: statements over ``SLOW_QUERY_MS`` with their shape, caller and sampled plans.
+
+Every SQL statement is timed at the cursor. One that takes longer than the threshold is recorded
+with:
+
+* its SQL with whitespace collapsed and expanded ``IN`` lists folded to ``(...)``, so the
+  variants built by ``crud._apply_trade_filters`` group by which filters were applied
+* the bound parameters' shape (name and type, never values)
+* the ``app`` function that ran it, e.g. ``crud.get_strategy_dashboard``
+* for a ``SLOW_QUERY_EXPLAIN_RATE`` sample of read statements, an ``EXPLAIN (ANALYZE, BUFFERS)``
+  plan. It is captured by a background thread on a separate connection, inside a read-only
+  transaction, so the request never waits for it and a plan never writes. The statement runs
+  again to produce the plan, with the request's parameter values (kept only in memory) and
+  against committed data.
+
+Entries are logged as JSON on this module's logger, appended to ``SLOW_QUERY_LOG_PATH`` (JSON
+lines) when set, and kept in memory (the last ``SLOW_QUERY_BUFFER``) for
+``GET /api/admin/slow-queries``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements slower than this are recorded; 0 disables the log.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+# Share of slow read statements whose plan is captured with EXPLAIN ANALYZE.
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "30000"))
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "")
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "500"))
+
+logger = logging.getLogger(__name__)
+
+_STARTED_KEY = "slow_query_started"
+_IN_LIST = re.compile(r"\((?:\s*%\(\w+\)s\s*,)+\s*%\(\w+\)s\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_READ_STATEMENT = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    return _IN_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Names and types of the bound parameters, without their values."""
+    if isinstance(parameters, dict):
+        return {name: _value_shape(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: the shape of one row and how many rows there were
+            return {"rows": len(parameters), "row": parameter_shape(parameters[0])}
+        return [_value_shape(value) for value in parameters]
+    return None
+
+
+def _value_shape(value: Any) -> str:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def calling_function() -> Optional[str]:
+    """The innermost ``app`` function on the stack, such as ``crud.get_kpis``."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and module not in {__name__, "app.metrics", "app.database"}:
+            return f"{module[len('app.'):]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog:
+    """Recent slow statements plus the background plan capture; thread-safe."""
+
+    def __init__(self, size: int = SLOW_QUERY_BUFFER) -> None:
+        self._lock = threading.Lock()
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        self._pending = 0
+
+    def record(self, engine: Engine, statement: str, parameters: Any, seconds: float, rows: int) -> Dict[str, Any]:
+        sql = normalize_sql(statement)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(seconds * 1000, 3),
+            "fingerprint": hashlib.sha1(sql.encode()).hexdigest()[:16],
+            "caller": calling_function(),
+            "sql": sql,
+            "parameters": parameter_shape(parameters),
+            "rows": rows,
+            "plan": None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+        if _READ_STATEMENT.match(statement) and random.random() < SLOW_QUERY_EXPLAIN_RATE:
+            with self._lock:
+                self._pending += 1
+            self._explainer.submit(self._explain_and_write, engine, statement, parameters, entry)
+        else:
+            self._write(entry)
+        return entry
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def wait_for_plans(self, timeout: float = 30.0) -> None:
+        """Block until queued plan captures are done (for tests and shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _explain_and_write(self, engine: Engine, statement: str, parameters: Any, entry: Dict[str, Any]) -> None:
+        try:
+            entry["plan"] = explain(engine, statement, parameters)
+        except Exception as exc:  # noqa: BLE001
+            entry["plan_error"] = str(exc).strip().splitlines()[0]
+        finally:
+            self._write(entry)
+            with self._lock:
+                self._pending -= 1
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, default=str)
+        logger.warning("slow query: %s", line)
+        if SLOW_QUERY_LOG_PATH:
+            with self._lock, open(SLOW_QUERY_LOG_PATH, "a", encoding="utf-8") as log_file:
+                log_file.write(line + "\n")
+
+
+def explain(engine: Engine, statement: str, parameters: Any) -> str:
+    """``EXPLAIN (ANALYZE, BUFFERS)`` on a raw connection, so the hooks below do not see it."""
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            # First statement of the transaction psycopg2 opens implicitly.
+            cursor.execute("SET TRANSACTION READ ONLY")
+            cursor.execute(f"SET LOCAL statement_timeout = {int(SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters or None)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        return plan
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+slow_query_log = SlowQueryLog()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    if SLOW_QUERY_MS > 0:
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_if_slow(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get(_STARTED_KEY)
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        slow_query_log.record(conn.engine, statement, parameters, seconds, max(cursor.rowcount, 0))
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_timer(exception_context) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get(_STARTED_KEY):
+        connection.info[_STARTED_KEY].pop()
@@ -0,0 +1,357 @@
+"""Sampled request tracing: where the time of one request goes.
+
+``TracingMiddleware`` starts a trace for a ``TRACE_SAMPLE_RATE`` share of HTTP requests, and for
+every request sent with an ``X-Trace: 1`` header. A traced request has spans for:
+
+* ``route``: the whole route handler, split into ``prepare`` (body parsing, validation and
+  dependencies), the ``handler`` itself and ``serialize`` (response model validation, including
+  the lazy loads it triggers, and rendering)
+* functions decorated with ``@traced()``, such as the ``crud`` functions and
+  ``calculations.calculate_trade_metrics``, nested under whatever called them
+* every SQL statement, with its normalized text, and each session commit (flush included)
+
+Untraced requests pay one context variable lookup per decorated call and statement. Finished
+traces are appended to ``TRACE_LOG_PATH`` (JSON lines) when set, and the last ``TRACE_BUFFER``
+are kept for ``GET /api/admin/traces``. Traced responses carry an ``X-Trace-Id`` header.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .slow_queries import normalize_sql
+
+# Share of requests traced; requests with an ``X-Trace: 1`` header always are.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "")
+TRACE_BUFFER = int(os.getenv("TRACE_BUFFER", "200"))
+# Spans kept per trace; a request running more statements than this stops recording new ones.
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "2000"))
+
+TRACE_HEADER = b"x-trace"
+TRACE_ID_HEADER = b"x-trace-id"
+_STARTED_KEY = "trace_sql_spans"
+_COMMIT_KEY = "trace_commit_span"
+
+F = TypeVar("F", bound=Callable)
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "kind", "start", "end", "attributes")
+
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, kind: str, start: float) -> None:
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = start
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = {}
+
+
+class Trace:
+    """Spans of one request; spans are added from the event loop and threadpool threads alike."""
+
+    def __init__(self, name: str) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.origin = time.perf_counter()
+        self.attributes: Dict[str, Any] = {}
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._ids = itertools.count(1)
+
+    def start_span(self, name: str, kind: str, parent: Optional[Span], start: Optional[float] = None) -> Optional[Span]:
+        if parent is not None and len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return None
+        span = Span(
+            next(self._ids),
+            parent.span_id if parent is not None else None,
+            name,
+            kind,
+            time.perf_counter() if start is None else start,
+        )
+        self.spans.append(span)
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        root = self.spans[0]
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": _ms(root.end - root.start) if root.end is not None else None,
+            "attributes": self.attributes,
+            "dropped_spans": self.dropped,
+            "spans": [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "kind": span.kind,
+                    "start_ms": _ms(span.start - self.origin),
+                    "duration_ms": _ms(span.end - span.start) if span.end is not None else None,
+                    "attributes": span.attributes,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+# The trace of the running request and its innermost open span; ``None`` when not sampled.
+_current: ContextVar[Optional[Tuple[Trace, Optional[Span]]]] = ContextVar("trace_current", default=None)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Optional[Span]]:
+    """A child span of the current one; does nothing outside a sampled request."""
+    current = _current.get()
+    if current is None:
+        yield None
+        return
+    trace, parent = current
+    child = trace.start_span(name, kind, parent)
+    if child is None:
+        yield None
+        return
+    child.attributes.update(attributes)
+    token = _current.set((trace, child))
+    try:
+        yield child
+    except BaseException as exc:
+        child.attributes["error"] = type(exc).__name__
+        raise
+    finally:
+        _current.reset(token)
+        child.end = time.perf_counter()
+
+
+def traced(name: Optional[str] = None, kind: str = "function") -> Callable[[F], F]:
+    """Decorator opening a span, named ``module.function`` by default, around each call."""
+
+    def decorate(function: F) -> F:
+        span_name = name or f"{function.__module__.rpartition('.')[2]}.{function.__qualname__}"
+
+        if asyncio.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if _current.get() is None:
+                    return await function(*args, **kwargs)
+                with span(span_name, kind):
+                    return await function(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return function(*args, **kwargs)
+            with span(span_name, kind):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+class TraceLog:
+    """Recently finished traces; thread-safe."""
+
+    def __init__(self, size: int = TRACE_BUFFER) -> None:
+        self._lock = threading.Lock()
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=size)
+
+    def record(self, trace: Trace) -> Dict[str, Any]:
+        entry = trace.to_dict()
+        with self._lock:
+            self._traces.append(entry)
+            if TRACE_LOG_PATH:
+                with open(TRACE_LOG_PATH, "a", encoding="utf-8") as log_file:
+                    log_file.write(json.dumps(entry, default=str) + "\n")
+        return entry
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._traces)
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((entry for entry in self._traces if entry["trace_id"] == trace_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+trace_log = TraceLog()
+
+
+# ---------------------------------------------------------------------------
+# HTTP requests and routes
+# ---------------------------------------------------------------------------
+
+
+def _sampled(scope) -> bool:
+    for key, value in scope.get("headers", ()):
+        if key == TRACE_HEADER:
+            return value in (b"1", b"true")
+    return TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE
+
+
+class TracingMiddleware:
+    """ASGI middleware starting sampled traces and recording them once the response is sent."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not _sampled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(f"{scope['method']} {scope['path']}")
+        root = trace.start_span(trace.name, "request", None)
+        token = _current.set((trace, root))
+
+        async def send_with_trace_id(message) -> None:
+            if message["type"] == "http.response.start":
+                trace.attributes["status"] = message["status"]
+                message["headers"] = [*message.get("headers", ()), (TRACE_ID_HEADER, trace.trace_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        except BaseException as exc:
+            root.attributes["error"] = type(exc).__name__
+            raise
+        finally:
+            _current.reset(token)
+            root.end = time.perf_counter()
+            route = scope.get("route")
+            if route is not None:
+                trace.name = root.name = f"{scope['method']} {route.path}"
+            trace.attributes.setdefault("path", scope["path"])
+            trace_log.record(trace)
+
+
+class TracedRoute(APIRoute):
+    """Route class adding ``route``, ``prepare``, ``handler`` and ``serialize`` spans."""
+
+    def get_route_handler(self) -> Callable:
+        # ``route.endpoint`` stays the undecorated function; only the call FastAPI makes is wrapped.
+        self.dependant.call = traced(kind="handler")(self.dependant.call)
+        handle = super().get_route_handler()
+
+        async def traced_handler(request):
+            current = _current.get()
+            if current is None:
+                return await handle(request)
+            with span("route", "route", path=self.path) as route_span:
+                response = await handle(request)
+            if route_span is not None:
+                _split_route_span(current[0], route_span)
+            return response
+
+        return traced_handler
+
+
+def _split_route_span(trace: Trace, route_span: Span) -> None:
+    """Derive ``prepare`` and ``serialize`` spans from the gaps around the handler span."""
+    handler = next(
+        (item for item in trace.spans if item.parent_id == route_span.span_id and item.kind == "handler"), None
+    )
+    if handler is None or handler.end is None:
+        return
+    for name, start, end in (("prepare", route_span.start, handler.start), ("serialize", handler.end, route_span.end)):
+        derived = trace.start_span(name, "route", route_span, start)
+        if derived is not None:
+            derived.end = end
+
+
+# ---------------------------------------------------------------------------
+# SQL statements and commits
+# ---------------------------------------------------------------------------
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_span(conn, cursor, statement, parameters, context, executemany) -> None:
+    current = _current.get()
+    if current is None:
+        return
+    trace, parent = current
+    statement_span = trace.start_span("sql", "sql", parent)
+    if statement_span is not None:
+        statement_span.attributes["statement"] = normalize_sql(statement)
+        if executemany:
+            statement_span.attributes["executemany"] = len(parameters)
+    conn.info.setdefault(_STARTED_KEY, []).append(statement_span)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement_span(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get(_STARTED_KEY)
+    if not started:
+        return
+    statement_span = started.pop()
+    if statement_span is not None:
+        statement_span.end = time.perf_counter()
+        statement_span.attributes["rows"] = max(cursor.rowcount, 0)
+
+
+@event.listens_for(Engine, "handle_error")
+def _fail_statement_span(exception_context) -> None:
+    connection = exception_context.connection
+    started = connection.info.get(_STARTED_KEY) if connection is not None else None
+    if started:
+        statement_span = started.pop()
+        if statement_span is not None:
+            statement_span.end = time.perf_counter()
+            statement_span.attributes["error"] = type(exception_context.original_exception).__name__
+
+
+@event.listens_for(Session, "before_commit")
+def _start_commit_span(session) -> None:
+    current = _current.get()
+    if current is not None:
+        trace, parent = current
+        session.info[_COMMIT_KEY] = trace.start_span("session.commit", "commit", parent)
+
+
+@event.listens_for(Session, "after_commit")
+def _end_commit_span(session) -> None:
+    commit_span = session.info.pop(_COMMIT_KEY, None)
+    if commit_span is not None:
+        commit_span.end = time.perf_counter()
+
+
+@event.listens_for(Session, "after_rollback")
+def _abandon_commit_span(session) -> None:
+    commit_span = session.info.pop(_COMMIT_KEY, None)
+    if commit_span is not None:
+        commit_span.end = time.perf_counter()
+        commit_span.attributes["error"] = "rolled back"
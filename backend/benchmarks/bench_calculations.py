@@ -0,0 +1,71 @@
+"""Compare per-trade ``calculate_trade_metrics`` calls with the batch API.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_calculations
+"""
+
+from __future__ import annotations
+
+import random
+import timeit
+from typing import Dict, List
+
+from app.models import TradeDirection
+from app.services import calculations
+from app.services.fixed_point import PRICE_SCALE, QUANTITY_SCALE, from_scaled
+
+TRADES = 100_000
+
+
+def build_columns(count: int) -> Dict[str, List]:
+    rng = random.Random(7)
+    entries = [rng.randint(4_000_000000, 6_000_000000) for _ in range(count)]
+    return {
+        "direction": [rng.choice([TradeDirection.LONG, TradeDirection.SHORT]) for _ in range(count)],
+        "entry_price": entries,
+        "exit_price": [entry + rng.randint(-20_000000, 20_000000) for entry in entries],
+        "quantity": [rng.randint(1, 10) * 100 for _ in range(count)],
+        "commissions": [rng.randint(0, 900) for _ in range(count)],
+        "stop_loss": [None if i % 4 == 0 else entry - 5_250000 for i, entry in enumerate(entries)],
+        "take_profit": [None if i % 3 == 0 else entry + 15_500000 for i, entry in enumerate(entries)],
+    }
+
+
+def as_decimals(columns: Dict[str, List]) -> List[Dict[str, object]]:
+    scales = {"quantity": QUANTITY_SCALE, "commissions": QUANTITY_SCALE}
+    converted = {
+        key: values
+        if key == "direction"
+        else [None if value is None else from_scaled(value, scales.get(key, PRICE_SCALE)) for value in values]
+        for key, values in columns.items()
+    }
+    return [dict(zip(converted, row)) for row in zip(*converted.values())]
+
+
+def scalar(rows: List[Dict[str, object]]) -> List[tuple]:
+    return [calculations.calculate_trade_metrics(**row) for row in rows]
+
+
+def batch(columns: Dict[str, List]) -> List[tuple]:
+    return list(calculations.calculate_trade_metrics_batch(**columns).rows())
+
+
+def main() -> None:
+    columns = build_columns(TRADES)
+    rows = as_decimals(columns)
+    assert scalar(rows[:1000]) == batch({key: values[:1000] for key, values in columns.items()})
+
+    slow = min(timeit.repeat(lambda: scalar(rows), number=1, repeat=3))
+    quick = min(timeit.repeat(lambda: batch(columns), number=1, repeat=3))
+    metrics_only = min(
+        timeit.repeat(lambda: calculations.calculate_trade_metrics_batch(**columns), number=1, repeat=3)
+    )
+    print(f"{TRADES} trades")
+    print(f"  scalar, Decimal in/out        {slow * 1000:8.1f} ms")
+    print(f"  batch, int columns out        {metrics_only * 1000:8.1f} ms   x{slow / metrics_only:4.1f}")
+    print(f"  batch + per-row Decimal rows  {quick * 1000:8.1f} ms   x{slow / quick:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
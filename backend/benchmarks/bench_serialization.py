@@ -0,0 +1,144 @@
+"""Compare pydantic response rendering with the orjson fast path, and JSON with Arrow streams.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_serialization
+"""
+
+from __future__ import annotations
+
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from app import models, schemas
+from app.services import arrow, serialization
+
+NOW = datetime(2024, 5, 1, 13, 30, tzinfo=timezone.utc)
+
+
+def build_trades(count: int) -> List[models.Trade]:
+    strategies = [
+        models.Strategy(
+            id=uuid.uuid4(),
+            name=f"Strategy {i}",
+            timeframes=["15M", "1H"],
+            preferred_direction=models.PreferredDirection.BOTH,
+            created_at=NOW,
+            updated_at=NOW,
+        )
+        for i in range(4)
+    ]
+    accounts = [
+        models.Account(
+            id=uuid.uuid4(),
+            name=f"Account {i}",
+            type=models.AccountType.FUNDED,
+            initial_balance=Decimal("100000.00"),
+            current_balance=Decimal("101234.50"),
+            created_at=NOW,
+            updated_at=NOW,
+        )
+        for i in range(3)
+    ]
+    tags = [models.Tag(id=uuid.uuid4(), name=f"tag-{i}", type="custom", created_at=NOW, updated_at=NOW) for i in range(6)]
+
+    trades: List[models.Trade] = []
+    for i in range(count):
+        strategy = strategies[i % len(strategies)]
+        account = accounts[i % len(accounts)]
+        trades.append(
+            models.Trade(
+                id=uuid.uuid4(),
+                symbol="NQ",
+                direction=models.TradeDirection.LONG,
+                quantity=Decimal("2.00"),
+                session=models.TradeSession.NY,
+                strategy=strategy,
+                strategy_id=strategy.id,
+                account=account,
+                account_id=account.id,
+                entry_timestamp=NOW + timedelta(minutes=i),
+                exit_timestamp=NOW + timedelta(minutes=i + 5),
+                entry_price=Decimal("15234.500000"),
+                stop_loss_planned=Decimal("15220.500000"),
+                take_profit_planned=Decimal("15270.500000"),
+                exit_price=Decimal("15264.500000"),
+                commissions=Decimal("4.50"),
+                risk_per_trade=Decimal("28.000000"),
+                rr_planned=Decimal("2.571429"),
+                pnl=Decimal("55.500000"),
+                r_multiple=Decimal("1.982143"),
+                import_method="manual",
+                confirmations=["OTE", "BOS Confirmed"],
+                confirmations_count=2,
+                tags=tags[i % 3 : i % 3 + 2],
+                created_at=NOW,
+                updated_at=NOW,
+            )
+        )
+    return trades
+
+
+def pydantic_trade_page(trades: List[models.Trade]) -> bytes:
+    response = schemas.TradeListResponse(trades=trades, total=len(trades), page=1, per_page=len(trades))
+    return response.model_dump_json(by_alias=True).encode()
+
+
+def fast_trade_page(trades: List[models.Trade]) -> bytes:
+    return serialization.dumps(
+        {"trades": serialization.trades_to_dicts(trades), "total": len(trades), "page": 1, "per_page": len(trades)}
+    )
+
+
+_CURVE_ADAPTER = TypeAdapter(List[schemas.EquityCurvePoint])
+
+
+def pydantic_curve(points: List[dict]) -> bytes:
+    return _CURVE_ADAPTER.dump_json([schemas.EquityCurvePoint(**point) for point in points])
+
+
+def fast_curve(points: List[dict]) -> bytes:
+    return serialization.dumps(points)
+
+
+def arrow_curve(days: np.ndarray, cumulative_micros: np.ndarray) -> bytes:
+    return arrow.ArrowStreamResponse(arrow.equity_curve_table(days, cumulative_micros)).body
+
+
+def report(label: str, baseline, fast, number: int, names=("pydantic", "fast")) -> None:
+    slow = min(timeit.repeat(baseline, number=number, repeat=5)) / number
+    quick = min(timeit.repeat(fast, number=number, repeat=5)) / number
+    print(f"{label:<28} {names[0]} {slow * 1000:9.3f} ms   {names[1]} {quick * 1000:9.3f} ms   x{slow / quick:5.1f}")
+
+
+def main() -> None:
+    trades = build_trades(100)
+    report("trade page (100 rows)", lambda: pydantic_trade_page(trades), lambda: fast_trade_page(trades), 200)
+
+    cumulative = Decimal("0")
+    points = []
+    for i in range(100_000):
+        cumulative += Decimal("12.345600") if i % 3 else Decimal("-7.250000")
+        points.append({"date": (NOW + timedelta(days=i // 50)).strftime("%Y-%m-%d"), "cumulative_pnl": cumulative})
+    report("equity curve (100k points)", lambda: pydantic_curve(points), lambda: fast_curve(points), 3)
+
+    # The Arrow path starts from the integer columns ``crud.get_equity_curve_columns`` returns.
+    days = (np.datetime64(NOW.date(), "D") + np.arange(100_000) // 50).astype(np.int64).astype(np.int32)
+    cumulative_micros = np.cumsum(np.where(np.arange(100_000) % 3, 12_345_600, -7_250_000))
+    report(
+        "equity curve, JSON vs Arrow",
+        lambda: fast_curve(points),
+        lambda: arrow_curve(days, cumulative_micros),
+        3,
+        names=("orjson", "arrow"),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare per-request statement building for the hot trade queries.
+
+``query`` rebuilds a Query (and its cache key) on every call, as ``crud`` used to; ``lambda``
+is the cached ``lambda_stmt`` path now used by ``crud``. Both run against an empty journal, so
+the numbers are dominated by Python-side statement overhead rather than the database.
+
+Run from ``backend/``::
+
+    BENCH_DATABASE_URL=postgresql:///trading_journal_test python -m benchmarks.bench_statement_cache
+"""
+
+from __future__ import annotations
+
+import os
+import timeit
+import uuid
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session, joinedload
+
+from app import crud, models
+from app.database import Base, statement_cache_stats
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "postgresql:///trading_journal_test")
+ACCOUNT_ID = uuid.uuid4()
+
+
+def query_list_trades(db: Session) -> list:
+    query = db.query(models.Trade).options(
+        joinedload(models.Trade.strategy), joinedload(models.Trade.account), joinedload(models.Trade.tags)
+    )
+    query = query.filter(models.Trade.account_id == ACCOUNT_ID, models.Trade.symbol == "NQ")
+    return query.order_by(models.Trade.exit_timestamp.desc()).offset(0).limit(20).all()
+
+
+def lambda_list_trades(db: Session) -> list:
+    return crud.list_trades(db, skip=0, limit=20, account_id=ACCOUNT_ID, symbol="NQ")
+
+
+def query_count(db: Session) -> int:
+    query = db.query(func.count(models.Trade.id))
+    return query.filter(models.Trade.account_id == ACCOUNT_ID, models.Trade.symbol == "NQ").scalar() or 0
+
+
+def lambda_count(db: Session) -> int:
+    return crud.get_trade_count(db, account_id=ACCOUNT_ID, symbol="NQ")
+
+
+def report(label: str, db: Session, baseline, cached, number: int) -> None:
+    slow = min(timeit.repeat(lambda: baseline(db), number=number, repeat=5)) / number
+    quick = min(timeit.repeat(lambda: cached(db), number=number, repeat=5)) / number
+    print(f"{label:<14} query {slow * 1e6:8.1f} us   lambda {quick * 1e6:8.1f} us   x{slow / quick:4.2f}")
+
+
+def main() -> None:
+    engine = create_engine(BENCH_DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as db:
+        report("list_trades", db, query_list_trades, lambda_list_trades, 500)
+        report("trade count", db, query_count, lambda_count, 1000)
+    print(f"statement cache: {statement_cache_stats.snapshot()}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""Drive the real API over HTTP with many concurrent users and report latency per route.
+
+Starts uvicorn against ``BENCH_DATABASE_URL`` (or targets ``--url``), then runs ``--concurrency``
+virtual users for ``--duration`` seconds. Each user repeatedly picks a scenario from the
+weighted ``--mix`` and runs it as a browser would:
+
+* ``create``: ``POST /api/trades``
+* ``csv``: ``POST /api/trades/csv`` with ``--csv-rows`` rows
+* ``list``: ``GET /api/trades`` for a few consecutive pages, sometimes filtered by account
+* ``dashboard``: ``GET /api/dashboard/bundle``, the dashboard page's one read
+
+Alongside the users, a probe requests ``GET /health`` (an ``async`` route that touches no
+database) every 50 ms: its latency rising with load means the event loop itself is blocked.
+Pool waits and timeouts are read from ``/metrics`` before and after the run.
+
+Requests made during ``--warmup`` are not counted. The report lists requests, errors,
+throughput and p50/p95/p99/max latency per route; ``--json`` also writes it to a file for
+comparison between runs. Run from ``backend/`` against a journal from ``benchmarks.synthetic``::
+
+    BENCH_DATABASE_URL=postgresql:///tj_bench python -m benchmarks.load --concurrency 32 --duration 60
+    python -m benchmarks.load --url http://localhost:8000 --mix create=1,list=4,dashboard=2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "postgresql:///tj_bench")
+DEFAULT_MIX = "create=2,csv=0.2,list=5,dashboard=2"
+PROBE_INTERVAL = 0.05
+POOL_METRICS = ("db_pool_checkout_wait_seconds_total", "db_pool_checkout_timeouts_total", "db_pool_checkouts_total")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[int, int] = field(default_factory=lambda: defaultdict(int))
+
+    def summary(self, seconds: float) -> Dict[str, float]:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "rps": round(len(latencies) / seconds, 2) if seconds else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 2),
+            # 0 stands for a connection error or client timeout.
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+        }
+
+
+class Recorder:
+    """Times requests per route template; nothing is kept until ``start`` is called."""
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self.client = client
+        self.routes: Dict[str, RouteStats] = defaultdict(RouteStats)
+        self.recording = False
+        self.started = 0.0
+        self.stopped = 0.0
+
+    def start(self) -> None:
+        self.recording, self.started = True, time.perf_counter()
+
+    def stop(self) -> None:
+        self.recording, self.stopped = False, time.perf_counter()
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            stats = self.routes[route]
+            stats.latencies.append(elapsed)
+            status = response.status_code if response is not None else 0
+            stats.statuses[status] += 1
+            if response is None or response.status_code >= 400:
+                stats.errors += 1
+        return response
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        seconds = self.stopped - self.started
+        return {route: stats.summary(seconds) for route, stats in sorted(self.routes.items())}
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Context:
+    account_ids: List[str]
+    strategy_ids: List[str]
+    pages: int
+    csv_rows: int
+
+
+def _trade_fields(rng: random.Random, context: Context) -> Dict[str, str]:
+    entry = round(rng.uniform(4800, 5400) * 4) / 4
+    stop = entry - rng.randint(8, 40) * 0.25
+    move = rng.choice((-1, 1)) * rng.randint(4, 80) * 0.25
+    exit_at = datetime(2024, 1, 2, tzinfo=timezone.utc) + timedelta(days=rng.randrange(365), hours=rng.randint(13, 20))
+    return {
+        "symbol": "ES",
+        "direction": "Long",
+        "quantity": str(rng.randint(1, 3)),
+        "strategy_id": rng.choice(context.strategy_ids),
+        "account_id": rng.choice(context.account_ids),
+        "entry_datetime": (exit_at - timedelta(minutes=rng.randint(1, 120))).isoformat(),
+        "exit_datetime": exit_at.isoformat(),
+        "entry_price": str(entry),
+        "stop_loss_planned": str(stop),
+        "exit_price": str(entry + move),
+        "commissions": "2.50",
+    }
+
+
+async def create_scenario(recorder: Recorder, rng: random.Random, context: Context) -> None:
+    fields = _trade_fields(rng, context)
+    payload = {
+        **fields,
+        "entryDateTime": fields.pop("entry_datetime"),
+        "exitDateTime": fields.pop("exit_datetime"),
+        "stopLossPlanned": fields.pop("stop_loss_planned"),
+        "tag_names": rng.sample(["Breaker", "FVG", "Order Block", "FOMO", "Calm"], rng.randint(0, 2)),
+    }
+    await recorder.request("POST /api/trades", "POST", "/api/trades", json=payload)
+
+
+async def csv_scenario(recorder: Recorder, rng: random.Random, context: Context) -> None:
+    rows = [_trade_fields(rng, context) for _ in range(context.csv_rows)]
+    header = list(rows[0])
+    body = "\n".join([",".join(header), *(",".join(row[name] for name in header) for row in rows)]) + "\n"
+    await recorder.request(
+        "POST /api/trades/csv", "POST", "/api/trades/csv", files={"file": ("trades.csv", body, "text/csv")}
+    )
+
+
+async def list_scenario(recorder: Recorder, rng: random.Random, context: Context) -> None:
+    params: Dict[str, object] = {"per_page": 50}
+    if rng.random() < 0.5:
+        params["account_id"] = rng.choice(context.account_ids)
+    first_page = rng.randint(1, context.pages)
+    for page in range(first_page, first_page + rng.randint(1, 3)):
+        await recorder.request("GET /api/trades", "GET", "/api/trades", params={**params, "page": page})
+
+
+async def dashboard_scenario(recorder: Recorder, rng: random.Random, context: Context) -> None:
+    await recorder.request("GET /api/dashboard/bundle", "GET", "/api/dashboard/bundle")
+
+
+Scenario = Callable[[Recorder, random.Random, Context], Awaitable[None]]
+SCENARIOS: Dict[str, Scenario] = {
+    "create": create_scenario,
+    "csv": csv_scenario,
+    "list": list_scenario,
+    "dashboard": dashboard_scenario,
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+
+
+async def _user(recorder: Recorder, mix: Dict[str, float], context: Context, seed: int, deadline: float) -> None:
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        await SCENARIOS[rng.choices(names, weights)[0]](recorder, rng, context)
+
+
+async def _probe(recorder: Recorder, deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        await recorder.request("GET /health (loop probe)", "GET", "/health")
+        await asyncio.sleep(PROBE_INTERVAL)
+
+
+async def _load_context(client: httpx.AsyncClient, per_page: int, csv_rows: int) -> Context:
+    accounts = (await client.get("/api/accounts")).raise_for_status().json()
+    strategies = (await client.get("/api/strategies")).raise_for_status().json()
+    if not accounts or not strategies:
+        raise SystemExit("The target has no accounts or strategies; run python -m benchmarks.synthetic first")
+    total = (await client.get("/api/trades", params={"per_page": 1})).raise_for_status().json()["total"]
+    return Context(
+        account_ids=[account["id"] for account in accounts],
+        strategy_ids=[strategy["id"] for strategy in strategies],
+        # Most users look at recent pages; deep pages are rarer and covered by the benchmark suite.
+        pages=max(min(total // per_page, 20), 1),
+        csv_rows=csv_rows,
+    )
+
+
+async def _pool_metrics(client: httpx.AsyncClient) -> Dict[str, float]:
+    """Sum of the pool counters over all engines, or nothing if ``/metrics`` is unavailable."""
+    totals: Dict[str, float] = defaultdict(float)
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return totals
+    if response.status_code != 200:
+        return totals
+    for line in response.text.splitlines():
+        name = line.split("{", 1)[0].split(" ", 1)[0]
+        if name in POOL_METRICS:
+            totals[name] += float(line.rsplit(" ", 1)[1])
+    return totals
+
+
+async def run_load(
+    url: str,
+    *,
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    csv_rows: int = 20,
+    seed: int = 42,
+) -> Dict[str, object]:
+    limits = httpx.Limits(max_connections=concurrency * 4, max_keepalive_connections=concurrency * 4)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        context = await _load_context(client, per_page=50, csv_rows=csv_rows)
+        recorder = Recorder(client)
+        loop = asyncio.get_running_loop()
+        deadline = time.perf_counter() + warmup + duration
+        tasks = [loop.create_task(_user(recorder, mix, context, seed + index, deadline)) for index in range(concurrency)]
+        tasks.append(loop.create_task(_probe(recorder, deadline)))
+        await asyncio.sleep(warmup)
+        pool_before = await _pool_metrics(client)
+        recorder.start()
+        await asyncio.sleep(max(deadline - time.perf_counter(), 0))
+        recorder.stop()
+        pool_after = await _pool_metrics(client)
+        await asyncio.gather(*tasks)
+
+    routes = recorder.report()
+    counted = {route: stats for route, stats in routes.items() if not route.endswith("(loop probe)")}
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(recorder.stopped - recorder.started, 2),
+        "mix": mix,
+        "requests": sum(stats["requests"] for stats in counted.values()),
+        "errors": sum(stats["errors"] for stats in counted.values()),
+        "rps": round(sum(stats["rps"] for stats in counted.values()), 2),
+        "routes": routes,
+        "pool": {name: round(pool_after.get(name, 0.0) - pool_before.get(name, 0.0), 4) for name in POOL_METRICS},
+    }
+
+
+def print_report(report: Dict[str, object]) -> None:
+    print(
+        f"{report['requests']:,} requests in {report['duration_s']}s at concurrency {report['concurrency']}: "
+        f"{report['rps']} req/s, {report['errors']} errors"
+    )
+    print(f"{'route':<36} {'reqs':>7} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for route, stats in report["routes"].items():
+        print(
+            f"{route:<36} {stats['requests']:>7} {stats['errors']:>7} {stats['rps']:>8.1f} {stats['p50_ms']:>9.1f} "
+            f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}"
+        )
+    for route, stats in report["routes"].items():
+        if stats["errors"]:
+            failed = {code: count for code, count in stats["statuses"].items() if code == "0" or int(code) >= 400}
+            print(f"Errors on {route}: " + ", ".join(f"{count} x {code}" for code, count in failed.items()))
+    pool = report["pool"]
+    if pool["db_pool_checkouts_total"]:
+        print(
+            f"Pool: {pool['db_pool_checkouts_total']:.0f} checkouts, "
+            f"{pool['db_pool_checkout_wait_seconds_total']:.3f}s waiting, "
+            f"{pool['db_pool_checkout_timeouts_total']:.0f} timeouts"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url: str, workers: int, port: int) -> subprocess.Popen:
+    """Run uvicorn on ``port`` in a subprocess and wait until it answers ``/health``."""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        cwd=Path(__file__).resolve().parent.parent,
+        env={**os.environ, "DATABASE_URL": database_url},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"uvicorn exited with status {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("uvicorn did not start within 30s")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__.split("\n")[0])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--database-url", default=BENCH_DATABASE_URL, help="database for the started server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the started server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before the run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"default {DEFAULT_MIX}")
+    parser.add_argument("--csv-rows", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", type=Path, help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        server = start_server(args.database_url, args.workers, port)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        report = asyncio.run(
+            run_load(
+                url,
+                mix=args.mix,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                warmup=args.warmup,
+                csv_rows=args.csv_rows,
+                seed=args.seed,
+            )
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
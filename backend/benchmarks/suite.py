@@ -0,0 +1,438 @@
+"""Time every ``crud`` and ``calculations`` entry point against a synthetic journal.
+
+Generate a journal with ``benchmarks.synthetic`` first, then run from ``backend/``::
+
+    BENCH_DATABASE_URL=postgresql:///tj_bench python -m benchmarks.suite --save-baseline
+    BENCH_DATABASE_URL=postgresql:///tj_bench python -m benchmarks.suite --only dashboard
+
+Each case runs once to warm caches and then ``--repeat`` times; the median and p95 latency are
+reported, plus the peak Python allocation of one more run under ``tracemalloc`` (timed runs are
+not traced, since tracing slows allocation-heavy code several times over). Write cases run in a
+transaction that is rolled back afterwards, so the journal is the same for every run.
+
+Results are compared with a baseline file keyed by journal size: a case whose median is more
+than ``--tolerance`` slower than its baseline is reported as a regression and the command exits
+with status 1. Baselines are machine specific; record one with ``--save-baseline`` on the
+machine that runs the comparisons.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.services import calculations
+from app.services.fixed_point import PRICE_SCALE, QUANTITY_SCALE, from_scaled
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "postgresql:///tj_bench")
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+CALCULATION_BATCH = 10_000
+
+
+@dataclass
+class Journal:
+    """Ids and values picked from the journal under test, so cases touch real rows."""
+
+    trades: int
+    trade_id: uuid.UUID
+    account_id: uuid.UUID
+    strategy_id: uuid.UUID
+    symbol: str
+    recent_since: int
+    month_start: datetime
+
+    @classmethod
+    def load(cls, db: Session) -> "Journal":
+        trades = db.execute(select(func.count(models.Trade.id))).scalar_one()
+        if not trades:
+            raise SystemExit("The benchmark database has no trades; run python -m benchmarks.synthetic first")
+        # The busiest account and strategy give the worst case for per-entity queries.
+        account_id = db.execute(
+            select(models.Trade.account_id).group_by(models.Trade.account_id).order_by(func.count().desc()).limit(1)
+        ).scalar_one()
+        strategy_id = db.execute(
+            select(models.Trade.strategy_id).group_by(models.Trade.strategy_id).order_by(func.count().desc()).limit(1)
+        ).scalar_one()
+        trade_id, symbol = db.execute(
+            select(models.Trade.id, models.Trade.symbol).where(models.Trade.account_id == account_id).limit(1)
+        ).one()
+        last_exit = db.execute(select(func.max(models.Trade.exit_timestamp))).scalar_one()
+        max_seq = db.execute(select(func.coalesce(func.max(models.ChangeLogEntry.seq), 0))).scalar_one()
+        return cls(
+            trades=trades,
+            trade_id=trade_id,
+            account_id=account_id,
+            strategy_id=strategy_id,
+            symbol=symbol,
+            recent_since=max(max_seq - 500, 0),
+            month_start=last_exit - timedelta(days=30),
+        )
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[Session, Journal], object]
+    writes: bool = False
+    database: bool = True
+
+
+CASES: List[Case] = []
+
+
+def case(name: str, *, writes: bool = False, database: bool = True):
+    def register(function: Callable[[Session, Journal], object]) -> Callable[[Session, Journal], object]:
+        CASES.append(Case(name, function, writes=writes, database=database))
+        return function
+
+    return register
+
+
+def _trade_payload(journal: Journal, **overrides) -> schemas.TradeCreate:
+    exit_at = datetime(2024, 5, 1, 14, 0, tzinfo=timezone.utc)
+    values = {
+        "symbol": "ES",
+        "direction": models.TradeDirection.LONG,
+        "quantity": Decimal("1"),
+        "strategy_id": journal.strategy_id,
+        "account_id": journal.account_id,
+        "entryDateTime": exit_at - timedelta(minutes=30),
+        "exitDateTime": exit_at,
+        "entry_price": Decimal("5100"),
+        "stopLossPlanned": Decimal("5095"),
+        "takeProfitPlanned": Decimal("5115"),
+        "exit_price": Decimal("5110"),
+        "commissions": Decimal("2.5"),
+        "tag_names": ["Breaker", "Bench"],
+    }
+    values.update(overrides)
+    return schemas.TradeCreate(**values)
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+
+@case("trades.get_trade")
+def _get_trade(db: Session, journal: Journal) -> object:
+    return crud.get_trade(db, journal.trade_id)
+
+
+@case("trades.list_trades")
+def _list_trades(db: Session, journal: Journal) -> object:
+    return crud.list_trades(db, skip=0, limit=50)
+
+
+@case("trades.list_trades_filtered")
+def _list_trades_filtered(db: Session, journal: Journal) -> object:
+    return crud.list_trades(db, skip=0, limit=50, account_id=journal.account_id, symbol=journal.symbol)
+
+
+@case("trades.list_trades_deep_page")
+def _list_trades_deep_page(db: Session, journal: Journal) -> object:
+    return crud.list_trades(db, skip=min(journal.trades // 2, 100_000), limit=50)
+
+
+@case("trades.list_trades_normalized")
+def _list_trades_normalized(db: Session, journal: Journal) -> object:
+    return crud.list_trades_normalized(db, skip=0, limit=500)
+
+
+@case("trades.get_trade_count")
+def _get_trade_count(db: Session, journal: Journal) -> object:
+    return crud.get_trade_count(db)
+
+
+@case("trades.get_trade_count_filtered")
+def _get_trade_count_filtered(db: Session, journal: Journal) -> object:
+    return crud.get_trade_count(db, account_id=journal.account_id, start_date=journal.month_start)
+
+
+@case("trades.stream_trade_rows_account")
+def _stream_trade_rows(db: Session, journal: Journal) -> object:
+    return sum(1 for _ in crud.stream_trade_rows(db, account_id=journal.account_id))
+
+
+@case("strategies.list_strategies")
+def _list_strategies(db: Session, journal: Journal) -> object:
+    return crud.list_strategies(db)
+
+
+@case("strategies.get_strategy")
+def _get_strategy(db: Session, journal: Journal) -> object:
+    return crud.get_strategy(db, journal.strategy_id)
+
+
+@case("accounts.list_accounts")
+def _list_accounts(db: Session, journal: Journal) -> object:
+    return crud.list_accounts(db)
+
+
+@case("accounts.get_account")
+def _get_account(db: Session, journal: Journal) -> object:
+    return crud.get_account(db, journal.account_id)
+
+
+@case("accounts.get_balance_history")
+def _get_balance_history(db: Session, journal: Journal) -> object:
+    return crud.get_balance_history(db, journal.account_id)
+
+
+@case("accounts.reconcile_account")
+def _reconcile_account(db: Session, journal: Journal) -> object:
+    return crud.reconcile_account(db, journal.account_id)
+
+
+@case("changes.list_changes_initial")
+def _list_changes_initial(db: Session, journal: Journal) -> object:
+    return crud.list_changes(db, since=0, limit=500)
+
+
+@case("changes.list_changes_recent")
+def _list_changes_recent(db: Session, journal: Journal) -> object:
+    return crud.list_changes(db, since=journal.recent_since, limit=500)
+
+
+@case("dashboard.get_kpis")
+def _get_kpis(db: Session, journal: Journal) -> object:
+    return crud.get_kpis(db)
+
+
+@case("dashboard.get_trade_totals")
+def _get_trade_totals(db: Session, journal: Journal) -> object:
+    return crud.get_trade_totals(db)
+
+
+@case("dashboard.get_equity_curve")
+def _get_equity_curve(db: Session, journal: Journal) -> object:
+    return crud.get_equity_curve(db)
+
+
+@case("dashboard.get_performance_by_tag")
+def _get_performance_by_tag(db: Session, journal: Journal) -> object:
+    return crud.get_performance_by_tag(db)
+
+
+@case("dashboard.get_strategy_dashboard")
+def _get_strategy_dashboard(db: Session, journal: Journal) -> object:
+    return crud.get_strategy_dashboard(db)
+
+
+@case("dashboard.get_strategy_dashboard_month")
+def _get_strategy_dashboard_month(db: Session, journal: Journal) -> object:
+    return crud.get_strategy_dashboard(db, start_date=journal.month_start)
+
+
+@case("dashboard.get_account_dashboard")
+def _get_account_dashboard(db: Session, journal: Journal) -> object:
+    return crud.get_account_dashboard(db)
+
+
+
+@case("dashboard.get_dashboard_bundle")
+def _get_dashboard_bundle(db: Session, journal: Journal) -> object:
+    return crud.get_dashboard_bundle(db)
+
+
+@case("dashboard.get_dashboard_bundle_month")
+def _get_dashboard_bundle_month(db: Session, journal: Journal) -> object:
+    return crud.get_dashboard_bundle(db, start_date=journal.month_start)
+
+# ---------------------------------------------------------------------------
+# Writes (rolled back)
+# ---------------------------------------------------------------------------
+
+
+@case("trades.create_trade", writes=True)
+def _create_trade(db: Session, journal: Journal) -> object:
+    return crud.create_trade(db, _trade_payload(journal))
+
+
+@case("trades.update_trade", writes=True)
+def _update_trade(db: Session, journal: Journal) -> object:
+    return crud.update_trade(
+        db, journal.trade_id, schemas.TradeUpdate(notes="Reviewed", tag_names=["Reviewed"], commissions=Decimal("4"))
+    )
+
+
+@case("strategies.create_update_delete", writes=True)
+def _strategy_lifecycle(db: Session, journal: Journal) -> object:
+    strategy = crud.create_strategy(db, schemas.StrategyCreate(name="Bench strategy", timeframes=["5M"]))
+    crud.update_strategy(db, strategy.id, schemas.StrategyUpdate(category="Bench"))
+    return crud.delete_strategy(db, strategy.id)
+
+
+@case("accounts.create_update_delete", writes=True)
+def _account_lifecycle(db: Session, journal: Journal) -> object:
+    account = crud.create_account(
+        db, schemas.AccountCreate(name="Bench account", type=models.AccountType.DEMO, initial_balance=Decimal("50000"))
+    )
+    crud.update_account(db, account.id, schemas.AccountUpdate(notes="Bench"))
+    return crud.delete_account(db, account.id)
+
+
+@case("accounts.create_20_trades_and_compact", writes=True)
+def _compact_balance_ledger(db: Session, journal: Journal) -> object:
+    for day in range(1, 21):
+        crud.create_trade(db, _trade_payload(journal, tag_names=[], exit_price=Decimal(5100 + day)))
+    return crud.compact_balance_ledger(db)
+
+
+# ---------------------------------------------------------------------------
+# Calculations
+# ---------------------------------------------------------------------------
+
+
+def _calculation_columns(count: int) -> Dict[str, list]:
+    rng = random.Random(7)
+    entries = [rng.randint(4_000_000000, 6_000_000000) for _ in range(count)]
+    return {
+        "direction": [rng.choice([models.TradeDirection.LONG, models.TradeDirection.SHORT]) for _ in range(count)],
+        "entry_price": entries,
+        "exit_price": [entry + rng.randint(-20_000000, 20_000000) or 250000 for entry in entries],
+        "quantity": [rng.randint(1, 10) * 100 for _ in range(count)],
+        "commissions": [rng.randint(0, 900) for _ in range(count)],
+        "stop_loss": [None if i % 4 == 0 else entry - 5_250000 for i, entry in enumerate(entries)],
+        "take_profit": [None if i % 3 == 0 else entry + 15_500000 for i, entry in enumerate(entries)],
+    }
+
+
+_COLUMNS = _calculation_columns(CALCULATION_BATCH)
+_ROWS = [dict(zip(_COLUMNS, values)) for values in zip(*_COLUMNS.values())]
+_SCALES = {"quantity": QUANTITY_SCALE, "commissions": QUANTITY_SCALE}
+_DECIMAL_ROWS = [
+    {
+        key: value if key == "direction" or value is None else from_scaled(value, _SCALES.get(key, PRICE_SCALE))
+        for key, value in row.items()
+    }
+    for row in _ROWS
+]
+
+
+@case("calculations.calculate_trade_metrics_10k", database=False)
+def _calculate_trade_metrics(db: Optional[Session], journal: Journal) -> object:
+    return [calculations.calculate_trade_metrics(**row) for row in _DECIMAL_ROWS]
+
+
+@case("calculations.calculate_trade_metrics_scaled_10k", database=False)
+def _calculate_trade_metrics_scaled(db: Optional[Session], journal: Journal) -> object:
+    return [calculations.calculate_trade_metrics_scaled(**row) for row in _ROWS]
+
+
+@case("calculations.calculate_trade_metrics_batch_10k", database=False)
+def _calculate_trade_metrics_batch(db: Optional[Session], journal: Journal) -> object:
+    return calculations.calculate_trade_metrics_batch(**_COLUMNS)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+
+@contextmanager
+def _session(engine: Engine, item: Case) -> Iterator[Optional[Session]]:
+    if not item.database:
+        yield None
+    elif not item.writes:
+        with Session(bind=engine) as db:
+            yield db
+    else:
+        # The case's own commits only release savepoints; the outer transaction is discarded.
+        with engine.connect() as connection:
+            transaction = connection.begin()
+            with Session(bind=connection, join_transaction_mode="create_savepoint") as db:
+                yield db
+            transaction.rollback()
+
+
+def measure(engine: Engine, item: Case, journal: Journal, repeat: int) -> Dict[str, float]:
+    def once() -> float:
+        with _session(engine, item) as db:
+            started = time.perf_counter()
+            item.run(db, journal)
+            return time.perf_counter() - started
+
+    once()
+    timings = sorted(once() for _ in range(repeat))
+    tracemalloc.start()
+    try:
+        once()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Names of cases whose median regressed by more than ``tolerance`` (a fraction)."""
+    return [
+        name
+        for name, result in results.items()
+        if name in baseline and result["median_ms"] > baseline[name]["median_ms"] * (1 + tolerance)
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.split("\n")[0])
+    parser.add_argument("--only", action="append", default=[], help="run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed median slowdown, 0.25 = 25%%")
+    parser.add_argument("--database-url", default=BENCH_DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    with Session(bind=engine) as db:
+        journal = Journal.load(db)
+    selected = [item for item in CASES if not args.only or any(text in item.name for text in args.only)]
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline = baselines.get(str(journal.trades), {})
+
+    print(f"Journal: {journal.trades:,} trades, {args.repeat} runs per case")
+    print(f"{'case':<48} {'median ms':>10} {'p95 ms':>10} {'peak KiB':>10} {'vs base':>8}")
+    results: Dict[str, Dict[str, float]] = {}
+    for item in selected:
+        result = results[item.name] = measure(engine, item, journal, args.repeat)
+        previous = baseline.get(item.name)
+        change = f"{result['median_ms'] / previous['median_ms'] - 1:+.0%}" if previous else "-"
+        print(f"{item.name:<48} {result['median_ms']:>10.2f} {result['p95_ms']:>10.2f} {result['peak_kib']:>10.1f} {change:>8}")
+    engine.dispose()
+
+    if args.save_baseline:
+        baselines[str(journal.trades)] = {**baseline, **results}
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline for {journal.trades:,} trades saved to {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Slower than the baseline by more than {args.tolerance:.0%}: " + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+"""Deterministic synthetic journals for benchmarks and load tests.
+
+The same ``--trades``/``--seed`` pair always produces the same rows, ids included, so numbers
+from different runs and machines are comparable. Journals look like real ones where it matters
+for query plans and aggregates:
+
+* accounts trade a subset of futures/FX instruments at their own size, across several years
+* strategies favour a session and direction and have their own win rate and R targets
+* exits land near the stop, near the target or around entry, so PnL and R-multiples spread
+  realistically; most trades carry a stop, fewer a target
+* trades have 0-5 confirmations and 0-3 tags from a pool, and some carry notes
+
+Trades and tag links are written with ``COPY`` in chunks; metrics come from the same batch
+path as ``app.recompute``, so a recompute of a generated journal reports no drift. Account
+balances, the balance ledger and the change log are filled in like the migrations backfill
+them. Run from ``backend/``::
+
+    BENCH_DATABASE_URL=postgresql:///tj_bench python -m benchmarks.synthetic --trades 1m --reset
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import Connection, Engine
+
+from app import models, schemas
+from app.database import Base
+from app.recompute import copy_text, stored_metrics
+from app.services.fixed_point import QUANTITY_SCALE
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "postgresql:///tj_bench")
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "5m": 5_000_000}
+CHUNK_SIZE = 50_000
+FIRST_DAY = date(2019, 1, 7)
+YEARS = 6
+
+
+@dataclass(frozen=True)
+class Instrument:
+    symbol: str
+    price: int  # typical price in micro-units
+    tick: int  # tick size in micro-units
+    stop_ticks: Tuple[int, int]
+    quantities: Tuple[int, ...]  # position sizes at quantity scale, smallest first
+    commission: int  # per smallest position size, quantity scale
+
+
+INSTRUMENTS = (
+    Instrument("ES", 5_000_000000, 250000, (8, 40), (100, 200, 300, 500), 250),
+    Instrument("MES", 5_000_000000, 250000, (8, 40), (500, 1000, 2000), 62),
+    Instrument("NQ", 18_000_000000, 250000, (20, 120), (100, 200, 300), 250),
+    Instrument("MNQ", 18_000_000000, 250000, (20, 120), (500, 1000, 1500), 62),
+    Instrument("YM", 39_000_000000, 1000000, (20, 100), (100, 200), 250),
+    Instrument("RTY", 2_000_000000, 100000, (10, 60), (100, 200, 400), 250),
+    Instrument("CL", 80_000000, 10000, (10, 60), (100000, 200000, 300000), 250),
+    Instrument("GC", 2_300_000000, 100000, (20, 100), (10000, 20000), 250),
+    Instrument("EURUSD", 1_080000, 10, (50, 300), (1_000000, 5_000000, 10_000000), 0),
+    Instrument("GBPUSD", 1_270000, 10, (50, 300), (1_000000, 5_000000), 0),
+)
+
+SESSION_HOURS = {
+    models.TradeSession.ASIA: (0, 6),
+    models.TradeSession.LONDON: (7, 12),
+    models.TradeSession.NY: (13, 20),
+}
+
+TAG_TYPES = {
+    "setup": ("Breaker", "Order Block", "FVG", "Liquidity Sweep", "Turtle Soup", "Silver Bullet", "Judas Swing"),
+    "mistake": ("FOMO", "Moved Stop", "Early Exit", "Oversized", "Revenge", "No Plan"),
+    "emotion": ("Calm", "Anxious", "Overconfident", "Tired", "Focused"),
+    "market": ("Trend Day", "Range Day", "News", "Low Volume", "Gap Fill", "Reversal"),
+}
+
+NOTES = (
+    "Followed the plan.",
+    "Entered late after the displacement.",
+    "Partial at 1R, runner stopped at break-even.",
+    "News spike, size down next time.",
+    "Clean setup in the killzone.",
+)
+
+TRADE_COLUMNS = (
+    "id",
+    "symbol",
+    "direction",
+    "quantity",
+    "session",
+    "strategy_id",
+    "account_id",
+    "entry_timestamp",
+    "exit_timestamp",
+    "entry_price",
+    "stop_loss_planned",
+    "take_profit_planned",
+    "exit_price",
+    "commissions",
+    "risk_per_trade",
+    "rr_planned",
+    "pnl",
+    "r_multiple",
+    "import_method",
+    "confirmations",
+    "confirmations_count",
+    "notes",
+)
+
+
+def parse_size(value: str) -> int:
+    """``10k``/``2.5m``/``50000`` to a trade count."""
+    value = value.lower().replace("_", "").replace(",", "")
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[: -len(suffix)]) * factor)
+    return int(value)
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+# ---------------------------------------------------------------------------
+# Reference data
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class AccountProfile:
+    id: uuid.UUID
+    instruments: Sequence[Instrument]
+    size: int  # index into an instrument's position sizes
+
+
+@dataclass
+class StrategyProfile:
+    id: uuid.UUID
+    session: models.TradeSession
+    long_bias: float
+    win_rate: float
+    target_r: float
+
+
+def _reference_counts(trades: int) -> Tuple[int, int]:
+    """Accounts and strategies for a journal of ``trades`` trades."""
+    return min(max(trades // 5_000, 5), 250), min(max(trades // 10_000, 8), 120)
+
+
+def insert_reference_data(
+    connection: Connection, rng: random.Random, trades: int
+) -> Tuple[List[AccountProfile], List[StrategyProfile], List[uuid.UUID]]:
+    account_count, strategy_count = _reference_counts(trades)
+    firms = ("Apex", "Topstep", "FTMO", "Tradeify", "Personal", "MFF")
+    accounts, account_rows = [], []
+    for index in range(account_count):
+        account_type = rng.choice(list(models.AccountType))
+        initial = rng.choice((25_000, 50_000, 100_000, 150_000, 300_000))
+        profile = AccountProfile(
+            id=_uuid(rng),
+            instruments=rng.sample(INSTRUMENTS, rng.randint(1, 4)),
+            size=rng.randint(0, 1),
+        )
+        accounts.append(profile)
+        account_rows.append(
+            {
+                "id": profile.id,
+                "name": f"{rng.choice(firms)} {initial // 1000}k #{index + 1:03d}",
+                "type": account_type,
+                "broker_platform": rng.choice(("NinjaTrader", "Tradovate", "MT5", "Rithmic")),
+                "initial_balance": initial,
+                "current_balance": initial,
+                "commission_split_percent": rng.choice((None, 80, 90, 100)),
+                "allowed_instruments": ",".join(instrument.symbol for instrument in profile.instruments),
+                "start_date": FIRST_DAY + timedelta(days=rng.randint(0, 365)),
+            }
+        )
+    connection.execute(insert(models.Account.__table__), account_rows)
+
+    categories = ("ICT", "Price Action", "Breakout", "Mean Reversion", "Momentum")
+    strategies, strategy_rows = [], []
+    for index in range(strategy_count):
+        profile = StrategyProfile(
+            id=_uuid(rng),
+            session=rng.choice(list(models.TradeSession)),
+            long_bias=rng.uniform(0.3, 0.7),
+            win_rate=rng.uniform(0.35, 0.6),
+            target_r=rng.choice((1.5, 2.0, 2.5, 3.0)),
+        )
+        strategies.append(profile)
+        strategy_rows.append(
+            {
+                "id": profile.id,
+                "name": f"{rng.choice(categories)} {index + 1:03d}",
+                "category": rng.choice(categories),
+                "timeframes": rng.sample(["1M", "5M", "15M", "1H", "4H", "D"], rng.randint(1, 3)),
+                "preferred_direction": rng.choice(list(models.PreferredDirection)),
+                "entry_criteria": "Displacement through structure, entry on the retrace.",
+            }
+        )
+    connection.execute(insert(models.Strategy.__table__), strategy_rows)
+
+    tag_rows = [
+        {"id": _uuid(rng), "name": f"{name} {variant}" if variant else name, "type": tag_type}
+        for tag_type, names in TAG_TYPES.items()
+        for name in names
+        for variant in ("", "A+", "B")
+    ]
+    connection.execute(insert(models.Tag.__table__), tag_rows)
+    return accounts, strategies, [row["id"] for row in tag_rows]
+
+
+# ---------------------------------------------------------------------------
+# Trades
+# ---------------------------------------------------------------------------
+
+
+def _array_text(values: Sequence[str]) -> str:
+    return "{" + ",".join('"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in values) + "}"
+
+
+def _timestamp_text(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S+00")
+
+
+def generate_chunk(
+    rng: random.Random,
+    count: int,
+    accounts: Sequence[AccountProfile],
+    strategies: Sequence[StrategyProfile],
+    tag_ids: Sequence[uuid.UUID],
+) -> Tuple[Dict[str, list], List[Tuple[uuid.UUID, uuid.UUID]]]:
+    """Trade columns at column scale (metrics not yet computed) and the trade/tag links."""
+    columns: Dict[str, list] = {name: [] for name in TRADE_COLUMNS}
+    links: List[Tuple[uuid.UUID, uuid.UUID]] = []
+    span_days = YEARS * 365
+    for _ in range(count):
+        account = rng.choice(accounts)
+        strategy = rng.choice(strategies)
+        instrument = rng.choice(account.instruments)
+        trade_id = _uuid(rng)
+
+        day_offset = rng.randrange(span_days)
+        day = FIRST_DAY + timedelta(days=day_offset)
+        if day.weekday() >= 5:
+            day -= timedelta(days=day.weekday() - 4)
+        session = strategy.session if rng.random() < 0.8 else rng.choice(list(models.TradeSession))
+        first_hour, last_hour = SESSION_HOURS[session]
+        entry = datetime(day.year, day.month, day.day, rng.randint(first_hour, last_hour), rng.randrange(60), tzinfo=timezone.utc)
+        exit_ = entry + timedelta(minutes=rng.randint(1, 240) if rng.random() < 0.95 else rng.randint(240, 4320))
+
+        # Price drifts up over the period, with noise, on the instrument's tick grid.
+        drift = 0.8 + 0.4 * day_offset / span_days
+        entry_price = int(instrument.price * drift * rng.uniform(0.97, 1.03)) // instrument.tick * instrument.tick
+        long = rng.random() < strategy.long_bias
+        sign = 1 if long else -1
+        stop_distance = rng.randint(*instrument.stop_ticks) * instrument.tick
+        target_distance = int(stop_distance * strategy.target_r) // instrument.tick * instrument.tick
+        outcome = rng.random()
+        if outcome < strategy.win_rate:
+            move = target_distance + rng.randint(-3, 3) * instrument.tick
+        elif outcome < strategy.win_rate + 0.1:
+            move = rng.randint(-3, 3) * instrument.tick
+        else:
+            move = -stop_distance - rng.randint(0, 4) * instrument.tick
+        if move == 0:
+            move = instrument.tick
+        lots = instrument.quantities[min(account.size + rng.randrange(2), len(instrument.quantities) - 1)]
+        confirmations = rng.sample(schemas.CONFIRMATION_OPTIONS, rng.randint(0, 5))
+
+        columns["id"].append(trade_id)
+        columns["symbol"].append(instrument.symbol)
+        columns["direction"].append(models.TradeDirection.LONG if long else models.TradeDirection.SHORT)
+        columns["quantity"].append(lots)
+        columns["session"].append(session)
+        columns["strategy_id"].append(strategy.id)
+        columns["account_id"].append(account.id)
+        columns["entry_timestamp"].append(entry)
+        columns["exit_timestamp"].append(exit_)
+        columns["entry_price"].append(entry_price)
+        columns["stop_loss_planned"].append(entry_price - sign * stop_distance if rng.random() < 0.85 else None)
+        columns["take_profit_planned"].append(entry_price + sign * target_distance if rng.random() < 0.7 else None)
+        columns["exit_price"].append(max(entry_price + sign * move, instrument.tick))
+        columns["commissions"].append(instrument.commission * lots // instrument.quantities[0])
+        columns["import_method"].append("csv" if rng.random() < 0.3 else "manual")
+        columns["confirmations"].append(confirmations)
+        columns["confirmations_count"].append(len(confirmations))
+        columns["notes"].append(rng.choice(NOTES) if rng.random() < 0.3 else None)
+        links.extend((trade_id, tag_id) for tag_id in rng.sample(tag_ids, rng.choice((0, 0, 1, 1, 1, 2, 3))))
+    return columns, links
+
+
+def _trade_copy_buffer(columns: Dict[str, list]) -> io.StringIO:
+    metrics = stored_metrics(
+        {
+            "direction": columns["direction"],
+            "entry_price": columns["entry_price"],
+            "exit_price": columns["exit_price"],
+            "quantity": columns["quantity"],
+            "commissions": columns["commissions"],
+            "stop_loss": columns["stop_loss_planned"],
+            "take_profit": columns["take_profit_planned"],
+        }
+    )
+    buffer = io.StringIO()
+    for index, (pnl, risk, rr_planned, r_multiple) in enumerate(metrics):
+        notes = columns["notes"][index]
+        buffer.write(
+            "\t".join(
+                (
+                    str(columns["id"][index]),
+                    columns["symbol"][index],
+                    columns["direction"][index].value,
+                    copy_text(columns["quantity"][index], QUANTITY_SCALE),
+                    columns["session"][index].value,
+                    str(columns["strategy_id"][index]),
+                    str(columns["account_id"][index]),
+                    _timestamp_text(columns["entry_timestamp"][index]),
+                    _timestamp_text(columns["exit_timestamp"][index]),
+                    copy_text(columns["entry_price"][index]),
+                    copy_text(columns["stop_loss_planned"][index]),
+                    copy_text(columns["take_profit_planned"][index]),
+                    copy_text(columns["exit_price"][index]),
+                    copy_text(columns["commissions"][index], QUANTITY_SCALE),
+                    copy_text(risk),
+                    copy_text(rr_planned),
+                    copy_text(pnl),
+                    copy_text(r_multiple),
+                    columns["import_method"][index],
+                    _array_text(columns["confirmations"][index]),
+                    str(columns["confirmations_count"][index]),
+                    "\\N" if notes is None else notes,
+                )
+            )
+            + "\n"
+        )
+    buffer.seek(0)
+    return buffer
+
+
+def _copy(connection: Connection, table: str, columns: Sequence[str], buffer: io.StringIO) -> None:
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+# ---------------------------------------------------------------------------
+# Derived tables
+# ---------------------------------------------------------------------------
+
+
+def backfill_derived(connection: Connection) -> None:
+    """Ledger entries, balances and change log for the generated rows, as the migrations do."""
+    connection.execute(
+        text(
+            "INSERT INTO account_ledger (account_id, trade_id, kind, amount, occurred_at, compacted) "
+            "SELECT account_id, id, 'trade', round(pnl, 2), exit_timestamp, true FROM trades WHERE round(pnl, 2) <> 0"
+        )
+    )
+    connection.execute(
+        text(
+            "UPDATE accounts SET current_balance = initial_balance + totals.amount "
+            "FROM (SELECT account_id, sum(amount) AS amount FROM account_ledger GROUP BY account_id) AS totals "
+            "WHERE accounts.id = totals.account_id"
+        )
+    )
+    for entity, table in (("tag", "tags"), ("strategy", "strategies"), ("account", "accounts"), ("trade", "trades")):
+        connection.execute(
+            text(f"INSERT INTO change_log (entity, entity_id) SELECT '{entity}', id FROM {table} ORDER BY created_at")
+        )
+
+
+def reset(connection: Connection) -> None:
+    connection.execute(
+        text("TRUNCATE trade_tags, trades, account_ledger, accounts, strategies, tags, change_log RESTART IDENTITY CASCADE")
+    )
+
+
+def generate_journal(engine: Engine, trades: int, *, seed: int = 42, chunk_size: int = CHUNK_SIZE, progress=None) -> None:
+    """Write a ``trades``-trade journal into an empty database."""
+    rng = random.Random(seed)
+    with engine.begin() as connection:
+        accounts, strategies, tag_ids = insert_reference_data(connection, rng, trades)
+
+    written = 0
+    while written < trades:
+        count = min(chunk_size, trades - written)
+        columns, links = generate_chunk(rng, count, accounts, strategies, tag_ids)
+        with engine.begin() as connection:
+            _copy(connection, "trades", TRADE_COLUMNS, _trade_copy_buffer(columns))
+            _copy(
+                connection,
+                "trade_tags",
+                ("trade_id", "tag_id"),
+                io.StringIO("".join(f"{trade_id}\t{tag_id}\n" for trade_id, tag_id in links)),
+            )
+        written += count
+        if progress:
+            progress(written)
+
+    with engine.begin() as connection:
+        backfill_derived(connection)
+        connection.exec_driver_sql("ANALYZE")
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.synthetic", description=__doc__.split("\n")[0])
+    parser.add_argument("--trades", type=parse_size, default=SIZES["10k"], help="10k, 100k, 1m, 5m or a number")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--reset", action="store_true", help="empty the journal tables first")
+    parser.add_argument("--database-url", default=BENCH_DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        if args.reset:
+            reset(connection)
+        elif connection.execute(text("SELECT EXISTS (SELECT 1 FROM trades)")).scalar():
+            parser.error("the journal is not empty; pass --reset to replace it")
+
+    started = time.perf_counter()
+    generate_journal(
+        engine,
+        args.trades,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        progress=lambda written: print(f"\r{written:>10,} trades", end="", flush=True),
+    )
+    print(f"\nGenerated {args.trades:,} trades (seed {args.seed}) in {time.perf_counter() - started:.1f}s")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
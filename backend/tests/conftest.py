@@ -1,11 +1,16 @@
 import os
 
+# Exceeded query budgets fail the test instead of logging a warning.
+os.environ.setdefault("QUERY_BUDGET_MODE", "raise")
+# Tests start their own change listeners against the test database.
+os.environ.setdefault("CHANGE_LISTENER", "false")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
-from app.database import Base, get_db
+from app.database import Base, get_analytics_db, get_db, get_read_db
 from app.main import app
 
 
@@ -30,6 +35,7 @@ def clean_database() -> None:
         connection.execute(text("TRUNCATE TABLE strategies RESTART IDENTITY CASCADE"))
         connection.execute(text("TRUNCATE TABLE accounts RESTART IDENTITY CASCADE"))
         connection.execute(text("TRUNCATE TABLE tags RESTART IDENTITY CASCADE"))
+        connection.execute(text("TRUNCATE TABLE change_log RESTART IDENTITY"))
     yield
 
 
@@ -44,6 +50,10 @@ def client() -> TestClient:
             db.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_analytics_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_read_db, None)
+    app.dependency_overrides.pop(get_analytics_db, None)
@@ -0,0 +1,116 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import analytics_snapshot, crud
+
+from .conftest import TestingSessionLocal, engine
+from .test_api import create_account, create_strategy, create_trade
+
+
+@pytest.fixture()
+def snapshot(tmp_path, monkeypatch):
+    snapshot = analytics_snapshot.AnalyticsSnapshot(str(tmp_path / "analytics.bin"))
+    monkeypatch.setattr(analytics_snapshot, "snapshot", snapshot)
+    return snapshot
+
+
+def dashboard(client: TestClient) -> dict:
+    return {
+        path: client.get(f"/api/dashboard/{path}").json() for path in ("kpis", "equity-curve", "strategies", "accounts")
+    }
+
+
+def test_snapshot_serves_the_dashboard_and_catches_up(client: TestClient, tmp_path, monkeypatch) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id, day=3, stopLossPlanned=5095.25)
+    create_trade(client, strategy_id, account_id, day=1, direction="Short", exit_price=5090)
+    losing = create_trade(client, strategy_id, account_id, day=2, exit_price=5094, stopLossPlanned=5096)
+    from_sql = dashboard(client)
+
+    snapshot = analytics_snapshot.AnalyticsSnapshot(str(tmp_path / "analytics.bin"))
+    monkeypatch.setattr(analytics_snapshot, "snapshot", snapshot)
+    assert dashboard(client) == from_sql
+    assert (tmp_path / "analytics.bin").exists()
+    bundle = client.get("/api/dashboard/bundle").json()
+    assert (bundle["kpis"], bundle["equity_curve"]) == (from_sql["kpis"], from_sql["equity-curve"])
+
+    # Writes after the file was written are read from the change log.
+    client.put(f"/api/trades/{losing['id']}", json={"exit_price": 5098}).raise_for_status()
+    create_trade(client, strategy_id, account_id, day=4, exit_price=5101)
+    caught_up = dashboard(client)
+    assert len(snapshot.current(TestingSessionLocal()).overlay) == 2
+
+    monkeypatch.setattr(analytics_snapshot, "snapshot", analytics_snapshot.AnalyticsSnapshot(""))
+    assert dashboard(client) == caught_up
+    assert caught_up["kpis"]["total_pnl"] == "19.000000"
+    assert [point["date"] for point in caught_up["equity-curve"]] == ["2024-05-01", "2024-05-02", "2024-05-03", "2024-05-04"]
+    assert caught_up["accounts"][0]["trades"] == 4
+
+
+def test_snapshot_file_is_reused_or_rebuilt_on_load(client: TestClient, snapshot) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    trade = create_trade(client, strategy_id, account_id, exit_price=5098)
+    create_trade(client, strategy_id, account_id, day=2)
+    snapshot.warm(engine)
+    written = snapshot.current(TestingSessionLocal()).base.snapshot
+
+    # Another worker maps the same file and catches up on the trade created since.
+    create_trade(client, strategy_id, account_id, day=3)
+    reloaded = analytics_snapshot.AnalyticsSnapshot(snapshot.path)
+    reloaded.warm(engine)
+    view = reloaded.current(TestingSessionLocal())
+    assert (view.base.snapshot, len(view.overlay), view.kpis().total_trades) == (written, 1, 3)
+
+    # A write that bypassed the change log fails the trade count check; the file is rebuilt.
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM trades WHERE id = :id"), {"id": trade["id"]})
+    rebuilt = analytics_snapshot.AnalyticsSnapshot(snapshot.path)
+    rebuilt.warm(engine)
+    view = rebuilt.current(TestingSessionLocal())
+    assert (view.overlay, view.kpis().total_trades, view.kpis().losing_trades) == ({}, 2, 0)
+    assert analytics_snapshot.read_stamp(snapshot.path)["snapshot"] == str(view.snapshot)
+
+
+def test_large_overlay_is_compacted_into_a_new_file(client: TestClient, snapshot, monkeypatch) -> None:
+    monkeypatch.setattr(analytics_snapshot, "ANALYTICS_SNAPSHOT_MAX_OVERLAY", 2)
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id, exit_price=5098)
+    snapshot.warm(engine)
+    db = TestingSessionLocal()
+    points = crud.get_equity_curve_points(db)
+
+    for day in (2, 3):
+        create_trade(client, strategy_id, account_id, day=day)
+        db.rollback()
+        points = crud.get_equity_curve_points(db)
+    assert len(snapshot.current(db).overlay) == 2
+
+    create_trade(client, strategy_id, account_id, day=4, exit_price=5090)
+    db.rollback()
+    view = snapshot.current(db)
+    assert (view.overlay, len(view.base)) == ({}, 4)
+    assert crud.get_equity_curve_points(db) == [*points, {"date": "2024-05-04", "cumulative_pnl": view.kpis().total_pnl}]
+    assert view.kpis().total_pnl == crud.get_kpis(db).total_pnl
+    db.close()
+
+
+def test_file_in_the_old_seq_format_is_rebuilt(client: TestClient, snapshot, monkeypatch) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id)
+    with engine.connect() as connection:
+        database = connection.execute(text("SELECT current_database()")).scalar_one()
+    with monkeypatch.context() as old:
+        # Files written before the change log recorded transaction ids were stamped with a ``seq``.
+        old.setattr(analytics_snapshot, "FORMAT", 1)
+        analytics_snapshot.write_file(snapshot.path, {"seq": 1, "database": database}, analytics_snapshot.build_arrays([]))
+
+    snapshot.warm(engine)
+    view = snapshot.current(TestingSessionLocal())
+    stamp = analytics_snapshot.read_stamp(snapshot.path)
+    assert (stamp["format"], stamp["snapshot"]) == (analytics_snapshot.FORMAT, str(view.base.snapshot))
+    assert view.kpis().total_trades == 1
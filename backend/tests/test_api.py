@@ -1,8 +1,20 @@
+import csv
+import inspect
+import io
+import json
 from datetime import datetime, timezone
 from decimal import Decimal
 
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi.routing import APIRoute
 from fastapi.testclient import TestClient
 
+from app import main
+from app.database import get_analytics_db, get_db, get_read_db
+from app.main import app
+from app.services import arrow
+
 
 def create_strategy(client: TestClient) -> str:
     response = client.post(
@@ -34,6 +46,25 @@ def create_account(client: TestClient) -> str:
     return response.json()["id"]
 
 
+def create_trade(client: TestClient, strategy_id: str, account_id: str, day: int = 1, **overrides) -> dict:
+    payload = {
+        "symbol": "ES",
+        "direction": "Long",
+        "quantity": 1,
+        "strategy_id": strategy_id,
+        "account_id": account_id,
+        "entryDateTime": datetime(2024, 5, day, 13, 30, tzinfo=timezone.utc).isoformat(),
+        "exitDateTime": datetime(2024, 5, day, 14, 0, tzinfo=timezone.utc).isoformat(),
+        "entry_price": 5100,
+        "exit_price": 5110,
+        "tag_names": [],
+    }
+    payload.update(overrides)
+    response = client.post("/api/trades", json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
 def test_create_strategy_and_account(client: TestClient) -> None:
     strategy_id = create_strategy(client)
     account_id = create_account(client)
@@ -112,3 +143,200 @@ def test_trade_validation_exit_before_entry(client: TestClient) -> None:
 
     response = client.post("/api/trades", json=payload)
     assert response.status_code == 422
+
+
+def test_list_trades_normalized_sideloads_related_entities(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+
+    create_trade(client, strategy_id, account_id, day=1, tag_names=["ICT-FVG", "Breaker"])
+    create_trade(client, strategy_id, account_id, day=2, tag_names=["ICT-FVG"])
+
+    response = client.get("/api/trades", params={"normalized": True})
+    assert response.status_code == 200, response.text
+
+    data = response.json()
+    assert data["total"] == 2
+    assert list(data["accounts"]) == [account_id]
+    assert list(data["strategies"]) == [strategy_id]
+    assert sorted(tag["name"] for tag in data["tags"].values()) == ["Breaker", "ICT-FVG"]
+
+    for trade in data["trades"]:
+        assert "account" not in trade and "strategy" not in trade and "tags" not in trade
+        assert trade["account_id"] == account_id
+        assert set(trade["tag_ids"]) <= set(data["tags"])
+    assert sorted(len(trade["tag_ids"]) for trade in data["trades"]) == [1, 2]
+
+
+def test_export_trades_streams_filtered_rows(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id, day=1, symbol="ES", tag_names=["Breaker", "ICT-FVG"])
+    create_trade(client, strategy_id, account_id, day=2, symbol="NQ")
+
+    csv_response = client.get("/api/trades/export", params={"format": "csv", "symbol": "ES"})
+    assert csv_response.status_code == 200
+    assert csv_response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(csv_response.text)))
+    assert len(rows) == 1
+    assert rows[0]["symbol"] == "ES"
+    assert sorted(rows[0]["tags"].split("|")) == ["Breaker", "ICT-FVG"]
+    assert Decimal(rows[0]["pnl"]) == Decimal("10")
+
+    ndjson_response = client.get("/api/trades/export", params={"format": "ndjson"})
+    records = [json.loads(line) for line in ndjson_response.text.splitlines()]
+    assert [record["symbol"] for record in records] == ["ES", "NQ"]
+    assert records[1]["tags"] == []
+
+    assert client.get("/api/trades/export", params={"format": "xlsx"}).status_code == 422
+
+
+def test_parquet_export_matches_csv_export(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id, day=1, stopLossPlanned=5095.25, tag_names=["Breaker", "ICT-FVG"])
+    create_trade(client, strategy_id, account_id, day=2, direction="Short", exit_price=5090, confirmations=["OTE"])
+    create_trade(client, strategy_id, account_id, day=3, symbol="NQ")
+
+    params = {"symbol": "ES", "start_date": "2024-05-01T00:00:00Z"}
+    response = client.get("/api/trades/export", params={**params, "format": "parquet"})
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    table = pq.read_table(io.BytesIO(response.content))
+    csv_rows = list(csv.DictReader(io.StringIO(client.get("/api/trades/export", params={**params, "format": "csv"}).text)))
+    assert table.column_names == list(csv_rows[0])
+
+    def as_csv(value) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            return "|".join(value)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+
+    parquet_rows = table.to_pylist()
+    assert len(parquet_rows) == len(csv_rows) == 2
+    for parquet_row, csv_row in zip(parquet_rows, csv_rows):
+        for name, value in parquet_row.items():
+            if isinstance(value, datetime):
+                assert value == datetime.fromisoformat(csv_row[name]), name
+            else:
+                assert as_csv(value) == csv_row[name], name
+
+
+def test_fast_serialization_matches_pydantic_output(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    created = create_trade(
+        client,
+        strategy_id,
+        account_id,
+        stopLossPlanned=5095.25,
+        confirmations=["OTE"],
+        tag_names=["Breaker"],
+    )
+    create_trade(client, strategy_id, account_id, day=2, direction="Short", exit_price=5090)
+
+    listed = client.get("/api/trades").json()["trades"]
+    detail = client.get(f"/api/trades/{created['id']}").json()
+    assert next(trade for trade in listed if trade["id"] == created["id"]) == detail
+
+    curve = client.get("/api/dashboard/equity-curve").json()
+    assert curve == [
+        {"date": "2024-05-01", "cumulative_pnl": "10.000000"},
+        {"date": "2024-05-02", "cumulative_pnl": "20.000000"},
+    ]
+
+
+def test_dashboard_aggregates_are_exact(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id, stopLossPlanned=5095.25, tag_names=["Breaker"])
+    create_trade(client, strategy_id, account_id, day=2, direction="Short", exit_price=5090)
+    create_trade(client, strategy_id, account_id, day=3, exit_price=5094, stopLossPlanned=5096, tag_names=["Breaker"])
+
+    kpis = client.get("/api/dashboard/kpis").json()
+    assert kpis["total_pnl"] == "14.000000"
+    assert kpis["average_win"] == "10.000000"
+    assert kpis["average_loss"] == "-6.000000"
+    assert kpis["profit_factor"] == float(Decimal("20") / Decimal("6"))
+    assert (kpis["winning_trades"], kpis["losing_trades"]) == (2, 1)
+
+    [strategy] = client.get("/api/dashboard/strategies").json()
+    assert strategy["strategy_name"] == "ICT Breaker"
+    assert strategy["total_pnl"] == "14.000000"
+    assert strategy["total_r"] == float(Decimal("2.105263") + Decimal("-1.5"))
+    assert strategy["expectancy_r"] == 2 / 3 * float(Decimal("2.105263")) - 1 / 3 * 1.5
+
+    [account] = client.get("/api/dashboard/accounts").json()
+    assert account["current_balance"] == "100014.00"
+
+    [tag] = client.get("/api/dashboard/performance-by-tag").json()
+    assert (tag["tag_name"], tag["total_pnl"], tag["win_rate"], tag["trade_count"]) == ("Breaker", "4.000000", 0.5, 2)
+
+
+def test_dashboard_bundle_matches_the_separate_views(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id, stopLossPlanned=5095.25, tag_names=["Breaker"])
+    create_trade(client, strategy_id, account_id, day=2, direction="Short", exit_price=5090, session="London")
+    create_trade(client, strategy_id, account_id, day=3, exit_price=5094, tag_names=["Breaker", "Late"])
+
+    bundle = client.get("/api/dashboard/bundle").json()
+    assert bundle == {
+        "kpis": client.get("/api/dashboard/kpis").json(),
+        "equity_curve": client.get("/api/dashboard/equity-curve").json(),
+        "performance_by_tag": client.get("/api/dashboard/performance-by-tag").json(),
+        "strategies": client.get("/api/dashboard/strategies").json(),
+        "accounts": client.get("/api/dashboard/accounts").json(),
+    }
+
+    params = {"direction": "Long", "start_date": "2024-05-01T00:00:00Z"}
+    filtered = client.get("/api/dashboard/bundle", params=params).json()
+    assert filtered["strategies"] == client.get("/api/dashboard/strategies", params=params).json()
+    assert filtered["accounts"] == client.get("/api/dashboard/accounts", params=params).json()
+    assert (filtered["kpis"]["total_trades"], filtered["kpis"]["total_pnl"]) == (2, "4.000000")
+    assert [point["cumulative_pnl"] for point in filtered["equity_curve"]] == ["10.000000", "4.000000"]
+    assert [(tag["tag_name"], tag["trade_count"]) for tag in filtered["performance_by_tag"]] == [("Breaker", 2), ("Late", 1)]
+
+
+def test_equity_curve_negotiates_arrow_streams(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id, day=2, exit_price=5094.125)
+    create_trade(client, strategy_id, account_id, day=1, direction="Short", exit_price=5090)
+
+    as_json = client.get("/api/dashboard/equity-curve")
+    response = client.get("/api/dashboard/equity-curve", headers={"Accept": arrow.ARROW_STREAM_MEDIA_TYPE})
+    assert response.headers["content-type"] == arrow.ARROW_STREAM_MEDIA_TYPE
+    assert response.headers["vary"] == as_json.headers["vary"] == "Accept"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.schema.field("cumulative_pnl").type == pa.decimal128(38, 6)
+    assert [
+        {"date": row["date"].isoformat(), "cumulative_pnl": str(row["cumulative_pnl"])} for row in table.to_pylist()
+    ] == as_json.json() == [
+        {"date": "2024-05-01", "cumulative_pnl": "10.000000"},
+        {"date": "2024-05-02", "cumulative_pnl": "4.125000"},
+    ]
+
+    assert not arrow.wants_arrow(None)
+    assert not arrow.wants_arrow("*/*")
+    assert not arrow.wants_arrow(f"application/json, {arrow.ARROW_STREAM_MEDIA_TYPE};q=0.9")
+    assert arrow.wants_arrow(f"{arrow.ARROW_STREAM_MEDIA_TYPE}, application/json;q=0.5, */*;q=0.1")
+
+
+def test_database_routes_run_in_threadpool() -> None:
+    # Sync SQLAlchemy calls inside ``async def`` handlers would block the event loop.
+    for route in app.routes:
+        if isinstance(route, APIRoute) and any(dep.call in (get_db, get_read_db, get_analytics_db) for dep in route.dependant.dependencies):
+            assert not inspect.iscoroutinefunction(route.endpoint), route.path
+
+
+def test_threadpool_larger_than_the_connection_pool_is_reported(monkeypatch, caplog) -> None:
+    assert main.THREADPOOL_SIZE == main.DB_POOL_CAPACITY
+    main.check_threadpool_size()
+    assert not caplog.records
+
+    monkeypatch.setattr(main, "THREADPOOL_SIZE", main.DB_POOL_CAPACITY + 25)
+    main.check_threadpool_size()
+    assert "exceeds" in caplog.text
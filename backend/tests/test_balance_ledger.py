@@ -0,0 +1,154 @@
+import threading
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import crud, schemas
+
+from .conftest import TestingSessionLocal, engine
+from .test_api import create_account, create_strategy, create_trade
+
+
+def test_concurrent_trades_journal_without_lost_updates(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    writers, trades_per_writer = 4, 10
+    errors = []
+    writing = threading.Event()
+
+    def write_trades(writer: int) -> None:
+        try:
+            with TestingSessionLocal() as db:
+                for index in range(trades_per_writer):
+                    crud.create_trade(
+                        db,
+                        schemas.TradeCreate(
+                            symbol="ES",
+                            direction="Long",
+                            quantity=Decimal("1"),
+                            strategy_id=uuid.UUID(strategy_id),
+                            account_id=uuid.UUID(account_id),
+                            entry_datetime=datetime(2024, 5, index + 1, 13, 30, tzinfo=timezone.utc),
+                            exit_datetime=datetime(2024, 5, index + 1, 14, 0, tzinfo=timezone.utc),
+                            entry_price=Decimal("5100"),
+                            exit_price=Decimal("5100") + writer + 1,
+                        ),
+                    )
+        except Exception as exc:  # surfaced in the main thread
+            errors.append(exc)
+
+    def compact() -> None:
+        with TestingSessionLocal() as db:
+            while writing.is_set():
+                crud.compact_balance_ledger(db)
+
+    writing.set()
+    compactor = threading.Thread(target=compact)
+    threads = [threading.Thread(target=write_trades, args=(writer,)) for writer in range(writers)]
+    compactor.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writing.clear()
+    compactor.join()
+
+    assert errors == []
+    expected = Decimal("100000") + trades_per_writer * sum(range(1, writers + 1))
+    assert Decimal(client.get(f"/api/accounts/{account_id}").json()["current_balance"]) == expected
+
+    reconciliation = client.get(f"/api/accounts/{account_id}/reconciliation").json()
+    assert reconciliation["balanced"] is True
+    assert Decimal(reconciliation["ledger_balance"]) == expected
+
+    with TestingSessionLocal() as db:
+        crud.compact_balance_ledger(db)
+    reconciliation = client.get(f"/api/accounts/{account_id}/reconciliation").json()
+    assert (reconciliation["pending_entries"], reconciliation["balanced"]) == (0, True)
+    assert Decimal(reconciliation["current_balance"]) == expected
+
+
+def test_concurrent_edits_of_one_trade_reverse_each_others_entries(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    trade_id = uuid.UUID(create_trade(client, strategy_id, account_id)["id"])
+    errors = []
+
+    def edit(db, exit_price: str) -> None:
+        try:
+            crud.update_trade(db, trade_id, schemas.TradeUpdate(exit_price=Decimal(exit_price)))
+        except Exception as exc:  # surfaced in the main thread
+            errors.append(exc)
+
+    with TestingSessionLocal() as first, TestingSessionLocal() as second:
+        # The first edit holds the trade row while the second one starts.
+        first.execute(text("SELECT id FROM trades WHERE id = :id FOR UPDATE"), {"id": trade_id})
+        waiting = threading.Thread(target=edit, args=(second, "5130"))
+        waiting.start()
+        waiting.join(0.3)
+        assert waiting.is_alive()
+        edit(first, "5120")
+        waiting.join()
+
+    assert errors == []
+    reconciliation = client.get(f"/api/accounts/{account_id}/reconciliation").json()
+    assert (reconciliation["trade_pnl"], reconciliation["journaled_trade_pnl"]) == ("30.00", "30.00")
+    assert reconciliation["balanced"] is True
+
+
+def test_concurrent_balance_edits_of_one_account_take_turns(client: TestClient) -> None:
+    account_id = uuid.UUID(create_account(client))
+    errors = []
+
+    def set_balance(db, balance: str) -> None:
+        try:
+            crud.update_account(db, account_id, schemas.AccountUpdate(current_balance=Decimal(balance)))
+        except Exception as exc:  # surfaced in the main thread
+            errors.append(exc)
+
+    with TestingSessionLocal() as first, TestingSessionLocal() as second:
+        # The first edit holds the account row while the second one starts.
+        first.execute(text("SELECT id FROM accounts WHERE id = :id FOR UPDATE"), {"id": account_id})
+        waiting = threading.Thread(target=set_balance, args=(second, "102000"))
+        waiting.start()
+        waiting.join(0.3)
+        assert waiting.is_alive()
+        set_balance(first, "101000")
+        waiting.join()
+
+    assert errors == []
+    assert client.get(f"/api/accounts/{account_id}").json()["current_balance"] == "102000.00"
+
+
+def test_balance_history_and_reconciliation(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id, day=1)
+    second = create_trade(client, strategy_id, account_id, day=2)
+    create_trade(client, strategy_id, account_id, day=2, exit_price=5095)
+
+    # Moving the exit re-journals the trade on its new day.
+    client.put(f"/api/trades/{second['id']}", json={"exitDateTime": "2024-05-03T14:00:00+00:00"}).raise_for_status()
+    client.put(f"/api/accounts/{account_id}", json={"current_balance": 100100}).raise_for_status()
+
+    history = client.get(f"/api/accounts/{account_id}/balance-history").json()
+    assert [(point["date"], point["balance"]) for point in history[:3]] == [
+        ("2024-05-01", "100010.00"),
+        ("2024-05-02", "100005.00"),
+        ("2024-05-03", "100015.00"),
+    ]
+    assert history[-1]["balance"] == "100100.00"
+
+    reconciliation = client.get(f"/api/accounts/{account_id}/reconciliation").json()
+    assert reconciliation["balanced"] is True
+    assert (reconciliation["trade_pnl"], reconciliation["adjustments"]) == ("15.00", "85.00")
+
+    # A direct write to the stored balance shows up as drift.
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE accounts SET current_balance = current_balance + 1"))
+    assert client.get(f"/api/accounts/{account_id}/reconciliation").json()["balanced"] is False
+
+    assert client.get(f"/api/accounts/{uuid.uuid4()}/balance-history").status_code == 404
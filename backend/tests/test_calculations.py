@@ -1,7 +1,13 @@
-from decimal import Decimal
+import random
+from decimal import Decimal, DecimalTuple
+from typing import Optional
+
+import numpy as np
+import pytest
 
 from app.models import TradeDirection
 from app.services import calculations
+from app.services.fixed_point import AMOUNT_SCALE, PRICE_SCALE, QUANTITY_SCALE, from_scaled, to_scaled
 
 
 def test_calculate_pnl_long() -> None:
@@ -58,3 +64,96 @@ def test_calculate_trade_metrics_without_stop_loss() -> None:
     assert risk is None
     assert rr is None
     assert r_multiple is None
+
+
+def random_scaled(rng: random.Random, low: int, high: int, scale: int) -> Decimal:
+    return from_scaled(rng.randint(low * 10**scale, high * 10**scale), scale)
+
+
+def digits(value: Optional[Decimal]) -> Optional[DecimalTuple]:
+    return None if value is None else value.as_tuple()
+
+
+def test_scaled_round_trip() -> None:
+    assert to_scaled(Decimal("15234.500000"), PRICE_SCALE) == 15234500000
+    assert to_scaled(Decimal("2"), QUANTITY_SCALE) == 200
+    assert from_scaled(55500000, PRICE_SCALE).as_tuple() == Decimal("55.500000").as_tuple()
+    with pytest.raises(ValueError):
+        to_scaled(Decimal("1.0000001"), PRICE_SCALE)
+
+
+def test_scaled_trade_metrics_match_decimal_path() -> None:
+    rng = random.Random(20240501)
+    for _ in range(5000):
+        entry = random_scaled(rng, 1, 20000, PRICE_SCALE)
+        values = {
+            "direction": rng.choice([TradeDirection.LONG, TradeDirection.SHORT]),
+            "entry_price": entry,
+            "exit_price": random_scaled(rng, 1, 20000, PRICE_SCALE),
+            "quantity": random_scaled(rng, 0, 50, QUANTITY_SCALE) or Decimal("1.00"),
+            "commissions": random_scaled(rng, 0, 20, QUANTITY_SCALE),
+            "stop_loss": rng.choice([None, entry, random_scaled(rng, 1, 20000, PRICE_SCALE)]),
+            "take_profit": rng.choice([None, entry, random_scaled(rng, 1, 20000, PRICE_SCALE)]),
+        }
+        scales = {"quantity": QUANTITY_SCALE, "commissions": QUANTITY_SCALE}
+        scaled = {
+            key: value if key == "direction" or value is None else to_scaled(value, scales.get(key, PRICE_SCALE))
+            for key, value in values.items()
+        }
+
+        pnl, risk, rr_planned, r_multiple = calculations.calculate_trade_metrics(**values)
+        scaled_pnl, scaled_risk, scaled_rr, scaled_r = calculations.calculate_trade_metrics_scaled(**scaled)
+
+        assert digits(from_scaled(scaled_pnl, AMOUNT_SCALE)) == digits(pnl)
+        assert digits(None if scaled_risk is None else from_scaled(scaled_risk, AMOUNT_SCALE)) == digits(risk)
+        assert digits(scaled_rr) == digits(rr_planned)
+        assert digits(scaled_r) == digits(r_multiple)
+
+
+@pytest.mark.parametrize(("price_digits", "quantity_digits", "dtype"), [(5, 3, np.int64), (8, 6, object)])
+def test_batch_trade_metrics_match_scalar_version(price_digits: int, quantity_digits: int, dtype: type) -> None:
+    # The larger inputs overflow int64 but stay within Decimal's 28 significant digits.
+    rng = random.Random(price_digits)
+    count = 2000
+    entries = [random_scaled(rng, 1, 10**price_digits, PRICE_SCALE) for _ in range(count)]
+    columns = {
+        "direction": [rng.choice([TradeDirection.LONG, TradeDirection.SHORT]) for _ in range(count)],
+        "entry_price": entries,
+        "exit_price": [random_scaled(rng, 1, 10**price_digits, PRICE_SCALE) for _ in range(count)],
+        "quantity": [random_scaled(rng, 1, 10**quantity_digits, QUANTITY_SCALE) for _ in range(count)],
+        "commissions": [random_scaled(rng, 0, 20, QUANTITY_SCALE) for _ in range(count)],
+        "stop_loss": [rng.choice([None, entry, random_scaled(rng, 1, 10**price_digits, PRICE_SCALE)]) for entry in entries],
+        "take_profit": [rng.choice([None, entry, random_scaled(rng, 1, 10**price_digits, PRICE_SCALE)]) for entry in entries],
+    }
+    scales = {"quantity": QUANTITY_SCALE, "commissions": QUANTITY_SCALE}
+    scaled = {
+        key: values
+        if key == "direction"
+        else [None if value is None else to_scaled(value, scales.get(key, PRICE_SCALE)) for value in values]
+        for key, values in columns.items()
+    }
+
+    batch = calculations.calculate_trade_metrics_batch(**scaled)
+
+    assert batch.pnl.dtype == dtype
+    for index, row in enumerate(batch.rows()):
+        expected = calculations.calculate_trade_metrics(**{key: values[index] for key, values in columns.items()})
+        assert [digits(value) for value in row] == [digits(value) for value in expected]
+
+
+def test_batch_trade_metrics_accepts_masked_arrays() -> None:
+    stops = np.ma.MaskedArray([95_000000, 0], mask=[False, True])
+    batch = calculations.calculate_trade_metrics_batch(
+        direction=[TradeDirection.LONG, TradeDirection.SHORT],
+        entry_price=np.array([100_000000, 100_000000]),
+        exit_price=np.array([110_000000, 95_000000]),
+        quantity=np.array([100, 200]),
+        commissions=np.array([0, 150]),
+        stop_loss=stops,
+        take_profit=np.ma.masked_all(2, dtype=np.int64),
+    )
+
+    assert list(batch.rows()) == [
+        (Decimal("10"), Decimal("5"), None, Decimal("2")),
+        (Decimal("8.5"), None, None, None),
+    ]
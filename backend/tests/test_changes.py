@@ -0,0 +1,92 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app import changes, models
+
+from .conftest import TestingSessionLocal, engine
+from .test_api import create_account, create_strategy, create_trade
+
+
+def sync(client: TestClient, since: int, limit: int = 500) -> dict:
+    response = client.get("/api/changes", params={"since": since, "limit": limit})
+    response.raise_for_status()
+    return response.json()
+
+
+def test_change_feed_returns_only_changed_entities(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    trade = create_trade(client, strategy_id, account_id, tag_names=["Breaker"])
+
+    initial = sync(client, since=0)
+    assert [item["id"] for item in initial["trades"]] == [trade["id"]]
+    assert set(initial["accounts"]) == {account_id}
+    assert set(initial["strategies"]) == {strategy_id}
+    assert [tag["name"] for tag in initial["tags"].values()] == ["Breaker"]
+    assert initial["trades"][0]["tag_ids"] == list(initial["tags"])
+    assert sync(client, since=initial["next_since"])["next_since"] == initial["next_since"]
+
+    client.put(f"/api/trades/{trade['id']}", json={"exit_price": 5120}).raise_for_status()
+    spare = client.post("/api/strategies", json={"name": "Spare"}).json()["id"]
+    client.delete(f"/api/strategies/{spare}").raise_for_status()
+
+    delta = sync(client, since=initial["next_since"])
+    assert [(item["id"], item["pnl"]) for item in delta["trades"]] == [(trade["id"], "20.000000")]
+    # The trade's PnL moved the account's live balance.
+    assert delta["accounts"][account_id]["current_balance"] == "100020.00"
+    assert delta["strategies"] == {} and delta["tags"] == {}
+    assert delta["deleted"]["strategies"] == [spare]
+    assert delta["has_more"] is False
+
+
+def test_change_feed_pages_with_limit(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    trade_ids = {create_trade(client, strategy_id, account_id, day=day)["id"] for day in range(1, 4)}
+
+    seen, since, pages = set(), 0, 0
+    while True:
+        page = sync(client, since=since, limit=2)
+        seen |= {item["id"] for item in page["trades"]}
+        since, pages = page["next_since"], pages + 1
+        if not page["has_more"]:
+            break
+    assert seen == trade_ids
+    assert pages > 1
+
+
+def test_rolled_back_writes_are_not_logged(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    since = sync(client, since=0)["next_since"]
+    with TestingSessionLocal() as db:
+        db.get(models.Strategy, uuid.UUID(strategy_id)).name = "Renamed"
+        db.flush()
+        db.rollback()
+    assert sync(client, since=since)["strategies"] == {}
+
+
+def test_change_committed_late_is_not_skipped(client: TestClient) -> None:
+    """A transaction that logged first but commits later must not fall behind a client's cursor."""
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    since = sync(client, since=0)["next_since"]
+
+    with engine.connect() as first:
+        first.begin()
+        changes.record_changes(first, {(models.ChangeEntity.STRATEGY, uuid.UUID(strategy_id)): False})
+        # A later writer does not wait for the open transaction, but its change is held back.
+        client.put(f"/api/accounts/{account_id}", json={"name": "Renamed"}).raise_for_status()
+        held = sync(client, since=since)
+        assert (held["next_since"], held["accounts"], held["strategies"]) == (since, {}, {})
+        first.commit()
+
+    rows = sync(client, since=since)
+    assert (set(rows["strategies"]), set(rows["accounts"])) == ({strategy_id}, {account_id})
+    assert sync(client, since=rows["next_since"])["next_since"] == rows["next_since"]
+
+
+def test_snapshot_tells_which_commits_it_saw() -> None:
+    snapshot = changes.Snapshot.parse("10:14:10,13")
+    assert str(snapshot) == "10:14:10,13"
+    assert [xid for xid in range(8, 16) if snapshot.sees(xid)] == [8, 9, 11, 12]
@@ -0,0 +1,114 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from app import database
+from app.database import STATEMENT_TIMEOUT_KEY, InstrumentedQueuePool, pool_status, select_read_engine
+
+from .conftest import TEST_DATABASE_URL, engine
+from .test_api import create_account, create_strategy, create_trade
+
+
+def test_session_applies_statement_timeout() -> None:
+    with Session(bind=engine, info={STATEMENT_TIMEOUT_KEY: 1234}) as db:
+        assert db.execute(text("SHOW statement_timeout")).scalar() == "1234ms"
+
+    with Session(bind=engine) as db:
+        assert db.execute(text("SHOW statement_timeout")).scalar() == "0"
+
+
+def test_instrumented_pool_records_checkouts_and_timeouts() -> None:
+    pool_engine = create_engine(
+        TEST_DATABASE_URL, poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    try:
+        with pool_engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                pool_engine.connect()
+            status = pool_status(pool_engine.pool)
+            assert status["checked_out"] == 1
+            assert status["checkouts_total"] == 1
+            assert status["checkout_timeouts_total"] == 1
+    finally:
+        pool_engine.dispose()
+
+
+def test_metrics_endpoint_exposes_pool_gauges(client: TestClient) -> None:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE db_pool_checked_out gauge" in response.text
+    assert 'db_pool_checkout_timeouts_total{pool="primary"} 0' in response.text
+
+
+@pytest.fixture()
+def replica(monkeypatch):
+    replica_engine = create_engine(TEST_DATABASE_URL)
+    monkeypatch.setattr(database, "read_engine", replica_engine)
+    yield replica_engine
+    replica_engine.dispose()
+
+
+def test_reads_fall_back_to_primary_after_own_write(replica) -> None:
+    assert select_read_engine(None) is replica
+    assert select_read_engine("not-a-timestamp") is replica
+    assert select_read_engine(str(time.time() - 3600)) is replica
+    assert select_read_engine(str(time.time())) is database.engine
+
+
+def test_successful_writes_set_last_write_cookie(client: TestClient, replica) -> None:
+    assert database.LAST_WRITE_COOKIE not in client.get("/api/strategies").cookies
+
+    response = client.post("/api/strategies", json={"name": "Replica check"})
+    assert response.status_code == 201
+    assert float(response.cookies[database.LAST_WRITE_COOKIE]) <= time.time()
+
+
+def test_repeated_trade_listings_hit_statement_cache(client: TestClient) -> None:
+    client.get("/api/trades", params={"symbol": "ES"})
+    before = database.statement_cache_stats.snapshot()
+    for _ in range(3):
+        assert client.get("/api/trades", params={"symbol": "ES"}).status_code == 200
+    after = database.statement_cache_stats.snapshot()
+
+    assert after["miss"] == before["miss"]
+    assert after["hit"] - before["hit"] >= 6
+    assert 'db_statement_cache_total{result="hit"}' in client.get("/metrics").text
+
+
+def _sample(text: str, line_prefix: str) -> float:
+    lines = [line for line in text.splitlines() if line.startswith(line_prefix)]
+    return float(lines[0].rsplit(" ", 1)[1]) if lines else 0.0
+
+
+def test_metrics_record_latency_and_sql_work_per_route(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    trade_id = create_trade(client, strategy_id, account_id)["id"]
+    route = 'method="GET",route="/api/trades/{trade_id}"'
+    names = [
+        f"http_request_duration_seconds_count{{{route}}}",
+        f"http_requests_total{{{route},status=\"200\"}}",
+        'http_requests_total{method="GET",route="unmatched",status="404"}',
+        f"http_request_sql_statements_sum{{{route}}}",
+        f"http_request_sql_rows_sum{{{route}}}",
+        f"http_request_db_seconds_sum{{{route}}}",
+        f'http_response_size_bytes_bucket{{le="+Inf",{route}}}',
+        f"http_response_size_bytes_sum{{{route}}}",
+    ]
+    before = client.get("/metrics").text
+    for _ in range(2):
+        client.get(f"/api/trades/{trade_id}").raise_for_status()
+    client.get("/api/no-such-route")
+    after = client.get("/metrics").text
+
+    count, ok, unmatched, statements, rows, db_seconds, sized, size = (
+        _sample(after, name) - _sample(before, name) for name in names
+    )
+    assert (count, ok, unmatched, sized) == (2, 2, 1, 2)
+    assert statements >= 2 and rows >= 2 and db_seconds > 0
+    assert size > 200
@@ -0,0 +1,109 @@
+import json
+import queue
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import crud, database, invalidation, main, models
+
+from .conftest import TestingSessionLocal, engine
+from .test_api import create_account, create_strategy, create_trade
+
+
+@pytest.fixture()
+def listener():
+    change_listener = invalidation.ChangeListener(engine, poll_seconds=0.05)
+    events: "queue.Queue" = queue.Queue()
+    change_listener.subscribe(lambda entities, local, messages: events.put((entities, local, messages)))
+    change_listener.start()
+    assert change_listener.listening.wait(10)
+    yield change_listener, events
+    change_listener.stop()
+
+
+def notify(entities, origin: str = "another-worker") -> None:
+    payload = json.dumps({"origin": origin, "entities": entities})
+    with engine.begin() as connection:
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"), {"channel": invalidation.CHANGE_CHANNEL, "payload": payload}
+        )
+
+
+def test_commits_notify_every_listener(client: TestClient, listener) -> None:
+    _, events = listener
+    create_strategy(client)
+    entities, local, messages = events.get(timeout=5)
+    assert (entities, local) == (frozenset({models.ChangeEntity.STRATEGY}), True)
+    assert messages[0]["seq"] > 0 and "trades" not in messages[0]
+
+    db = TestingSessionLocal()
+    db.add(models.Tag(name="rolled back", type="custom"))
+    db.flush()
+    db.rollback()
+    db.close()
+    notify(["trade", "account"])
+    assert events.get(timeout=5)[:2] == (frozenset({models.ChangeEntity.TRADE, models.ChangeEntity.ACCOUNT}), False)
+
+    notify(["not an entity"])
+    assert events.get(timeout=5) == (None, False, [])
+    assert events.empty()
+
+
+def test_other_workers_writes_reload_the_live_dashboard(client: TestClient, listener, monkeypatch) -> None:
+    change_listener, _ = listener
+    change_listener.subscribe(main.update_live_dashboard)
+    monkeypatch.setattr(database, "SessionLocal", TestingSessionLocal)
+    strategy_id = create_strategy(client)
+    trade = create_trade(client, strategy_id, create_account(client), exit_price=5098)
+
+    with client.websocket_connect("/api/dashboard/live") as websocket:
+        assert websocket.receive_json()["kpis"]["total_pnl"] == "-2.000000"
+        # Another process rewrites the trade's PnL and announces it.
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE trades SET pnl = -7 WHERE id = :id"), {"id": trade["id"]})
+        notify(["trade"])
+        snapshot = websocket.receive_json()
+        assert snapshot["type"] == "snapshot" and snapshot["kpis"]["total_pnl"] == "-7.000000"
+
+
+def test_other_workers_trade_edits_reach_the_live_dashboard_as_deltas(client: TestClient, listener, monkeypatch) -> None:
+    _, events = listener
+    monkeypatch.setattr(database, "SessionLocal", TestingSessionLocal)
+    strategy_id = create_strategy(client)
+    trade = create_trade(client, strategy_id, create_account(client), exit_price=5098)
+
+    with client.websocket_connect("/api/dashboard/live") as websocket:
+        assert websocket.receive_json()["kpis"]["total_pnl"] == "-2.000000"
+        # Another worker edits the trade: only its own hub publishes, this one gets the notification.
+        monkeypatch.setattr(crud, "_publish_trade_change", lambda *args: None)
+        client.put(f"/api/trades/{trade['id']}", json={"exit_price": 5093}).raise_for_status()
+        while True:
+            entities, _, messages = events.get(timeout=5)
+            if any(before is not None for message in messages for before, _ in message.get("trades", [])):
+                break
+
+        def no_full_reload(db):
+            raise AssertionError("reloaded the totals for a described trade change")
+
+        monkeypatch.setattr(crud, "get_trade_totals", no_full_reload)
+        main.update_live_dashboard(entities, False, [{**message, "origin": "another-worker"} for message in messages])
+        delta = websocket.receive_json()
+        assert (delta["type"], delta["seq"]) == ("delta", messages[0]["seq"])
+        assert delta["kpis"]["total_pnl"] == "-7.000000"
+
+
+def test_oversized_trade_facts_are_left_out_of_the_notification() -> None:
+    trades = [[None, ["strategy", "2024-05-01T14:00:00+00:00", -2000000, None]]]
+    message = json.loads(invalidation.notification_payload([models.ChangeEntity.TRADE], 4, 19072, trades))
+    assert (message["seq"], message["xid"], message["trades"]) == (4, 19072, trades)
+
+    message = json.loads(invalidation.notification_payload([models.ChangeEntity.TRADE], 4, 19072, trades * 200))
+    assert "trades" not in message and message["seq"] == 4
+
+
+def test_worker_count_defaults_to_the_cpu_count() -> None:
+    from app import serve
+
+    assert serve.worker_count(3) == 3
+    assert serve.worker_count(0) >= 1
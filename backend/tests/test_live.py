@@ -0,0 +1,130 @@
+import asyncio
+import json
+import uuid
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+from app import changes, live
+from app.services.totals import TradeTotals
+
+from .test_api import create_account, create_strategy, create_trade
+
+
+def apply_delta(state: dict, delta: dict) -> None:
+    """What a client does with a delta: replace KPIs and summaries, shift the equity curve."""
+    state["kpis"] = delta["kpis"]
+    strategies = {item["strategy_id"]: item for item in state["strategies"]}
+    for summary in delta["strategies"]:
+        strategies[summary["strategy_id"]] = summary
+    state["strategies"] = [item for item in strategies.values() if item["trades"]]
+    curve = {point["date"]: Decimal(point["cumulative_pnl"]) for point in state["equity_curve"]}
+    for change in delta["equity_curve"]:
+        if change["date"] not in curve:
+            earlier = [value for day, value in curve.items() if day < change["date"]]
+            curve[change["date"]] = earlier[-1] if earlier else Decimal("0")
+        for day in curve:
+            if day >= change["date"]:
+                curve[day] += Decimal(change["pnl_change"])
+        if not change["trades"]:
+            del curve[change["date"]]
+        curve = dict(sorted(curve.items()))
+    state["equity_curve"] = [{"date": day, "cumulative_pnl": value} for day, value in curve.items()]
+
+
+def rest_state(client: TestClient) -> dict:
+    daily = {}
+    for point in client.get("/api/dashboard/equity-curve").json():
+        daily[point["date"]] = Decimal(point["cumulative_pnl"])
+    return {
+        "kpis": client.get("/api/dashboard/kpis").json(),
+        "strategies": sorted(client.get("/api/dashboard/strategies").json(), key=lambda item: item["strategy_id"]),
+        "equity_curve": [{"date": day, "cumulative_pnl": value} for day, value in daily.items()],
+    }
+
+
+def live_state(state: dict) -> dict:
+    return {
+        "kpis": state["kpis"],
+        "strategies": sorted(state["strategies"], key=lambda item: item["strategy_id"]),
+        "equity_curve": [
+            {"date": point["date"], "cumulative_pnl": Decimal(point["cumulative_pnl"])} for point in state["equity_curve"]
+        ],
+    }
+
+
+def test_live_dashboard_pushes_deltas_matching_rest(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    first = create_trade(client, strategy_id, account_id, day=1, stopLossPlanned=5095)
+    # A loss keeps profit_factor finite, which the REST KPIs endpoint needs to encode it.
+    create_trade(client, strategy_id, account_id, day=2, exit_price=5098)
+
+    with client.websocket_connect("/api/dashboard/live") as websocket:
+        state = websocket.receive_json()
+        assert state["type"] == "snapshot"
+        assert live_state(state) == rest_state(client)
+
+        other_strategy = client.post("/api/strategies", json={"name": "Other"}).json()["id"]
+        create_trade(client, other_strategy, account_id, day=3, exit_price=5090, stopLossPlanned=5095)
+        delta = websocket.receive_json()
+        assert delta["type"] == "delta"
+        assert delta["equity_curve"] == [{"date": "2024-05-03", "pnl_change": "-10.000000", "trades": 1}]
+        assert [item["strategy_name"] for item in delta["strategies"]] == ["Other"]
+        apply_delta(state, delta)
+
+        # Moving a trade to another strategy and day touches both strategies and both days.
+        client.put(
+            f"/api/trades/{first['id']}",
+            json={"strategy_id": other_strategy, "exit_price": 5120, "exitDateTime": "2024-05-02T14:00:00+00:00"},
+        ).raise_for_status()
+        delta = websocket.receive_json()
+        assert len(delta["strategies"]) == 2
+        apply_delta(state, delta)
+        assert live_state(state) == rest_state(client)
+
+        # Edits that leave the dashboard unchanged push nothing; the CSV import below is next.
+        client.put(f"/api/trades/{first['id']}", json={"notes": "reviewed"}).raise_for_status()
+        rows = "\n".join(
+            f"ES,Long,1,{strategy_id},{account_id},2024-05-0{day}T13:30:00+00:00,2024-05-0{day}T14:00:00+00:00,5100,5105"
+            for day in (1, 4)
+        )
+        header = "symbol,direction,quantity,strategy_id,account_id,entry_datetime,exit_datetime,entry_price,exit_price"
+        client.post(
+            "/api/trades/csv", files={"file": ("trades.csv", f"{header}\n{rows}\n", "text/csv")}
+        ).raise_for_status()
+        for _ in range(2):
+            apply_delta(state, websocket.receive_json())
+        assert live_state(state) == rest_state(client)
+        assert state["kpis"]["total_trades"] == 5
+
+
+def test_publish_skips_changes_already_in_the_snapshot() -> None:
+    hub = live.DashboardHub(queue_size=2)
+    loop = asyncio.new_event_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+    strategy_id = uuid.uuid4()
+    totals = TradeTotals.from_rows([(10_000_000, None)])
+    # The totals include transaction 5 but not 6, which was still running when they were read.
+    as_of = changes.Snapshot.parse("5:7:6")
+    hub.subscribe(queue, loop, lambda: (as_of, 40, [(strategy_id, "ICT", "2024-05-01", totals)]))
+
+    facts = live.TradeFacts(strategy_id=strategy_id, day="2024-05-01", pnl=10_000_000, r_multiple=None)
+    hub.publish(38, 5, None, facts)
+    # Logged before the totals' highest ``seq``, but committed after they were read.
+    hub.publish(39, 6, None, facts)
+    hub.publish(41, 7, facts, facts)
+    loop.run_until_complete(asyncio.sleep(0))
+    messages = [json.loads(queue.get_nowait()) for _ in range(queue.qsize())]
+    assert [(message["type"], message["seq"]) for message in messages] == [("snapshot", 40), ("delta", 39)]
+    assert messages[1]["kpis"]["total_trades"] == 2
+
+    # A subscriber that cannot keep up gets ``None`` instead of a gap in its deltas.
+    for xid in (8, 9, 10):
+        hub.publish(xid + 34, xid, None, facts)
+    loop.run_until_complete(asyncio.sleep(0))
+    assert queue.get_nowait() is None
+
+    hub.unsubscribe(queue)
+    assert not hub.active
+    loop.close()
@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+
+import pytest
+
+from benchmarks import load, synthetic
+
+from .conftest import TEST_DATABASE_URL, engine
+
+
+def test_percentile_and_mix_parsing() -> None:
+    values = [float(value) for value in range(1, 101)]
+    assert [load.percentile(values, fraction) for fraction in (0.5, 0.95, 0.99)] == [50.0, 95.0, 99.0]
+    assert load.percentile([], 0.5) == 0.0
+    assert load.parse_mix("create=2, list") == {"create": 2.0, "list": 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        load.parse_mix("delete=1")
+
+
+def test_load_run_reports_every_route() -> None:
+    synthetic.generate_journal(engine, 200, seed=5)
+    port = load._free_port()
+    server = load.start_server(TEST_DATABASE_URL, workers=1, port=port)
+    try:
+        report = asyncio.run(
+            load.run_load(
+                f"http://127.0.0.1:{port}",
+                mix=load.parse_mix(load.DEFAULT_MIX),
+                concurrency=4,
+                duration=3,
+                warmup=0.5,
+                csv_rows=2,
+            )
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    assert report["requests"] > 0 and report["pool"]["db_pool_checkouts_total"] > 0
+    assert {"GET /api/trades", "GET /api/dashboard/bundle", "GET /health (loop probe)"} <= set(report["routes"])
+    for stats in report["routes"].values():
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
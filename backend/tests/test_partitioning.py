@@ -0,0 +1,92 @@
+import threading
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import database, main, partitioning
+
+from .conftest import engine
+from .test_api import create_account, create_strategy, create_trade
+
+
+@pytest.fixture()
+def partitioned_trades():
+    with engine.begin() as connection:
+        partitioning.convert_to_partitioned(connection, months_ahead=0)
+    try:
+        yield
+    finally:
+        with engine.begin() as connection:
+            for name in connection.execute(text("SELECT tablename FROM pg_tables WHERE tablename LIKE 'trades_y%'")).scalars():
+                connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            partitioning.convert_to_plain(connection)
+
+
+def _partition_counts(connection) -> dict:
+    rows = connection.execute(text("SELECT tableoid::regclass::text, count(*) FROM trades GROUP BY 1")).all()
+    return dict(rows)
+
+
+def test_month_helpers() -> None:
+    assert partitioning.add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert partitioning.add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert partitioning.partition_name(date(2024, 5, 17)) == "trades_y2024m05"
+
+
+def test_partitioned_trades_route_move_and_detach(client: TestClient, partitioned_trades) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id, day=1, tag_names=["Breaker"])
+
+    with engine.begin() as connection:
+        assert partitioning.is_partitioned(connection)
+        assert _partition_counts(connection) == {partitioning.DEFAULT_PARTITION: 1}
+
+        assert partitioning.create_partition(connection, date(2024, 5, 1))
+        assert not partitioning.create_partition(connection, date(2024, 5, 1))
+        assert _partition_counts(connection) == {"trades_y2024m05": 1}
+
+    listed = client.get("/api/trades", params={"start_date": "2024-05-01T00:00:00Z"}).json()
+    assert listed["total"] == 1
+    assert [tag["name"] for tag in listed["trades"][0]["tags"]] == ["Breaker"]
+
+    with engine.begin() as connection:
+        assert partitioning.detach_partition(connection, date(2024, 5, 1)) == "trades_y2024m05"
+        assert connection.execute(text("SELECT count(*) FROM trades")).scalar() == 0
+        assert connection.execute(text("SELECT count(*) FROM trades_y2024m05")).scalar() == 1
+
+
+def test_concurrent_creates_of_a_partition_both_succeed(partitioned_trades) -> None:
+    results = []
+    with engine.connect() as first:
+        with first.begin():
+            assert partitioning.create_partition(first, date(2024, 6, 1))
+
+            def create_in_another_transaction() -> None:
+                with engine.begin() as second:
+                    results.append(partitioning.create_partition(second, date(2024, 6, 1)))
+
+            other = threading.Thread(target=create_in_another_transaction)
+            other.start()
+            other.join(timeout=0.5)
+            # The second caller waits for the first transaction instead of racing it.
+            assert other.is_alive()
+        other.join(timeout=5)
+    assert results == [False]
+
+
+def test_workers_starting_together_leave_partitions_to_one_of_them(partitioned_trades, monkeypatch) -> None:
+    monkeypatch.setattr(partitioning, "TRADES_PARTITIONING", "monthly")
+    monkeypatch.setattr(database, "engine", engine)
+    with engine.begin() as first:
+        assert partitioning.try_lock_partitions(first)
+        main.ensure_future_partitions()
+    next_month = partitioning.partition_name(partitioning.add_months(partitioning.month_start(date.today()), 1))
+    with engine.connect() as connection:
+        assert next_month not in partitioning.list_partitions(connection)
+
+    main.ensure_future_partitions()
+    with engine.connect() as connection:
+        assert next_month in partitioning.list_partitions(connection)
@@ -0,0 +1,67 @@
+import logging
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app import crud, models, query_budget, schemas
+from app.routers import trades as trades_router
+
+from .conftest import TestingSessionLocal
+from .test_api import create_account, create_strategy, create_trade
+
+
+def test_tag_lookup_does_not_grow_with_tag_count(client: TestClient) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    counts = []
+    for day, tag_names in ((1, ["a", "b"]), (2, ["A", "c", "d", "e", "f", "g", "h", "i"])):
+        payload = schemas.TradeCreate(
+            symbol="ES",
+            direction=models.TradeDirection.LONG,
+            quantity=1,
+            strategy_id=uuid.UUID(strategy_id),
+            account_id=uuid.UUID(account_id),
+            entryDateTime=f"2024-01-0{day}T14:30:00Z",
+            exitDateTime=f"2024-01-0{day}T15:30:00Z",
+            entry_price=5100,
+            exit_price=5110,
+            tag_names=tag_names,
+        )
+        db = TestingSessionLocal()
+        try:
+            with query_budget.query_budget(None) as counter:
+                trade = crud.create_trade(db, payload)
+            counts.append(counter.statements)
+            tag_names_seen = sorted(tag.name for tag in trade.tags)
+        finally:
+            db.close()
+
+    assert counts[0] == counts[1]
+    # "A" matched the existing "a" instead of creating a second tag.
+    assert tag_names_seen == ["a", "c", "d", "e", "f", "g", "h", "i"]
+
+
+def test_route_over_budget_fails(client: TestClient, monkeypatch) -> None:
+    trade = create_trade(client, create_strategy(client), create_account(client))
+    monkeypatch.setattr(trades_router.get_trade, "query_budget", 0)
+    with pytest.raises(query_budget.QueryBudgetExceeded, match=r"GET /api/trades/\{trade_id\} executed 1 SQL statements"):
+        client.get(f"/api/trades/{trade['id']}")
+
+
+def test_repeated_statements_are_reported(client: TestClient, monkeypatch, caplog) -> None:
+    trade = create_trade(client, create_strategy(client), create_account(client))
+    monkeypatch.setattr(query_budget, "QUERY_REPEAT_WARNING", 3)
+    db = TestingSessionLocal()
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.query_budget"):
+            with query_budget.query_budget(2, "trade loop", strict=False):
+                for _ in range(3):
+                    db.execute(select(models.Trade).where(models.Trade.id == uuid.UUID(trade["id"]))).all()
+    finally:
+        db.close()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith("trade loop ran one statement 3 times, a likely N+1: SELECT") for message in messages)
+    assert "trade loop executed 3 SQL statements, over its budget of 2" in messages
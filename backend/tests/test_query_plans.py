@@ -0,0 +1,247 @@
+"""Query-plan regression tests.
+
+Each hot ``crud`` query is executed against a seeded journal while its SQL is captured, then
+re-run under ``EXPLAIN``. A test fails when the plan no longer uses the expected index or
+falls back to a sequential scan of ``trades``/``trade_tags``.
+"""
+
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Set, Tuple
+import uuid
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app import crud, models
+
+from .conftest import TestingSessionLocal, engine
+
+SEED_TRADES = 20000
+SEED_ACCOUNTS = 20
+SEED_STRATEGIES = 10
+SEED_SYMBOLS = ["ES", "NQ", "YM", "RTY", "CL", "GC", "6E", "ZN", "ZB", "SI", "HG", "NG"]
+SCANNED_TABLES = {"trades", "trade_tags"}
+
+
+@pytest.fixture()
+def seeded_db() -> Iterator[Session]:
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                """
+                INSERT INTO accounts (id, name, type, initial_balance, current_balance)
+                SELECT gen_random_uuid(), 'Account ' || g, 'Funded', 100000, 100000
+                FROM generate_series(1, :accounts) AS g
+                """
+            ),
+            {"accounts": SEED_ACCOUNTS},
+        )
+        connection.execute(
+            text(
+                """
+                INSERT INTO strategies (id, name, timeframes, preferred_direction)
+                SELECT gen_random_uuid(), 'Strategy ' || g, ARRAY['15M'], 'Both'
+                FROM generate_series(1, :strategies) AS g
+                """
+            ),
+            {"strategies": SEED_STRATEGIES},
+        )
+        connection.execute(
+            text(
+                """
+                INSERT INTO tags (id, name, type)
+                SELECT gen_random_uuid(), 'tag-' || g, 'custom' FROM generate_series(1, 30) AS g
+                """
+            )
+        )
+        connection.execute(
+            text(
+                """
+                WITH a AS (SELECT id, row_number() OVER (ORDER BY name) - 1 AS n FROM accounts),
+                     s AS (SELECT id, row_number() OVER (ORDER BY name) - 1 AS n FROM strategies)
+                INSERT INTO trades (
+                    id, symbol, direction, quantity, session, strategy_id, account_id,
+                    entry_timestamp, exit_timestamp, entry_price, exit_price, commissions, pnl,
+                    import_method, confirmations, confirmations_count
+                )
+                SELECT
+                    gen_random_uuid(),
+                    (:symbols)[1 + g % cardinality(:symbols)],
+                    (CASE WHEN g % 2 = 0 THEN 'Long' ELSE 'Short' END)::trade_direction_enum,
+                    1,
+                    (CASE g % 3 WHEN 0 THEN 'NY' WHEN 1 THEN 'London' ELSE 'Asia' END)::trade_session_enum,
+                    s.id,
+                    a.id,
+                    TIMESTAMPTZ '2022-01-01' + g * INTERVAL '47 minutes',
+                    TIMESTAMPTZ '2022-01-01' + g * INTERVAL '47 minutes' + INTERVAL '20 minutes',
+                    100,
+                    100.25 + (g % 7) - 3,
+                    1,
+                    (g % 7) - 3.25,
+                    'manual',
+                    ARRAY[]::varchar[],
+                    0
+                FROM generate_series(1, :trades) AS g
+                JOIN a ON a.n = g % :accounts
+                JOIN s ON s.n = g % :strategies
+                """
+            ),
+            {
+                "trades": SEED_TRADES,
+                "accounts": SEED_ACCOUNTS,
+                "strategies": SEED_STRATEGIES,
+                "symbols": SEED_SYMBOLS,
+            },
+        )
+        connection.execute(
+            text(
+                """
+                INSERT INTO trade_tags (trade_id, tag_id)
+                SELECT t.id, tg.id
+                FROM (SELECT id, row_number() OVER () AS n FROM trades) AS t
+                JOIN (SELECT id, row_number() OVER (ORDER BY name) - 1 AS n FROM tags) AS tg ON tg.n = t.n % 30
+                """
+            )
+        )
+        connection.execute(text("ANALYZE accounts, strategies, tags, trades, trade_tags"))
+
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _capture_statements(db: Session, call: Callable[[Session], object]) -> List[Tuple[str, object]]:
+    statements: List[Tuple[str, object]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", record)
+    try:
+        call(db)
+    finally:
+        event.remove(connection, "before_cursor_execute", record)
+    return statements
+
+
+def _plan_nodes(plan: Dict) -> Iterator[Dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def explain_crud_call(db: Session, call: Callable[[Session], object]) -> Tuple[Set[str], Set[str]]:
+    """Return ``(indexes used, tables sequentially scanned)`` over every statement ``call`` runs."""
+    indexes: Set[str] = set()
+    seq_scans: Set[str] = set()
+    for statement, parameters in _capture_statements(db, call):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            continue
+        raw = db.connection().connection.driver_connection
+        with raw.cursor() as cursor:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = cursor.fetchone()[0][0]["Plan"]
+        for node in _plan_nodes(plan):
+            if "Index Name" in node:
+                indexes.add(node["Index Name"])
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in SCANNED_TABLES:
+                seq_scans.add(node["Relation Name"])
+    return indexes, seq_scans
+
+
+def _sample_ids(db: Session) -> Dict[str, uuid.UUID]:
+    return {
+        "account_id": db.query(models.Account.id).order_by(models.Account.name.asc()).limit(1).scalar(),
+        "strategy_id": db.query(models.Strategy.id).order_by(models.Strategy.name.asc()).limit(1).scalar(),
+        "trade_id": db.query(models.Trade.id).limit(1).scalar(),
+    }
+
+
+# Each case lists index requirements; every entry is a set of acceptable alternatives.
+# Sorted listings may legitimately walk ``ix_trades_exit_timestamp`` backwards and filter,
+# while counts cannot use the sort order and must hit the filter's composite index.
+ANY_TRADE_LISTING_INDEX = {
+    "ix_trades_exit_timestamp",
+    "ix_trades_account_id_exit_timestamp",
+    "ix_trades_strategy_id_exit_timestamp",
+    "ix_trades_symbol_exit_timestamp",
+}
+
+CASES: Dict[str, Tuple[Callable[[Session, Dict[str, uuid.UUID]], object], List[Set[str]]]] = {
+    "list_trades": (
+        lambda db, ids: crud.list_trades(db, skip=0, limit=20),
+        [{"ix_trades_exit_timestamp"}, {"trade_tags_pkey"}],
+    ),
+    "list_trades_by_account": (
+        lambda db, ids: crud.list_trades(db, skip=0, limit=20, account_id=ids["account_id"]),
+        [ANY_TRADE_LISTING_INDEX],
+    ),
+    "list_trades_by_strategy": (
+        lambda db, ids: crud.list_trades(db, skip=0, limit=20, strategy_id=ids["strategy_id"]),
+        [ANY_TRADE_LISTING_INDEX],
+    ),
+    "list_trades_by_symbol": (
+        lambda db, ids: crud.list_trades(db, skip=0, limit=20, symbol="ES"),
+        [ANY_TRADE_LISTING_INDEX],
+    ),
+    "list_trades_by_date_range": (
+        lambda db, ids: crud.list_trades(
+            db,
+            skip=0,
+            limit=20,
+            start_date=datetime(2023, 6, 1, tzinfo=timezone.utc),
+            end_date=datetime(2023, 6, 8, tzinfo=timezone.utc),
+        ),
+        [{"ix_trades_exit_timestamp", "ix_trades_entry_timestamp"}],
+    ),
+    "count_trades_by_account": (
+        lambda db, ids: crud.get_trade_count(db, account_id=ids["account_id"]),
+        [{"ix_trades_account_id_exit_timestamp"}],
+    ),
+    "count_trades_by_strategy": (
+        lambda db, ids: crud.get_trade_count(db, strategy_id=ids["strategy_id"]),
+        [{"ix_trades_strategy_id_exit_timestamp"}],
+    ),
+    "count_trades_by_symbol": (
+        lambda db, ids: crud.get_trade_count(db, symbol="ES"),
+        [{"ix_trades_symbol_exit_timestamp"}],
+    ),
+    "get_trade": (
+        lambda db, ids: crud.get_trade(db, ids["trade_id"]),
+        [{"trades_pkey"}, {"trade_tags_pkey"}],
+    ),
+    "list_trades_normalized_by_account": (
+        lambda db, ids: crud.list_trades_normalized(db, skip=0, limit=20, account_id=ids["account_id"]),
+        [ANY_TRADE_LISTING_INDEX, {"trade_tags_pkey"}],
+    ),
+    # The dashboard's tag breakdown for a date range; unfiltered, it reads every trade anyway.
+    "tag_performance_by_date_range": (
+        lambda db, ids: crud._tag_performance(
+            db,
+            start_date=datetime(2023, 6, 1, tzinfo=timezone.utc),
+            end_date=datetime(2023, 6, 8, tzinfo=timezone.utc),
+        ),
+        [{"ix_trades_exit_timestamp"}, {"trade_tags_pkey"}],
+    ),
+}
+
+
+def test_crud_queries_use_expected_indexes(seeded_db: Session) -> None:
+    # One seeded journal is shared by every case; failures are collected so a single run
+    # reports every regressed query.
+    ids = _sample_ids(seeded_db)
+    problems: List[str] = []
+    for case, (call, requirements) in sorted(CASES.items()):
+        indexes, seq_scans = explain_crud_call(seeded_db, lambda db: call(db, ids))
+        if seq_scans:
+            problems.append(f"{case} sequentially scans {sorted(seq_scans)}")
+        for alternatives in requirements:
+            if not indexes & alternatives:
+                problems.append(f"{case} used {sorted(indexes)}, expected one of {sorted(alternatives)}")
+
+    assert not problems, "\n".join(problems)
@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.crud import compact_balance_ledger
+from app.recompute import recompute_journal
+
+from .conftest import TestingSessionLocal, engine
+from .test_api import create_account, create_strategy, create_trade
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_recompute_repairs_metrics_and_balances(client: TestClient, workers: int) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    trades = [
+        create_trade(client, strategy_id, account_id, day=day, stopLossPlanned=5095.25, takeProfitPlanned=5120)
+        for day in range(1, 6)
+    ]
+    broken = trades[1]["id"]
+    with TestingSessionLocal() as db:
+        compact_balance_ledger(db)
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE trades SET pnl = 0, r_multiple = NULL, rr_planned = 9 WHERE id = :id"), {"id": broken}
+        )
+        connection.execute(text("DELETE FROM account_ledger WHERE trade_id = :id"), {"id": trades[2]["id"]})
+        connection.execute(text("UPDATE accounts SET current_balance = 1"))
+
+    dry_run = recompute_journal(engine, workers=workers, chunk_size=2, dry_run=True)
+    assert (dry_run.trades, dry_run.trades_changed) == (5, 1)
+    assert dry_run.column_drift == {"pnl": 1, "risk_per_trade": 0, "rr_planned": 1, "r_multiple": 1}
+    assert dry_run.pnl_drift == Decimal("10")
+    assert len(dry_run.balance_drift) == 1
+
+    since = client.get("/api/changes").json()["next_since"]
+    report = recompute_journal(engine, workers=workers, chunk_size=2)
+    assert report.trades_changed == 1
+    assert report.balance_drift == [("Funded 100k", Decimal("1.00"), Decimal("100050.00"))]
+
+    repaired = client.get(f"/api/trades/{broken}").json()
+    untouched = client.get(f"/api/trades/{trades[0]['id']}").json()
+    assert {key: repaired[key] for key in ("pnl", "risk_per_trade", "rr_planned", "r_multiple")} == {
+        key: untouched[key] for key in ("pnl", "risk_per_trade", "rr_planned", "r_multiple")
+    }
+    assert client.get(f"/api/accounts/{account_id}").json()["current_balance"] == "100050.00"
+    assert client.get(f"/api/accounts/{account_id}/reconciliation").json()["balanced"] is True
+    changed = client.get("/api/changes", params={"since": since}).json()
+    assert [trade["id"] for trade in changed["trades"]] == [broken]
+    assert list(changed["accounts"]) == [account_id]
+
+    assert recompute_journal(engine, workers=workers, chunk_size=2).trades_changed == 0
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import slow_queries
+
+from .conftest import engine
+from .test_api import create_account, create_strategy, create_trade
+
+
+@pytest.fixture()
+def slow_log(monkeypatch, tmp_path):
+    log_path = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0.000001)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_EXPLAIN_RATE", 1.0)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_LOG_PATH", str(log_path))
+    slow_queries.slow_query_log.clear()
+    yield log_path
+    slow_queries.slow_query_log.wait_for_plans()
+    slow_queries.slow_query_log.clear()
+
+
+def test_normalize_sql_folds_in_lists_and_whitespace() -> None:
+    statement = "SELECT *\n  FROM trades\n WHERE id IN (%(id_1_1)s, %(id_1_2)s,%(id_1_3)s) AND symbol = %(symbol_1)s"
+    assert slow_queries.normalize_sql(statement) == "SELECT * FROM trades WHERE id IN (...) AND symbol = %(symbol_1)s"
+    assert slow_queries.parameter_shape({"id_1_1": 1, "tags": ["a", "b"]}) == {"id_1_1": "int", "tags": "list[2]"}
+    assert slow_queries.parameter_shape([{"a": 1}, {"a": 2}]) == {"rows": 2, "row": {"a": "int"}}
+
+
+def test_slow_statements_are_logged_with_caller_and_plan(client: TestClient, slow_log) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id)
+    client.get("/api/trades", params={"symbol": "ES", "account_id": account_id}).raise_for_status()
+    slow_queries.slow_query_log.wait_for_plans()
+
+    count = client.get("/api/admin/slow-queries", params={"caller": "crud.get_trade_count"}).json()[0]
+    assert "count(trades.id)" in count["sql"] and "trades.symbol = %(symbol_1)s" in count["sql"]
+    assert count["parameters"] == {"symbol_1": "str", "account_id_1": "UUID"}
+    assert "actual time=" in count["plan"]
+
+    # Writes are logged but never re-run for a plan.
+    inserts = [entry for entry in slow_queries.slow_query_log.entries() if entry["sql"].startswith("INSERT INTO trades")]
+    assert inserts and all(entry["plan"] is None for entry in inserts)
+
+    summary = client.get("/api/admin/slow-queries/summary").json()
+    assert "crud.create_trade" in {caller for group in summary for caller in group["callers"]}
+    assert summary == sorted(summary, key=lambda group: group["total_ms"], reverse=True)
+    logged = [json.loads(line) for line in slow_log.read_text().splitlines()]
+    assert {entry["fingerprint"] for entry in logged} >= {count["fingerprint"]}
+
+
+def test_plans_run_read_only() -> None:
+    with pytest.raises(Exception, match="read-only"):
+        slow_queries.explain(engine, "WITH moved AS (DELETE FROM change_log RETURNING seq) SELECT count(*) FROM moved", {})
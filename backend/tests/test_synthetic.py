@@ -0,0 +1,48 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.recompute import recompute_journal
+from benchmarks import suite, synthetic
+
+from .conftest import engine
+
+JOURNAL_QUERY = text(
+    "SELECT id, symbol, direction, quantity, entry_timestamp, exit_price, pnl, r_multiple, confirmations "
+    "FROM trades ORDER BY id"
+)
+
+
+def test_synthetic_journal_is_deterministic_and_consistent(client: TestClient) -> None:
+    synthetic.generate_journal(engine, 400, seed=7, chunk_size=150)
+    with engine.connect() as connection:
+        first = connection.execute(JOURNAL_QUERY).all()
+        tag_links = connection.execute(text("SELECT count(*) FROM trade_tags")).scalar_one()
+
+    # Stored metrics and balances are what a recompute would produce.
+    report = recompute_journal(engine, dry_run=True)
+    assert (report.trades, report.trades_changed, report.balance_drift) == (400, 0, [])
+    account_id = client.get("/api/accounts").json()[0]["id"]
+    assert client.get(f"/api/accounts/{account_id}/reconciliation").json()["balanced"] is True
+    feed = client.get("/api/changes", params={"limit": 5000}).json()
+    assert len(feed["trades"]) == 400 and tag_links > 0
+
+    with engine.begin() as connection:
+        synthetic.reset(connection)
+    synthetic.generate_journal(engine, 400, seed=7, chunk_size=400)
+    with engine.connect() as connection:
+        assert connection.execute(JOURNAL_QUERY).all() == first
+
+
+def test_benchmark_cases_run_against_a_synthetic_journal() -> None:
+    synthetic.generate_journal(engine, 200, seed=3)
+    with suite.Session(bind=engine) as db:
+        journal = suite.Journal.load(db)
+    results = {item.name: suite.measure(engine, item, journal, repeat=1) for item in suite.CASES}
+    assert all(result["median_ms"] > 0 for result in results.values())
+
+    # The write cases leave no trace.
+    with suite.Session(bind=engine) as db:
+        assert suite.Journal.load(db).trades == 200
+    slower = {name: {**result, "median_ms": result["median_ms"] * 2} for name, result in results.items()}
+    assert suite.compare(slower, results, tolerance=0.25) == list(results)
+    assert suite.compare(results, slower, tolerance=0.25) == []
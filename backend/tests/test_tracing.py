@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import tracing
+
+from .test_api import create_account, create_strategy, create_trade
+
+
+@pytest.fixture()
+def traces(monkeypatch, tmp_path):
+    log_path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(tracing, "TRACE_LOG_PATH", str(log_path))
+    tracing.trace_log.clear()
+    yield log_path
+    tracing.trace_log.clear()
+
+
+def test_traced_request_breaks_down_the_route(client: TestClient, traces) -> None:
+    strategy_id = create_strategy(client)
+    account_id = create_account(client)
+    create_trade(client, strategy_id, account_id)
+    assert tracing.trace_log.entries() == []
+
+    response = client.post(
+        "/api/trades",
+        headers={"X-Trace": "1"},
+        json={
+            "symbol": "ES",
+            "direction": "Long",
+            "quantity": "1",
+            "strategy_id": strategy_id,
+            "account_id": account_id,
+            "entryDateTime": "2024-01-02T14:30:00Z",
+            "exitDateTime": "2024-01-02T15:30:00Z",
+            "entry_price": "5100",
+            "exit_price": "5110",
+            "tag_names": ["Breakout"],
+        },
+    )
+    trace = client.get(f"/api/admin/traces/{response.headers['X-Trace-Id']}").json()
+
+    assert trace["name"] == "POST /api/trades" and trace["attributes"]["status"] == 201
+    spans = {span["name"]: span for span in trace["spans"]}
+    route = spans["route"]
+    assert {spans[name]["parent_id"] for name in ("prepare", "trades.create_trade", "serialize")} == {route["span_id"]}
+    create = spans["crud.create_trade"]
+    for name in ("crud._ensure_account", "crud._get_or_create_tags", "calculations.calculate_trade_metrics"):
+        assert spans[name]["parent_id"] == create["span_id"]
+    assert spans["session.commit"]["parent_id"] == create["span_id"]
+    # The response model's lazy loads happen after the handler returned.
+    lazy_loads = [span for span in trace["spans"] if span["kind"] == "sql" and span["parent_id"] == route["span_id"]]
+    assert lazy_loads and all(span["start_ms"] >= spans["serialize"]["start_ms"] for span in lazy_loads)
+
+    summary = client.get("/api/admin/traces", params={"name": "POST /api/trades"}).json()
+    assert [item["trace_id"] for item in summary] == [trace["trace_id"]]
+    assert summary[0]["sql_statements"] == len([span for span in trace["spans"] if span["kind"] == "sql"])
+    assert [json.loads(line)["trace_id"] for line in traces.read_text().splitlines()] == [trace["trace_id"]]
+
+
+def test_untraced_requests_record_nothing(client: TestClient, traces) -> None:
+    response = client.get("/api/trades")
+    assert "X-Trace-Id" not in response.headers
+    assert tracing.trace_log.entries() == []
+    assert client.get("/api/admin/traces/unknown").status_code == 404
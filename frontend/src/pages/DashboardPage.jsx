@@ -48,19 +48,13 @@ export default function DashboardPage() {
         end_date: filters.end_date || undefined,
       }
 
-      const [kpiData, equityData, tagData, strategyData, accountData] = await Promise.all([
-        dashboardApi.getKPIs(),
-        dashboardApi.getEquityCurve(),
-        dashboardApi.getPerformanceByTag(),
-        dashboardApi.getStrategySummary(params),
-        dashboardApi.getAccountSummary(params),
-      ])
+      const bundle = await dashboardApi.getBundle(params)
 
-      setKpis(kpiData)
-      setEquityCurve(equityData)
-      setPerformanceByTag(tagData)
-      setStrategySummary(strategyData)
-      setAccountSummary(accountData)
+      setKpis(bundle.kpis)
+      setEquityCurve(bundle.equity_curve)
+      setPerformanceByTag(bundle.performance_by_tag)
+      setStrategySummary(bundle.strategies)
+      setAccountSummary(bundle.accounts)
       setError('')
     } catch (apiError) {
       console.error(apiError)
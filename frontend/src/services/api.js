@@ -109,6 +109,11 @@ export const tradesApi = {
 }
 
 export const dashboardApi = {
+  getBundle: async (params = {}) => {
+    const response = await api.get('/dashboard/bundle', { params })
+    return response.data
+  },
+
   getKPIs: async () => {
     const response = await api.get('/dashboard/kpis')
     return response.data